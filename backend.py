@@ -2,32 +2,58 @@ import os
 import json
 import tempfile
 import shutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from fastapi import FastAPI, HTTPException
 from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from supabase import create_client
 from datetime import datetime
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import math
+import asyncio
+import uuid
+import logging
+import threading
 from utils.file_loaders import load_files
 from utils.table_parsers import extract_tables_to_dataframes_from_docs
-from utils.orchestration import split_documents
-from utils.rag_narrative import extract_narrative_fields
+from utils.orchestration import parse_deal_documents
+from utils.field_extraction import resolve_fields
+from utils.executors import ExecutorSaturated, run_cpu, run_io, shutdown_pools
+from utils.rag_narrative import extract_narrative_fields, abuild_vectorstore
 from utils.aggregation import aggregate_rent_roll, aggregate_t12
-from utils.metrics import compute_metrics
+from utils.metrics import IRR_HOLD_YEARS, NARRATIVE_METRICS, compute_metrics, compute_metrics_grid
+from utils.simulation import SIMULATION_MAX_HOLD_YEARS, SIMULATION_MAX_PATHS, SIMULATION_PATHS, simulate_deal
 from utils.ai_summary import generate_underwriting_summary
 from utils.ai_analysis import generate_underwriting_analysis
+from utils.ai_writeups import generate_ai_writeups
+from utils.jobs import JobManager, JobQueueFull, StageTracker
+from utils.llm_cache import llm_cache_bypass
+from utils.llm_clients import aclose_loop_clients, close_clients, get_embeddings, llm_priority
+from utils.deal_index import DealNotFound, aask_deal, save_deal_index
+from utils.persistence import SQLiteTableClient, WriteBehindQueue
 from langchain_community.vectorstores import FAISS  # or from langchain_community.vectorstores.faiss import FAISS
 from langchain_openai import OpenAIEmbeddings
+from utils.embedding_cache import CachedEmbeddings
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
  
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Set to a SQLite path to spool results into a local stand-in database instead of Supabase
+PERSIST_LOCAL_DB = os.getenv("PERSIST_LOCAL_DB")
  
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+_supabase = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase():
+    """Create the Supabase client on first use (so importing this module needs no credentials)."""
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        return _supabase
  
 def clean_number(value):
     """Convert strings like '$25,000' or '25,000' to float, handling NaN values"""
@@ -85,10 +111,12 @@ def save_to_supabase(narrative_fields, metrics, t12_summary, ai_summary, ai_anal
         "ai_analysis": ai_analysis,
         "created_at": datetime.utcnow().isoformat()
     }
-    try:
-        supabase.table("Underwriting").insert(data).execute()
-    except Exception as e:
-        print("Supabase insert failed:", e)
+    # Spooled locally and inserted by the background writer, with retries, off the request path
+    queue = get_persist_queue()
+    if queue is None:
+        logging.warning("⚠️ No database configured (SUPABASE_URL/SUPABASE_KEY or PERSIST_LOCAL_DB); result not saved")
+        return
+    queue.enqueue("Underwriting", data)
  
 # Import your existing pipeline functions
 from utils.aggregation import *
@@ -124,9 +152,59 @@ app.add_middleware(
  
 # Explicitly use OpenAI embeddings for FAISS vectorstore
 def build_vectorstore(docs):
-    embeddings = OpenAIEmbeddings(model=os.getenv("EMBED_MODEL", "text-embedding-3-small"))
+    model = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+    embeddings = CachedEmbeddings(get_embeddings(model), model)
     return FAISS.from_documents(docs, embeddings)
  
+@app.on_event("shutdown")
+async def _shutdown_pools():
+    shutdown_pools(wait=False)
+    if _job_manager is not None:
+        _job_manager.shutdown(wait=False)
+    if _persist_queue is not None:
+        _persist_queue.stop()
+    close_clients()
+    await aclose_loop_clients()
+
+
+_job_manager = None
+_persist_queue = None
+_persist_queue_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Create the background job pool on first use."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
+
+
+def get_persist_queue() -> Optional[WriteBehindQueue]:
+    """
+    Create and start the write-behind queue for result rows on first use. Returns None when no
+    database is configured, rather than spooling rows that could never be written.
+    """
+    global _persist_queue
+    # First calls can race in from several I/O-pool threads; two queues would drain one spool twice
+    with _persist_queue_lock:
+        if _persist_queue is None:
+            if PERSIST_LOCAL_DB:
+                local = SQLiteTableClient(PERSIST_LOCAL_DB)
+                _persist_queue = WriteBehindQueue(lambda: local).start()
+            elif SUPABASE_URL and SUPABASE_KEY:
+                _persist_queue = WriteBehindQueue(get_supabase).start()
+        return _persist_queue
+
+
+@app.get("/persistence/queue")
+def persistence_queue():
+    """Depth of the local spool of result rows waiting to be written (or retried) to the database."""
+    queue = get_persist_queue()
+    if queue is None:
+        return {"enabled": False, "detail": "No database configured (SUPABASE_URL/SUPABASE_KEY or PERSIST_LOCAL_DB)"}
+    return {"enabled": True, **queue.depth()}
+ 
 # User schema
 class User(BaseModel):
     email: str
@@ -137,12 +215,12 @@ class User(BaseModel):
 def save_user(user: User):
     try:
         # Check if already exists
-        existing = supabase.table("users").select("*").eq("email", user.email).execute()
+        existing = get_supabase().table("users").select("*").eq("email", user.email).execute()
         if existing.data:
             return {"message": "User already exists"}
  
         # Insert user
-        result = supabase.table("users").insert({
+        result = get_supabase().table("users").insert({
             "email": user.email,
             "name": user.name,
             "picture": user.picture
@@ -152,104 +230,362 @@ def save_user(user: User):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
  
+async def run_underwrite(
+    paths: List[str],
+    overrides_dict: Dict[str, Any],
+    tracker: StageTracker = None,
+    emit: Optional[Callable[[str, Any], None]] = None,
+    priority: str = "interactive",
+) -> Dict[str, Any]:
+    """
+    Full underwriting pipeline over saved upload paths; returns the JSON-safe result payload.
+    `emit(section, payload)` is called as each section of the result becomes available, and with
+    "<name>.delta" tokens while the AI write-ups stream.
+    Identical LLM prompts are answered from the response cache; {"llm_cache": false} in the
+    overrides forces fresh answers (which then replace the cached ones).
+    OpenAI calls are scheduled at `priority` ("batch" for background jobs) by the shared rate limiter.
+    """
+    tracker = tracker or StageTracker()
+    refresh_llm = overrides_dict.get("llm_cache") is False
+    # One id for the deal's saved index (/ask) and its parser debug artifacts, if enabled
+    deal_id = uuid.uuid4().hex
+
+    def _emit(section: str, payload: Any) -> None:
+        if emit:
+            emit(section, clean_dict_for_json(payload))
+
+    # Loading, OCR, table extraction and aggregation are CPU-bound: run them in the process pool
+    with tracker.stage("parse_documents"):
+        parsed = await run_cpu(parse_deal_documents, paths, overrides_dict.get("lease_assumptions"), deal_id)
+    docs = parsed["docs"]
+    rent_roll_summary = parsed["rent_roll_summary"]
+    t12_summary = parsed["t12_summary"]
+    lease_analysis = parsed["lease_analysis"]
+    _emit("rent_roll_summary", rent_roll_summary)
+    _emit("t12_summary", t12_summary)
+    _emit("lease_analysis", lease_analysis)
+    if emit:
+        # Numbers that don't depend on the narrative (cap rate, DSCR, CoC...) can render right away;
+        # per-sqft / per-unit figures wait for "metrics" unless the overrides supply their inputs
+        preliminary = compute_metrics(t12_summary, rent_roll_summary, {}, overrides=overrides_dict)
+        pending = [key for key, source in NARRATIVE_METRICS.items() if not overrides_dict.get(source)]
+        for key in pending:
+            preliminary.pop(key)
+        _emit("metrics.preliminary", {**preliminary, "pending_narrative": pending})
+
+    # Fields stated verbatim in the page text are already resolved; the RAG/LLM pass
+    # (and embedding the deal at all) is only needed for the rest
+    narrative_fields, missing = resolve_fields(parsed["field_candidates"])
+    vs = None
+    field_sources = {
+        key: {"source": "text", "confidence": parsed["field_candidates"][key]["confidence"]} for key in narrative_fields
+    }
+    if missing:
+        # load_files already produced the final table-aware chunks
+        with tracker.stage("embed"), llm_priority(priority):
+            vs = await abuild_vectorstore(docs)
+        with tracker.stage("narrative"), llm_cache_bypass(refresh_llm), llm_priority(priority):
+            llm_fields = await run_io(extract_narrative_fields, vs, fields=missing)
+        narrative_fields = {**llm_fields, **narrative_fields}
+        # Fields the LLM couldn't find either are reported as having no source
+        field_sources.update({
+            key: {"source": "llm" if llm_fields.get(key, "Not found") != "Not found" else None, "confidence": None}
+            for key in missing
+        })
+    _emit("narrative_fields", narrative_fields)
+
+    # Keep the deal's chunks (and index, if one was built) on disk for follow-up questions via /ask
+    with tracker.stage("persist_index"):
+        await run_io(save_deal_index, deal_id, docs, vs)
+
+    # Compute metrics
+    with tracker.stage("metrics"):
+        metrics = compute_metrics(
+            t12_summary,
+            rent_roll_summary,
+            narrative_fields,
+            overrides=overrides_dict
+        )
+    _emit("metrics", metrics)
+
+    # Generate the three AI write-ups concurrently, each under its own deadline
+    with tracker.stage("ai_writeups"), llm_cache_bypass(refresh_llm), llm_priority(priority):
+        on_token = (lambda name, token: emit(f"{name}.delta", {"text": token})) if emit else None
+        writeups = await generate_ai_writeups(narrative_fields, metrics, on_token=on_token)
+    for name in ("ai_summary", "ai_analysis", "executive_summary"):
+        _emit(name, writeups[name])
+    ai_summary = writeups["ai_summary"]
+    ai_analysis = writeups["ai_analysis"]
+    ai_executive_summary = writeups["executive_summary"]
+
+    # Clean all data before processing
+    clean_narrative_fields = clean_dict_for_json(narrative_fields)
+    clean_metrics = clean_dict_for_json(metrics)
+    clean_t12_summary = clean_dict_for_json(t12_summary)
+    clean_rent_roll_summary = clean_dict_for_json(rent_roll_summary)
+
+    # Save to Supabase with cleaned data
+    with tracker.stage("save"):
+        await run_io(save_to_supabase, clean_narrative_fields, clean_metrics, clean_t12_summary, ai_summary, ai_analysis)
+
+    result = {
+        "deal_id": deal_id,
+        "rent_roll_summary": clean_rent_roll_summary,
+        "t12_summary": clean_t12_summary,
+        "lease_analysis": clean_dict_for_json(lease_analysis),
+        "narrative_fields": clean_narrative_fields,
+        "narrative_field_sources": field_sources,
+        "metrics": clean_metrics,
+        "ai_summary": ai_summary,
+        "executive_summary": ai_executive_summary,
+        "ai_status": {"partial": writeups["partial"], "timed_out": writeups["timed_out"]},
+        "quick_summary": {
+            "property": clean_narrative_fields.get("property_name"),
+            "address": clean_narrative_fields.get("property_address"),
+            "year_built": clean_narrative_fields.get("year_built"),
+            "sqft": extract_sqft_value(narrative_fields.get("total_building_sqft")),
+            "NOI": clean_t12_summary.get("net_operating_income"),
+            "Expenses": clean_t12_summary.get("operating_expenses"),
+            "GPR": clean_t12_summary.get("gross_potential_rent"),
+            "Current Rent Total": clean_rent_roll_summary.get("current_rent_total"),  # ADDED
+            "Market Rent Total": clean_rent_roll_summary.get("market_rent_total"),    # ADDED
+            "IRR 5-Year": clean_metrics.get("irr_5yr"),                              # ADDED
+            "Rent Gap %": clean_metrics.get("rent_gap_pct"),
+            "WALT (years)": (lease_analysis or {}).get("walt_years_by_rent"),
+            "Cap Rate": clean_metrics.get("cap_rate"),
+            "DSCR": clean_metrics.get("dscr"),
+            "CoC Return": clean_metrics.get("coc_return"),
+            "Price per SqFt": clean_metrics.get("price_per_sqft"),
+            "Price per Unit": clean_metrics.get("price_per_unit"),
+            "Break-even Occupancy": clean_metrics.get("break_even_occupancy"),
+            "Investment Recommendation": ai_analysis.get("investment_recommendation"),
+            "Key Investment Highlights": ai_analysis.get("key_investment_highlights"),
+            "Risk Considerations": ai_analysis.get("risk_considerations"),
+
+        },
+    }
+
+    # Final clean of the entire result before JSON serialization
+    result = clean_dict_for_json(result)
+    return result
+
+
+def _parse_overrides(overrides: str) -> Dict[str, Any]:
+    try:
+        return json.loads(overrides)
+    except Exception:
+        return {}
+
+
+def _save_uploads(files: List[UploadFile], tmpdir: str) -> List[str]:
+    paths = []
+    for f in files:
+        path = os.path.join(tmpdir, os.path.basename(f.filename))
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(f.file, buffer)
+        paths.append(path)
+    return paths
+
+
 @app.post("/underwrite")
 async def underwrite(
     files: List[UploadFile] = File(...),
     overrides: str = Form(default="{}"),
+    mode: str = Form(default="sync"),
 ):
     """
     Upload one or more files (PDF, Excel, CSV, JSON, TXT) and get underwriting metrics.
     Optionally pass overrides (JSON string) to inject purchase price, debt service, etc.
+    With mode="job" the pipeline runs on the background worker pool and a job id is returned
+    immediately; poll GET /jobs/{job_id} for per-stage progress and the finished result.
     """
+    overrides_dict = _parse_overrides(overrides)
     tmpdir = tempfile.mkdtemp()
-    paths = []
- 
-    try:
-        # Save uploads to temp files
-        for f in files:
-            path = os.path.join(tmpdir, f.filename)
-            with open(path, "wb") as buffer:
-                shutil.copyfileobj(f.file, buffer)
-            paths.append(path)
- 
-        # Load and process files
-        docs = load_files(paths)
-        table_dfs = extract_tables_to_dataframes_from_docs(docs)
- 
-        rent_roll_summary = aggregate_rent_roll(table_dfs.get("rent_roll", []), paths)
-        t12_summary = aggregate_t12(table_dfs.get("t12", []), paths)
- 
-        splits = split_documents(docs)
-        vs = build_vectorstore_incremental(splits)
-        ##narrative_fields = extract_narrative_fields(vs)
-        narrative_fields = extract_narrative_fields(vs)
- 
-        # Parse overrides
+
+    if mode == "job":
         try:
-            overrides_dict: Dict[str, Any] = json.loads(overrides)
-        except Exception:
-            overrides_dict = {}
- 
-        # Compute metrics
-        metrics = compute_metrics(
-            t12_summary,
-            rent_roll_summary,
-            narrative_fields,
-            overrides=overrides_dict
-        )
- 
-        # Generate AI underwriting summary
-        ai_summary = generate_underwriting_summary(narrative_fields, metrics)
-        ai_analysis = generate_underwriting_analysis(narrative_fields, metrics)
-        ai_executive_summary = generate_executive_summary(narrative_fields, metrics)
- 
-        # Clean all data before processing
-        clean_narrative_fields = clean_dict_for_json(narrative_fields)
-        clean_metrics = clean_dict_for_json(metrics)
-        clean_t12_summary = clean_dict_for_json(t12_summary)
-        clean_rent_roll_summary = clean_dict_for_json(rent_roll_summary)
- 
-        # Save to Supabase with cleaned data
-        save_to_supabase(clean_narrative_fields, clean_metrics, clean_t12_summary, ai_summary, ai_analysis)
- 
-        result = {
-            "rent_roll_summary": clean_rent_roll_summary,
-            "t12_summary": clean_t12_summary,
-            "narrative_fields": clean_narrative_fields,
-            "metrics": clean_metrics,
-            "ai_summary": ai_summary,
-            "executive_summary": ai_executive_summary,
-            "quick_summary": {
-                "property": clean_narrative_fields.get("property_name"),
-                "address": clean_narrative_fields.get("property_address"),
-                "year_built": clean_narrative_fields.get("year_built"),
-                "sqft": extract_sqft_value(narrative_fields.get("total_building_sqft")),
-                "NOI": clean_t12_summary.get("net_operating_income"),
-                "Expenses": clean_t12_summary.get("operating_expenses"),
-                "GPR": clean_t12_summary.get("gross_potential_rent"),
-                "Current Rent Total": clean_rent_roll_summary.get("current_rent_total"),  # ADDED
-                "Market Rent Total": clean_rent_roll_summary.get("market_rent_total"),    # ADDED
-                "IRR 5-Year": clean_metrics.get("irr_5yr"),                              # ADDED
-                "Rent Gap %": clean_metrics.get("rent_gap_pct"),
-                "Cap Rate": clean_metrics.get("cap_rate"),
-                "DSCR": clean_metrics.get("dscr"),
-                "CoC Return": clean_metrics.get("coc_return"),
-                "Price per SqFt": clean_metrics.get("price_per_sqft"),
-                "Price per Unit": clean_metrics.get("price_per_unit"),
-                "Break-even Occupancy": clean_metrics.get("break_even_occupancy"),
-                "Investment Recommendation": ai_analysis.get("investment_recommendation"),
-                "Key Investment Highlights": ai_analysis.get("key_investment_highlights"),
-                "Risk Considerations": ai_analysis.get("risk_considerations"),
-            
-            },
-        }
- 
-        # Final clean of the entire result before JSON serialization
-        result = clean_dict_for_json(result)
+            paths = _save_uploads(files, tmpdir)
+            job_id = get_job_manager().submit(
+                run_underwrite, paths, overrides_dict, priority="batch",
+                cleanup=lambda: shutil.rmtree(tmpdir, ignore_errors=True),
+            )
+        except JobQueueFull as e:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise HTTPException(status_code=503, detail=str(e))
+        except BaseException:
+            # The job owns tmpdir only once it was submitted
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"})
+
+    try:
+        paths = _save_uploads(files, tmpdir)
+        result = await run_underwrite(paths, overrides_dict)
         return JSONResponse(content=result)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
  
     finally:
         # Clean up temp directory
         shutil.rmtree(tmpdir, ignore_errors=True)
- 
- 
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/underwrite/stream")
+async def underwrite_stream(
+    files: List[UploadFile] = File(...),
+    overrides: str = Form(default="{}"),
+):
+    """
+    Server-sent-event variant of /underwrite. Each section of the result is sent as its own event
+    as soon as it exists (rent_roll_summary, t12_summary, lease_analysis, metrics.preliminary, narrative_fields,
+    metrics), then the AI
+    write-ups token by token ("<name>.delta"), and finally the complete payload as "result".
+    metrics.preliminary leaves out the metrics that need narrative inputs and lists them under "pending_narrative".
+    """
+    overrides_dict = _parse_overrides(overrides)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        paths = _save_uploads(files, tmpdir)
+    except BaseException:
+        # Until the stream starts, nothing else will remove tmpdir
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def _run():
+        try:
+            result = await run_underwrite(paths, overrides_dict, emit=lambda ev, data: queue.put_nowait((ev, data)))
+            queue.put_nowait(("result", result))
+        except Exception as e:
+            # Same status the non-streaming endpoint would answer with (503 when the pools are saturated)
+            queue.put_nowait(("error", {"detail": str(e), "status_code": getattr(e, "status_code", 500)}))
+        finally:
+            queue.put_nowait(done)
+
+    async def events():
+        task = asyncio.create_task(_run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield _sse(*item)
+        finally:
+            # Client went away or stream finished: stop the pipeline and drop the uploads
+            if not task.done():
+                task.cancel()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, per-stage timing and (once finished) the result of a background underwrite job."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+class DealInputs(BaseModel):
+    job_id: Optional[str] = None
+    t12_summary: Optional[Dict[str, Any]] = None
+    rent_roll_summary: Optional[Dict[str, Any]] = None
+    narrative_fields: Optional[Dict[str, Any]] = None
+    overrides: Dict[str, Any] = {}
+
+
+def _deal_summaries(req: DealInputs):
+    """(t12, rent_roll, narrative) from a finished job and/or the request; explicitly passed summaries win."""
+    summaries = {}
+    if req.job_id:
+        job = get_job_manager().get(req.job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}; a finished job is required")
+        summaries = job["result"]
+
+    t12_summary = req.t12_summary if req.t12_summary is not None else summaries.get("t12_summary")
+    rent_roll_summary = req.rent_roll_summary if req.rent_roll_summary is not None else summaries.get("rent_roll_summary")
+    narrative_fields = req.narrative_fields if req.narrative_fields is not None else summaries.get("narrative_fields")
+    if t12_summary is None:
+        raise HTTPException(status_code=400, detail="Pass a job_id or a t12_summary")
+    return t12_summary, rent_roll_summary or {}, narrative_fields or {}
+
+
+class SensitivityRequest(DealInputs):
+    axes: Dict[str, List[float]]
+
+
+@app.post("/sensitivity")
+async def sensitivity(req: SensitivityRequest):
+    """
+    Cap rate, DSCR, CoC, IRR and break-even grids over purchase_price / interest_rate / ltv / rent_growth
+    axes, without rerunning the document pipeline. Summaries come from a finished job (job_id) or are
+    passed in directly.
+    """
+    t12_summary, rent_roll_summary, narrative_fields = _deal_summaries(req)
+    try:
+        # The batched IRR solve is CPU-bound: run it in the process pool like /simulate
+        return await run_cpu(
+            compute_metrics_grid, t12_summary, rent_roll_summary, narrative_fields, req.axes, overrides=req.overrides
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+class SimulationRequest(DealInputs):
+    distributions: Dict[str, Dict[str, Any]] = {}
+    # Out-of-range sizes are rejected with a 422 before any arrays are allocated
+    paths: int = Field(default=SIMULATION_PATHS, ge=1, le=SIMULATION_MAX_PATHS)
+    seed: Optional[int] = None
+    hold_years: int = Field(default=IRR_HOLD_YEARS, ge=1, le=SIMULATION_MAX_HOLD_YEARS)
+    covenants: Dict[str, Optional[float]] = {}
+
+
+@app.post("/simulate")
+async def simulate(req: SimulationRequest):
+    """
+    Monte Carlo IRR / DSCR percentile bands and covenant breach probabilities for a deal
+    (summaries from a finished job or passed in). Pass a seed for reproducible results.
+    """
+    t12_summary, rent_roll_summary, narrative_fields = _deal_summaries(req)
+    try:
+        result = await run_cpu(
+            simulate_deal, t12_summary, rent_roll_summary, narrative_fields,
+            overrides=req.overrides, distributions=req.distributions, paths=req.paths,
+            seed=req.seed, hold_years=req.hold_years, covenants=req.covenants,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return clean_dict_for_json(result)
+
+
+class AskRequest(BaseModel):
+    deal_id: str
+    question: str
+
+
+@app.post("/ask")
+async def ask(req: AskRequest):
+    """
+    Answer a follow-up question about an underwritten deal (the `deal_id` returned by /underwrite)
+    from its saved index: one retrieval plus one LLM call, no re-upload or re-embedding.
+    """
+    try:
+        return await aask_deal(req.deal_id, req.question)
+    except DealNotFound:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1 @@
+"""Offline, stage-level benchmarks for the underwriting pipeline (no OpenAI or Supabase access)."""
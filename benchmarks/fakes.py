@@ -0,0 +1,101 @@
+"""
+Deterministic local stand-ins for OpenAI and Supabase.
+
+`install_fakes()` swaps the OpenAI fakes into the shared client registry for
+the duration of a `with` block, so benchmarks run offline and produce
+repeatable output. `fake_supabase()` is a local SQLite table store with the
+supabase-py insert shape, for driving the write-behind persistence queue.
+"""
+
+import hashlib
+import json
+import sys
+from contextlib import contextmanager
+from typing import Any, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from utils.persistence import SQLiteTableClient
+
+FAKE_EMBED_DIM = 256
+
+FAKE_NARRATIVE = {
+    "purchase_price": "$12,500,000",
+    "property_name": "Benchmark Plaza",
+    "property_address": "100 Synthetic Way, Austin, TX 78701",
+    "property_type": "Office",
+    "year_built": "1998",
+    "renovation_year": "2016",
+    "number_of_stories": "4",
+    "total_units_or_suites": "40",
+    "total_building_sqft": "125,000 SF",
+    "amenities": "Fitness center, covered parking",
+}
+
+FAKE_ANALYSIS = {
+    "investment_recommendation": "CONSIDER",
+    "key_investment_highlights": ["Stable occupancy", "Below-market rents"],
+    "risk_considerations": ["Near-term rollover"],
+}
+
+
+class FakeEmbeddings(Embeddings):
+    """Hash-seeded unit vectors: the same text always maps to the same embedding."""
+
+    def __init__(self, model: str = "fake-embedding", dim: int = FAKE_EMBED_DIM, **_: Any):
+        self.model = model
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def FakeChatOpenAI(model: str = "fake-chat", temperature: float = 0.0, **_: Any) -> FakeListChatModel:
+    """ChatOpenAI look-alike that always answers with JSON valid for both narrative and analysis prompts."""
+    payload = dict(FAKE_NARRATIVE, **FAKE_ANALYSIS)
+    return FakeListChatModel(responses=[json.dumps(payload)])
+
+
+def fake_supabase(path: str) -> SQLiteTableClient:
+    """Supabase look-alike (`table(name).insert(rows).execute()`) storing rows in a SQLite file at `path`."""
+    return SQLiteTableClient(path)
+
+
+_PATCHES = {
+    # Every OpenAI client comes from the shared registry
+    "utils.llm_clients": {"OpenAIEmbeddings": FakeEmbeddings, "ChatOpenAI": FakeChatOpenAI},
+}
+
+
+@contextmanager
+def install_fakes():
+    """Patch the OpenAI entry points in already-imported pipeline modules; restore on exit."""
+    saved = []
+    for module_name, attrs in _PATCHES.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for attr, fake in attrs.items():
+            saved.append((module, attr, getattr(module, attr, None)))
+            setattr(module, attr, fake)
+    try:
+        yield
+    finally:
+        for module, attr, original in reversed(saved):
+            setattr(module, attr, original)
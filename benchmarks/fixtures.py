@@ -0,0 +1,113 @@
+"""
+Synthetic deal documents for benchmarks: an offering memorandum (PDF),
+a rent roll (CSV) and a T12 (XLSX) at several sizes. Output is seeded and
+therefore identical between runs.
+"""
+
+import os
+import random
+from typing import Dict, List
+
+import pandas as pd
+
+SIZES = {
+    "small": {"units": 25, "om_pages": 5, "t12_lines": 20},
+    "medium": {"units": 500, "om_pages": 40, "t12_lines": 60},
+    "large": {"units": 5000, "om_pages": 200, "t12_lines": 150},
+}
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+EXPENSE_ITEMS = ["Repairs & Maintenance", "Payroll", "Real Estate Tax", "Insurance", "Utilities", "Management Fee"]
+INCOME_ITEMS = ["Gross Potential Rent", "Vacancy", "Other Income", "Parking", "Laundry"]
+
+OM_PARAGRAPH = (
+    "Benchmark Plaza is a {stories}-story office property located at 100 Synthetic Way, Austin, TX 78701. "
+    "Built in 1998 and renovated in 2016, the building contains 125,000 SF across {units} suites. "
+    "The submarket has seen steady absorption, and in-place rents trail market by roughly ten percent. "
+    "Amenities include a fitness center, covered parking and a tenant lounge. "
+)
+
+
+def make_rent_roll(units: int, rng: random.Random) -> pd.DataFrame:
+    rows = []
+    for i in range(units):
+        sf = rng.randint(800, 12000)
+        psf = round(rng.uniform(18, 42), 2)
+        start_year = rng.randint(2015, 2024)
+        rows.append({
+            "Suite": f"Suite {100 + i}",
+            "Tenant": f"Tenant {i:05d} LLC" if rng.random() > 0.08 else "Vacant",
+            "SF": f"{sf:,}",
+            "Annual Rent": f"${sf * psf:,.2f}",
+            "Market Rent PSF": f"${psf * rng.uniform(1.0, 1.2):.2f}",
+            "Lease Start": f"{rng.randint(1, 12):02d}/01/{start_year}",
+            "Lease End": f"{rng.randint(1, 12):02d}/31/{start_year + rng.randint(3, 10)}",
+        })
+    return pd.DataFrame(rows)
+
+
+def make_t12(lines: int, rng: random.Random) -> pd.DataFrame:
+    items = INCOME_ITEMS + [f"{EXPENSE_ITEMS[i % len(EXPENSE_ITEMS)]} {i // len(EXPENSE_ITEMS) + 1}" for i in range(lines)]
+    rows = []
+    for item in items:
+        base = rng.uniform(2_000, 180_000) if item != "Gross Potential Rent" else rng.uniform(200_000, 400_000)
+        months = [round(base * rng.uniform(0.9, 1.1), 2) for _ in MONTHS]
+        row = {"Operating Item": item}
+        row.update({m: f"{v:,.2f}" for m, v in zip(MONTHS, months)})
+        row["TTM Total"] = f"${sum(months):,.2f}"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def make_om_pdf(path: str, pages: int, rent_roll: pd.DataFrame, rng: random.Random) -> bool:
+    """Write a text-layer OM with narrative pages and rent roll table pages. Returns False without PyMuPDF."""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        try:
+            import fitz  # PyMuPDF < 1.24
+        except ImportError:
+            print("PyMuPDF not installed; skipping PDF fixture")
+            return False
+
+    doc = fitz.open()
+    table_rows = rent_roll.head(40 * max(1, pages // 4))
+    table_lines = ["Suite  Tenant  SF  Annual Rent"] + [
+        f"{r['Suite']}  {r['Tenant']}  {r['SF']}  {r['Annual Rent']}" for _, r in table_rows.iterrows()
+    ]
+    for p in range(pages):
+        page = doc.new_page()
+        if p % 4 == 3:
+            start = (p // 4) * 40
+            body = "\n".join(table_lines[:1] + table_lines[1 + start:1 + start + 40])
+        else:
+            body = "\n\n".join(
+                OM_PARAGRAPH.format(stories=rng.randint(2, 6), units=len(rent_roll)) for _ in range(4)
+            )
+        page.insert_textbox(fitz.Rect(40, 40, 572, 752), body, fontsize=8)
+    doc.save(path)
+    doc.close()
+    return True
+
+
+def generate_fixtures(out_dir: str, size: str, seed: int = 7) -> Dict[str, str]:
+    """Create the OM / rent roll / T12 for `size` under `out_dir` and return their paths by kind."""
+    spec = SIZES[size]
+    rng = random.Random(f"{seed}:{size}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    rent_roll = make_rent_roll(spec["units"], rng)
+    paths = {"rent_roll": os.path.join(out_dir, f"rent_roll_{size}.csv")}
+    rent_roll.to_csv(paths["rent_roll"], index=False)
+
+    paths["t12"] = os.path.join(out_dir, f"t12_{size}.xlsx")
+    make_t12(spec["t12_lines"], rng).to_excel(paths["t12"], index=False)
+
+    om_path = os.path.join(out_dir, f"om_{size}.pdf")
+    if make_om_pdf(om_path, spec["om_pages"], rent_roll, rng):
+        paths["om"] = om_path
+    return paths
+
+
+def fixture_paths(paths: Dict[str, str]) -> List[str]:
+    return [paths[k] for k in ("om", "rent_roll", "t12") if k in paths]
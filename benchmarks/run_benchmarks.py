@@ -0,0 +1,158 @@
+"""
+Stage-level pipeline benchmarks with OpenAI and Supabase stubbed out.
+
+    python -m benchmarks.run_benchmarks --sizes small,medium --repeat 3 --out bench.json
+
+Each stage is timed with perf_counter and its peak Python allocation is
+measured with tracemalloc. Results are written as JSON so two runs can be
+diffed or compared by a script. Parse and embedding caches live in a
+throwaway directory and are disabled unless --warm is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+# Result rows written through the persistence queue per repeat of the persist stage
+PERSIST_ROWS = 200
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Run `fn` `repeat` times; return timing stats, peak traced memory and the last result."""
+    timings, peaks, result = [], [], None
+    for _ in range(repeat):
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "seconds_all": timings,
+        "peak_mb": max(peaks) / (1024 ** 2),
+        "result": result,
+    }
+
+
+def run_size(size: str, work_dir: str, repeat: int) -> List[Dict[str, Any]]:
+    from benchmarks.fakes import FAKE_ANALYSIS, FAKE_NARRATIVE, fake_supabase
+    from benchmarks.fixtures import fixture_paths, generate_fixtures
+    from utils.aggregation import aggregate_rent_roll, aggregate_t12
+    from utils.context_builder import NARRATIVE_CANDIDATES, build_context
+    from utils.field_extraction import extract_fields_deterministic
+    from utils.file_loaders import load_files
+    from utils.leases import analyze_leases
+    from utils.metrics import compute_metrics
+    from utils.pdf_session import pdf_session_scope
+    from utils.persistence import WriteBehindQueue
+    from utils.rag_narrative import build_vectorstore_incremental, split_documents
+    from utils.table_parsers import extract_tables_to_dataframes_from_docs
+    from utils.table_registry import table_registry_scope
+
+    paths = fixture_paths(generate_fixtures(os.path.join(work_dir, "fixtures"), size))
+    rows = []
+
+    def record(stage: str, fn: Callable[[], Any], **extra) -> Any:
+        stats = measure(fn, repeat)
+        result = stats.pop("result")
+        rows.append(dict(size=size, stage=stage, repeat=repeat, **stats, **extra))
+        print(f"[{size}] {stage:<40} {stats['seconds_median'] * 1000:10.1f} ms  peak {stats['peak_mb']:8.1f} MB")
+        return result
+
+    with table_registry_scope(), pdf_session_scope():
+        docs = record("load_files", lambda: load_files(paths), files=len(paths))
+        tables = record("extract_tables_to_dataframes_from_docs", lambda: extract_tables_to_dataframes_from_docs(docs), chunks=len(docs))
+        rent_roll = record("aggregate_rent_roll", lambda: aggregate_rent_roll(tables.get("rent_roll", []), paths))
+        t12 = record("aggregate_t12", lambda: aggregate_t12(tables.get("t12", []), paths))
+        record("analyze_leases", lambda: analyze_leases(tables.get("rent_roll", [])))
+    record("extract_fields_deterministic", lambda: extract_fields_deterministic(docs), chunks=len(docs))
+    splits = record("split_documents", lambda: split_documents(docs))
+    vs = record("build_vectorstore_incremental", lambda: build_vectorstore_incremental(splits), chunks=len(splits))
+    hits = vs.similarity_search("Extract property details", k=NARRATIVE_CANDIDATES)
+    _, context_stats = record("build_context", lambda: build_context(hits), chunks=len(hits))
+    rows[-1].update(context_tokens=context_stats["context_tokens"], tokens_saved=context_stats["tokens_saved"])
+    metrics = record("compute_metrics", lambda: compute_metrics(t12, rent_roll, FAKE_NARRATIVE, overrides={}))
+
+    # Result rows take the API's write-behind path: durable spool, then batched inserts into the fake Supabase
+    result_row = {**FAKE_NARRATIVE, "metrics": metrics, "t12_summary": t12, "ai_analysis": FAKE_ANALYSIS}
+
+    def persist() -> int:
+        run_dir = tempfile.mkdtemp(dir=work_dir, prefix=f"persist_{size}_")
+        db = fake_supabase(os.path.join(run_dir, "db.sqlite3"))
+        queue = WriteBehindQueue(lambda: db, path=os.path.join(run_dir, "spool.sqlite3"))
+        for _ in range(PERSIST_ROWS):
+            queue.enqueue("Underwriting", result_row)
+        written = queue.flush()
+        if written != PERSIST_ROWS or len(db.rows("Underwriting")) != PERSIST_ROWS:
+            raise RuntimeError(f"Persistence queue wrote {written} of {PERSIST_ROWS} rows: {queue.depth()}")
+        return written
+
+    record("persist_write_behind", persist, rows=PERSIST_ROWS)
+    return rows
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return ""
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help="comma-separated subset of small,medium,large")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="keep parse/embedding/LLM caches enabled between repeats")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="uw_bench_")
+    # Caches must be pointed at the scratch dir before any utils module reads its settings
+    os.environ["PARSE_CACHE_DIR"] = os.path.join(work_dir, "parse_cache")
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(work_dir, "embeddings.sqlite3")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(work_dir, "llm_responses.sqlite3")
+    if not args.warm:
+        os.environ["PARSE_CACHE_ENABLED"] = "0"
+        os.environ["EMBED_CACHE_ENABLED"] = "0"
+        os.environ["LLM_CACHE_ENABLED"] = "0"
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import utils.llm_clients  # noqa: F401  (imported so install_fakes can patch it)
+    from benchmarks.fakes import install_fakes
+
+    results = []
+    with install_fakes():
+        for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            results.extend(run_size(size, work_dir, args.repeat))
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "warm_caches": args.warm,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from utils.cashflows import irr, npv, xirr
+
+
+def test_irr_of_a_par_bond():
+    assert irr([-100, 10, 10, 110]) == pytest.approx(0.10, abs=1e-9)
+
+
+def test_irr_with_two_sign_changes_returns_the_root_nearest_the_guess():
+    cash_flows = [-100, 230, -132]  # NPV is zero at 10% and at 20%
+    assert npv(0.10, cash_flows) == pytest.approx(0.0, abs=1e-9)
+    assert npv(0.20, cash_flows) == pytest.approx(0.0, abs=1e-9)
+    assert irr(cash_flows) == pytest.approx(0.10, abs=1e-9)
+    assert irr(cash_flows, guess=0.25) == pytest.approx(0.20, abs=1e-9)
+
+
+def test_irr_solves_every_row_of_a_batch():
+    batch = np.array([
+        [-100, 10, 10, 110],
+        [-100, 0, 0, 133.1],
+        [100, 100, 100, 100],  # never changes sign: no IRR
+    ])
+    result = irr(batch)
+    assert result.shape == (3,)
+    assert result[:2] == pytest.approx([0.10, 0.10], abs=1e-9)
+    assert np.isnan(result[2])
+
+
+def test_xirr_uses_actual_365():
+    # 365 days at 10% is exactly 1.1x; the leap year 2024 has 366 days, so slightly less than 10%
+    assert xirr([-1000, 1100], ["2023-01-01", "2024-01-01"]) == pytest.approx(0.10, abs=1e-9)
+    assert xirr([-1000, 1100], ["2024-01-01", "2025-01-01"]) == pytest.approx(1.1 ** (365 / 366) - 1, abs=1e-9)
+
+
+def test_xirr_matches_the_spreadsheet_example():
+    cash_flows = [-10000, 2750, 4250, 3250, 2750]
+    dates = ["2008-01-01", "2008-03-01", "2008-10-30", "2009-02-15", "2009-04-01"]
+    assert xirr(cash_flows, dates) == pytest.approx(0.373362535, abs=1e-8)
+
+
+def test_chunked_solve_matches_a_single_pass(monkeypatch):
+    rng = np.random.default_rng(0)
+    batch = np.column_stack([-rng.uniform(80, 120, 7), rng.uniform(0, 20, (7, 3)), rng.uniform(90, 140, 7)])
+    dates = np.array(["2024-01-01", "2024-07-01", "2025-01-01", "2025-09-30", "2026-12-31"], dtype="datetime64[D]")
+    per_row_dates = np.tile(dates, (7, 1)) + np.arange(7)[:, np.newaxis] * np.array([0, 1, 2, 3, 4])
+
+    single = irr(batch), xirr(batch, per_row_dates)
+    monkeypatch.setattr("utils.cashflows.IRR_CHUNK_ROWS", 2)
+    chunked = irr(batch), xirr(batch, per_row_dates)
+
+    np.testing.assert_allclose(chunked[0], single[0], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(chunked[1], single[1], rtol=0, atol=1e-12)
@@ -0,0 +1,64 @@
+from langchain_core.documents import Document
+
+from utils.field_extraction import (
+    FIELD_MIN_CONFIDENCE, LABELLED_CONFIDENCE, PHRASE_CONFIDENCE, extract_fields_deterministic, resolve_fields,
+)
+
+LABELLED = """Property Name: Benchmark Plaza
+Property Type: Office
+Address: 100 Synthetic Way, Austin, TX 78701
+Year Built: 1998
+Building Size: 125,000 SF
+Total Suites: 40
+Offering Price: $12.5 million
+"""
+
+PHRASE_ONLY = (
+    "Benchmark Plaza is a four-story office building constructed in 1998. "
+    "It contains approximately 125,000 square feet across 40 suites."
+)
+
+
+def _docs(*texts):
+    return [Document(page_content=t, metadata={"source": "om.pdf", "page": i}) for i, t in enumerate(texts)]
+
+
+def test_labelled_fields_resolve_without_the_llm():
+    candidates = extract_fields_deterministic(_docs(LABELLED))
+    resolved, missing = resolve_fields(candidates)
+
+    assert candidates["year_built"]["confidence"] == LABELLED_CONFIDENCE
+    assert resolved["year_built"] == "1998"
+    assert resolved["total_building_sqft"] == "125,000"
+    assert resolved["total_units_or_suites"] == "40"
+    assert resolved["purchase_price"] == "$12,500,000"
+    assert resolved["property_type"] == "Office"
+    assert "year_built" not in missing
+
+
+def test_phrase_only_fields_are_left_to_the_llm():
+    candidates = extract_fields_deterministic(_docs(PHRASE_ONLY))
+    resolved, missing = resolve_fields(candidates)
+
+    assert candidates["year_built"] == {"value": 1998, "confidence": PHRASE_CONFIDENCE, "matches": 1}
+    assert candidates["total_building_sqft"]["value"] == 125_000
+    assert PHRASE_CONFIDENCE < FIELD_MIN_CONFIDENCE
+    assert {"year_built", "total_building_sqft", "number_of_stories"} <= set(missing)
+    assert "year_built" not in resolved
+
+
+def test_overlapping_chunks_do_not_corroborate_themselves():
+    sentence = "The building was constructed in 1998."
+    same_page = [Document(page_content=sentence, metadata={"source": "om.pdf", "page": 3})] * 2
+    two_pages = _docs(sentence, sentence)
+
+    assert extract_fields_deterministic(same_page)["year_built"]["confidence"] == PHRASE_CONFIDENCE
+    assert extract_fields_deterministic(two_pages)["year_built"]["confidence"] > PHRASE_CONFIDENCE
+
+
+def test_sale_comp_price_alone_does_not_resolve_purchase_price():
+    candidates = extract_fields_deterministic(_docs("Comparable sale: 12 Main St, sale price $4,200,000."))
+    resolved, missing = resolve_fields(candidates)
+
+    assert candidates["purchase_price"]["confidence"] == PHRASE_CONFIDENCE
+    assert "purchase_price" in missing
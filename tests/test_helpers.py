@@ -0,0 +1,27 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers import _to_number, _to_number_series
+
+EDGE_CASES = [
+    "$1,234.50", "(500)", "$(1,000)", "12%", " 7 ", "", "-", "—", "–", "N/A", "NA", "None",
+    "nan", "abc", None, 5, 3.5, np.float64(2.25), "1e3",
+]
+
+
+def test_to_number_series_matches_to_number():
+    expected = [_to_number(v) for v in EDGE_CASES]
+    result = _to_number_series(pd.Series(EDGE_CASES, dtype=object)).tolist()
+    for value, want, got in zip(EDGE_CASES, expected, result):
+        if want is None or math.isnan(want):
+            assert math.isnan(got), value
+        else:
+            assert got == want, value
+
+
+def test_to_number_series_keeps_numeric_columns():
+    result = _to_number_series(pd.Series([1, 2, 3]))
+    assert result.dtype == float
+    assert result.tolist() == [1.0, 2.0, 3.0]
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from utils.leases import analyze_leases, build_lease_table
+
+
+def _rent_roll(total_label=("Total", "")):
+    return pd.DataFrame({
+        "Suite": ["100", "200", "300", total_label[0]],
+        "Tenant": ["Acme Corp", "Total Wine & More", "Vacant", total_label[1]],
+        "SF": ["2,000", "2,000", "2,000", "6,000"],
+        "Annual Rent": ["$60,000", "$40,000", "", "$100,000"],
+        "Lease End": ["12/31/2030", "06/30/2031", "", ""],
+    })
+
+
+@pytest.mark.parametrize("label", [("Total", ""), ("", "Total"), ("Subtotal:", ""), ("nan", "Grand Total Occupied")])
+def test_total_rows_are_not_leases(label):
+    leases = build_lease_table([_rent_roll(label)])
+
+    # "Total Wine & More" is a tenant, not a total row
+    assert leases["tenant"].tolist() == ["Acme Corp", "Total Wine & More", "Vacant"]
+    assert leases["sf"].sum() == 6000
+    assert leases["vacant"].tolist() == [False, False, True]
+
+
+def test_total_row_does_not_dilute_occupancy():
+    result = analyze_leases([_rent_roll()], as_of="2026-01-01")
+
+    assert result["total_sf"] == 6000
+    assert result["occupancy_sf"] == pytest.approx(4000 / 6000)
+    assert result["in_place_rent"] == 100_000
+    # Only the 2,000 SF vacant suite leases up in year 1
+    assert result["projection"]["annual"][0]["rollover_sf"] == 2000
@@ -0,0 +1,64 @@
+import gc
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import llm_clients
+from utils.jobs import JobManager
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the pool holds an open connection after the request
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_job_event_loops_release_their_clients(tmp_path, monkeypatch, local_url):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    gc.collect()
+    before = len(llm_clients._LOOP_STATE)
+
+    async def runner(tracker=None):
+        llm_clients.get_chat_model("gpt-4o-mini")
+        response = await llm_clients._loop_state()["http"].get(local_url)
+        return response.status_code
+
+    manager = JobManager(jobs_dir=str(tmp_path), workers=1)
+    job_ids = [manager.submit(runner) for _ in range(5)]
+    manager.shutdown(wait=True)
+    for job_id in job_ids:
+        job = manager.get(job_id)
+        assert job["status"] == "done", job["error"]
+        assert job["result"] == 200
+
+    gc.collect()
+    assert len(llm_clients._LOOP_STATE) == before
+
+
+def test_run_async_closes_the_loop_pool(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    pools = []
+
+    async def main():
+        llm_clients.get_chat_model("gpt-4o-mini")
+        pools.append(llm_clients._loop_state()["http"])
+
+    llm_clients.run_async(main())
+    assert pools[0].is_closed
@@ -0,0 +1,32 @@
+import pytest
+
+from utils.metrics import compute_metrics, compute_metrics_grid
+
+T12 = {
+    "net_operating_income": "$400,000",
+    "effective_gross_income": "$700,000",
+    "operating_expenses": "$300,000",
+}
+RENT_ROLL = {"current_rent_total": 650_000, "market_rent_total": 720_000}
+NARRATIVE = {"total_building_sqft": "50,000", "total_units_or_suites": "40"}
+
+
+@pytest.mark.parametrize("overrides", [{}, {"purchase_price": 6_000_000}])
+def test_grid_reproduces_compute_metrics_at_the_defaults(overrides):
+    expected = compute_metrics(T12, RENT_ROLL, NARRATIVE, overrides=overrides)
+    grid = compute_metrics_grid(
+        T12, RENT_ROLL, NARRATIVE, {"purchase_price": [expected["purchase_price"]]}, overrides=overrides
+    )
+
+    assert grid["shape"] == [1]
+    for key in ("cap_rate", "dscr", "coc_return", "break_even_occupancy", "irr_5yr"):
+        assert grid["metrics"][key][0] == pytest.approx(expected[key], rel=1e-9), key
+
+
+def test_grid_keeps_explicit_zero_overrides():
+    levered = compute_metrics_grid(T12, {}, {}, {"purchase_price": [5_000_000]})
+    all_cash = compute_metrics_grid(T12, {}, {}, {"purchase_price": [5_000_000]}, overrides={"ltv": 0, "rent_growth": 0})
+
+    assert levered["metrics"]["dscr"][0] == pytest.approx(1.6)
+    assert all_cash["metrics"]["dscr"][0] is None  # no debt service
+    assert all_cash["metrics"]["coc_return"][0] == pytest.approx(0.08)
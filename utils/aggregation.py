@@ -1,7 +1,7 @@
 from langsmith import traceable
 from typing import List, Dict, Any, Optional
 import pandas as pd
-from utils.helpers import _clean_dataframe, _first_match, _to_number
+from utils.helpers import _clean_dataframe, _first_match, _to_number, _to_number_series
 from utils.text_parsers import *
 from utils.table_parsers import *
 import re
@@ -27,17 +27,15 @@ def aggregate_rent_roll(dfs: List[pd.DataFrame], fallback_pdf_paths: List[str] =
             col_sf = _first_match(cols, [r"sf", r"sq.?ft", r"area"])
 
             total_units += len(df)
-            cur_sum = sum(_to_number(v) or 0.0 for v in df[col_rent].values) if col_rent else 0.0
-            mkt_sum = sum(_to_number(v) or 0.0 for v in df[col_market].values) if col_market else 0.0
+            cur_sum = float(_to_number_series(df[col_rent]).sum()) if col_rent else 0.0
+            mkt_sum = float(_to_number_series(df[col_market]).sum()) if col_market else 0.0
 
             # Estimate market rent using PSF × SF if explicit market rent not found
             if (mkt_sum == 0.0) and col_psf and col_sf:
                 monthly = bool(re.search(r"(\/mo|per\s*month|monthly)", col_psf.lower()))
-                for _, row in df.iterrows():
-                    psf = _to_number(row.get(col_psf))
-                    sf = _to_number(row.get(col_sf))
-                    if psf and sf:
-                        mkt_sum += psf * sf * (12 if monthly else 1)
+                psf = _to_number_series(df[col_psf]).fillna(0.0)
+                sf = _to_number_series(df[col_sf]).fillna(0.0)
+                mkt_sum += float((psf * sf).sum()) * (12 if monthly else 1)
 
             current_rent_total += cur_sum
             market_rent_total += mkt_sum
@@ -60,7 +58,8 @@ def aggregate_rent_roll(dfs: List[pd.DataFrame], fallback_pdf_paths: List[str] =
             text_df = parse_rent_roll_from_text(p)
             if not text_df.empty:
                 cand = text_df.copy()
-                cand["best_amount"] = cand["best_amount"].apply(lambda x: x if x and x > 1000 else None)
+                best = pd.to_numeric(cand["best_amount"], errors="coerce")
+                cand["best_amount"] = best.where(best > 1000)
                 total_units = len(cand)
                 current_rent_total = cand["best_amount"].dropna().sum() if "best_amount" in cand else None
                 return {
@@ -102,7 +101,8 @@ def aggregate_t12(dfs: List[pd.DataFrame], fallback_pdf_paths: List[str] = []) -
             merged.insert(0, "Item", merged.iloc[:, 0])
 
         item_col = _first_match(list(merged.columns), [r"item", r"account", r"category", r"description"]) or merged.columns[0]
-        num_cols = [c for c in merged.columns if merged[c].map(lambda v: _to_number(v) is not None).sum() > 0]
+        parsed = {c: _to_number_series(merged[c]) for c in merged.columns}
+        num_cols = [c for c in merged.columns if parsed[c].notna().any()]
         candidate_cols = [c for c in num_cols if re.search(r"(ttm|ytd|202|total|current|actual)", str(c).lower())]
         value_col = candidate_cols[-1] if candidate_cols else (num_cols[-1] if num_cols else None)
 
@@ -110,7 +110,7 @@ def aggregate_t12(dfs: List[pd.DataFrame], fallback_pdf_paths: List[str] = []) -
             if not value_col:
                 return None
             mask = merged[item_col].astype(str).str.lower().str.contains("|".join(patterns))
-            vals = merged.loc[mask, value_col].apply(_to_number).dropna()
+            vals = parsed[value_col][mask].dropna()
             return float(vals.sum()) if not vals.empty else None
 
         gpr = sum_like([r"gross.*potential.*rent", r"potential.*rent", r"gpr"])
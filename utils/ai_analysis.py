@@ -1,19 +1,14 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 import json
-from langchain_openai import ChatOpenAI
+from utils.ai_summary import _agenerate_text
+from utils.llm_clients import get_chat_model, run_async
 import os
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-def generate_underwriting_analysis(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, str]:
-    """
-    Use OpenAI to generate a professional underwriting analysis including:
-    1. Investment Recommendation
-    2. Key Investment Highlights
-    3. Risk Considerations
-    """
-    prompt = f"""
+def _analysis_prompt(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+    return f"""
 You are a real estate underwriting analyst. 
 
 Given the property narrative and financial metrics below, provide a structured professional underwriting analysis including:
@@ -35,15 +30,35 @@ Please respond in JSON format like:
   "risk_considerations": ["...","..."]
 }}
 """
+
+
+def _analysis_failure(message: str) -> Dict[str, Any]:
+    return {
+        "investment_recommendation": message,
+        "key_investment_highlights": [],
+        "risk_considerations": []
+    }
+
+
+def generate_underwriting_analysis(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Use OpenAI to generate a professional underwriting analysis including:
+    1. Investment Recommendation
+    2. Key Investment Highlights
+    3. Risk Considerations
+    Call from synchronous code; inside an event loop await agenerate_underwriting_analysis.
+    """
+    return run_async(agenerate_underwriting_analysis(narrative, metrics))
+
+
+async def agenerate_underwriting_analysis(
+    narrative: Dict[str, Any], metrics: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """Underwriting analysis as a dict; `on_token` receives the raw JSON text as it streams."""
+    prompt = _analysis_prompt(narrative, metrics)
     try:
-        chat = ChatOpenAI(model="gpt-4", temperature=0.3)
-        response = chat.invoke([{"role": "user", "content": prompt}])
-        # Ensure JSON parsing
-        analysis = json.loads(response.content)
-        return analysis
+        chat = get_chat_model("gpt-4", temperature=0.3)
+        text = await _agenerate_text(chat, [{"role": "user", "content": prompt}], on_token, validate=json.loads)
+        return json.loads(text)
     except Exception as e:
-        return {
-            "investment_recommendation": f"AI generation failed: {e}",
-            "key_investment_highlights": [],
-            "risk_considerations": []
-        }
\ No newline at end of file
+        return _analysis_failure(f"AI generation failed: {e}")
@@ -1,13 +1,27 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 import os
 import json
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from utils.llm_cache import acached_invoke
+from utils.llm_clients import get_chat_model, run_async
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-def generate_underwriting_summary(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
-    """Use OpenAI to generate a brief professional underwriting summary."""
-    prompt = f"""
+async def _agenerate_text(
+    chat: ChatOpenAI,
+    messages,
+    on_token: Optional[Callable[[str], None]] = None,
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Run a chat call through the LLM response cache; with `on_token`, stream it and hand every
+    token to the callback as it arrives (a cache hit arrives as one chunk).
+    """
+    return await acached_invoke(chat, messages, on_token, validate)
+
+
+def _summary_prompt(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+    return f"""
 You are a real estate underwriting analyst. 
 Given the following property narrative and financial metrics, create a concise, professional underwriting summary:
 
@@ -19,25 +33,10 @@ Metrics:
 
 Summary:
 """
-    try:
-        response = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.3,
-        )
-        messages=[{"role": "user", "content": prompt}]
-        response = response.invoke(messages)
-        summary = response.content.strip()
-        return summary
-    except Exception as e:
-        return f"AI summary generation failed: {e}"
-    
 
-def generate_executive_summary(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
-    """
-    Generate a short, professional Executive Summary focused on investment highlights,
-    property facts, and location advantages — distinct from the AI Summary.
-    """
-    prompt = f"""
+
+def _executive_summary_prompt(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+    return f"""
 You are a senior real estate investment analyst. 
 Write a **concise, bullet-style Executive Summary** (3–5 points max) for an investment memo based on this data.
 
@@ -57,13 +56,42 @@ Financial Metrics:
 
 Executive Summary:
 """
+
+
+def generate_underwriting_summary(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+    """Use OpenAI to generate a brief professional underwriting summary (from synchronous code)."""
+    return run_async(agenerate_underwriting_summary(narrative, metrics))
+
+
+async def agenerate_underwriting_summary(
+    narrative: Dict[str, Any], metrics: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """Brief professional underwriting summary; pass `on_token` to stream the text."""
+    prompt = _summary_prompt(narrative, metrics)
+    try:
+        chat = get_chat_model("gpt-4", temperature=0.3)
+        text = await _agenerate_text(chat, [{"role": "user", "content": prompt}], on_token)
+        return text.strip()
+    except Exception as e:
+        return f"AI summary generation failed: {e}"
+    
+
+def generate_executive_summary(narrative: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+    """
+    Generate a short, professional Executive Summary focused on investment highlights,
+    property facts, and location advantages — distinct from the AI Summary (from synchronous code).
+    """
+    return run_async(agenerate_executive_summary(narrative, metrics))
+
+
+async def agenerate_executive_summary(
+    narrative: Dict[str, Any], metrics: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """Short executive summary (see generate_executive_summary); pass `on_token` to stream the text."""
+    prompt = _executive_summary_prompt(narrative, metrics)
     try:
-        response = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.4,
-        )
-        messages = [{"role": "user", "content": prompt}]
-        result = response.invoke(messages)
-        return result.content.strip()
+        chat = get_chat_model("gpt-4", temperature=0.4)
+        text = await _agenerate_text(chat, [{"role": "user", "content": prompt}], on_token)
+        return text.strip()
     except Exception as e:
-        return f"Executive summary generation failed: {e}"
\ No newline at end of file
+        return f"Executive summary generation failed: {e}"
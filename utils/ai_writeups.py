@@ -0,0 +1,78 @@
+"""
+Runs the AI write-ups (underwriting summary, underwriting analysis and
+executive summary, or a subset) concurrently, each under its own deadline.
+
+A call that misses its deadline is replaced by a marked placeholder so the
+response still goes out; end-to-end latency is bounded by the slowest single
+call instead of the sum of all three.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from utils.ai_analysis import _analysis_failure, agenerate_underwriting_analysis
+from utils.ai_summary import agenerate_executive_summary, agenerate_underwriting_summary
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", "60"))
+
+WRITEUPS = {
+    "ai_summary": agenerate_underwriting_summary,
+    "ai_analysis": agenerate_underwriting_analysis,
+    "executive_summary": agenerate_executive_summary,
+}
+_LABELS = {"ai_summary": "AI summary", "ai_analysis": "AI analysis", "executive_summary": "Executive summary"}
+
+
+def _timed_out_value(name: str, timeout: float) -> Any:
+    message = f"{_LABELS.get(name, name)} generation timed out after {timeout:g}s"
+    return _analysis_failure(message) if name == "ai_analysis" else message
+
+
+async def _with_deadline(name: str, coro, timeout: float):
+    try:
+        return name, await asyncio.wait_for(coro, timeout=timeout), False
+    except asyncio.TimeoutError:
+        print(f"[WARN] {name} exceeded its {timeout:g}s deadline")
+        return name, _timed_out_value(name, timeout), True
+
+
+async def generate_ai_writeups(
+    narrative: Dict[str, Any],
+    metrics: Dict[str, Any],
+    timeouts: Optional[Dict[str, float]] = None,
+    on_token: Optional[Callable[[str, str], None]] = None,
+    names: Sequence[str] = WRITEUPS,
+) -> Dict[str, Any]:
+    """
+    Returns {<name>: write-up for each of `names` (default all WRITEUPS), "partial", "timed_out"}.
+    `timeouts` overrides the per-call deadline (seconds) by write-up name; default AI_CALL_TIMEOUT.
+    With `on_token(name, token)` the calls stream and every token is forwarded as it arrives.
+    """
+    timeouts = timeouts or {}
+
+    def _forward(name: str) -> Optional[Callable[[str], None]]:
+        return (lambda token: on_token(name, token)) if on_token else None
+
+    unknown = [name for name in names if name not in WRITEUPS]
+    if unknown:
+        raise ValueError(f"Unknown write-ups {unknown}; expected any of {list(WRITEUPS)}")
+    # Only the requested calls are created (and billed)
+    calls = {name: WRITEUPS[name](narrative, metrics, on_token=_forward(name)) for name in names}
+    results = await asyncio.gather(*[
+        _with_deadline(name, coro, timeouts.get(name, AI_CALL_TIMEOUT)) for name, coro in calls.items()
+    ])
+
+    out: Dict[str, Any] = {}
+    timed_out = []
+    for name, value, expired in results:
+        out[name] = value
+        if expired:
+            timed_out.append(name)
+    out["partial"] = bool(timed_out)
+    out["timed_out"] = timed_out
+    return out
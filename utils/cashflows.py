@@ -0,0 +1,190 @@
+"""
+Vectorized NPV / IRR / XIRR.
+
+`irr` and `xirr` accept a single cash-flow vector or a 2-D array with one
+scenario per row and solve the rows together (IRR_CHUNK_ROWS at a time): NPV is scanned over a grid of
+rates between -99.99% and 10000% for the sign change nearest the guess, then
+a bracketed (safeguarded) Newton iteration on log(1 + r) refines it: Newton
+steps are used while they stay inside the bracket and keep shrinking,
+bisection otherwise. Rows whose NPV never changes sign on the grid, or with
+no cash flows, come back as NaN.
+"""
+
+from datetime import date, datetime
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+IRR_LOWER = -0.9999
+IRR_UPPER = 100.0
+# Rates at which NPV is scanned for sign changes before Newton refines one cell; dense where
+# property-level IRRs live so nearby multiple roots (e.g. 10% and 20%) fall in separate cells
+SCAN_RATES = np.unique(np.concatenate([
+    [IRR_LOWER, -0.999, -0.99, -0.95, -0.9, -0.8, -0.7, -0.6, -0.5, -0.4, -0.3],
+    np.arange(-0.25, 0.5 + 1e-9, 0.025),
+    [0.6, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 25.0, 50.0, IRR_UPPER],
+]))
+DAYS_PER_YEAR = 365.0
+# Rows solved per pass: the scan holds a (rows, len(SCAN_RATES)) matrix and several same-sized masks
+IRR_CHUNK_ROWS = 32_768
+
+
+def _as_2d(cash_flows: ArrayLike) -> np.ndarray:
+    cf = np.asarray(cash_flows, dtype=float)
+    return cf[np.newaxis, :] if cf.ndim == 1 else cf
+
+
+def _npv_and_slope(log_growth: np.ndarray, cf: np.ndarray, times: np.ndarray):
+    """
+    NPV of each row at its own rate, given as log(1 + rate) with shape (n,), and the
+    derivative with respect to that log rate. `times` is (m,) or (n, m).
+    """
+    disc = np.exp(-times * log_growth[:, np.newaxis])
+    weighted = cf * disc
+    return weighted.sum(axis=1), -(times * weighted).sum(axis=1)
+
+
+def npv(rate: Union[float, ArrayLike], cash_flows: ArrayLike, times: Optional[ArrayLike] = None):
+    """
+    Net present value of each cash-flow row at `rate` (scalar or one rate per row).
+    `times` are period offsets in years (default 0, 1, 2, ...). Returns a float for 1-D input.
+    """
+    cf = _as_2d(cash_flows)
+    t = np.arange(cf.shape[1], dtype=float) if times is None else np.asarray(times, dtype=float)
+    rate = np.broadcast_to(np.asarray(rate, dtype=float), (cf.shape[0],))
+    value = _npv_and_slope(np.log1p(rate), cf, t)[0]
+    return float(value[0]) if np.ndim(cash_flows) == 1 else value
+
+
+def _scaled_npv_and_slope(log_growth: np.ndarray, cf: np.ndarray, times: np.ndarray):
+    """
+    `_npv_and_slope` times a positive per-row factor that keeps the largest discount factor at 1,
+    so long series at rates near -100% cannot overflow. Signs, roots and the Newton ratio
+    f / slope are unchanged. Also returns sum(|weighted cash flows|) as the row's NPV scale.
+    """
+    exponent = -times * log_growth[:, np.newaxis]
+    weighted = cf * np.exp(exponent - exponent.max(axis=1, keepdims=True))
+    return weighted.sum(axis=1), -(times * weighted).sum(axis=1), np.abs(weighted).sum(axis=1)
+
+
+def _scan(cf: np.ndarray, times: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Scaled NPV of every row at every log rate in `grid`, shape (n, len(grid))."""
+    if times.ndim == 1:
+        exponent = -np.outer(grid, times)
+        return cf @ np.exp(exponent - exponent.max(axis=1, keepdims=True)).T
+    return np.stack([_scaled_npv_and_slope(np.full(cf.shape[0], g), cf, times)[0] for g in grid], axis=1)
+
+
+def _solve_irr(cf: np.ndarray, times: np.ndarray, guess: float, tol: float, max_iter: int) -> np.ndarray:
+    """`_solve_rows` over IRR_CHUNK_ROWS rows at a time, so scan memory stays bounded for large batches."""
+    if cf.shape[0] <= IRR_CHUNK_ROWS:
+        return _solve_rows(cf, times, guess, tol, max_iter)
+    return np.concatenate([
+        _solve_rows(cf[s:s + IRR_CHUNK_ROWS], times if times.ndim == 1 else times[s:s + IRR_CHUNK_ROWS], guess, tol, max_iter)
+        for s in range(0, cf.shape[0], IRR_CHUNK_ROWS)
+    ])
+
+
+def _solve_rows(cf: np.ndarray, times: np.ndarray, guess: float, tol: float, max_iter: int) -> np.ndarray:
+    """
+    Solve for y = log(1 + irr) per row. NPV is first evaluated on SCAN_RATES plus the guess; the
+    sign-change cell nearest the guess becomes the row's bracket, so rows with several sign
+    changes, or whose NPV has the same sign at -99.99% and 10000%, still find a root. Inside
+    the bracket a Newton step is taken only if it stays in it and at least halves the previous
+    step; otherwise bisect. `times` is one (m,) vector shared by all rows, or (n, m).
+    """
+    n = cf.shape[0]
+    y0 = np.log1p(min(max(guess, IRR_LOWER), IRR_UPPER))
+    grid = np.unique(np.append(np.log1p(SCAN_RATES), y0))
+    scanned = _scan(cf, times, grid)
+    result = np.full(n, np.nan)
+    nonzero = np.any(cf != 0, axis=1)
+
+    # Cells with a strict sign change, and grid points that are exact roots; take whichever is nearest the guess
+    change = np.sign(scanned[:, :-1]) * np.sign(scanned[:, 1:]) < 0
+    cell_dist = np.where(change, np.abs(0.5 * (grid[:-1] + grid[1:]) - y0), np.inf)
+    exact_dist = np.where((scanned == 0) & nonzero[:, np.newaxis], np.abs(grid - y0), np.inf)
+    cell = cell_dist.argmin(axis=1)
+    exact = exact_dist.argmin(axis=1)
+    rows = np.arange(n)
+    on_grid = np.isfinite(exact_dist[rows, exact]) & (exact_dist[rows, exact] <= cell_dist[rows, cell])
+    result[on_grid] = grid[exact[on_grid]]
+    valid = nonzero & ~on_grid & np.isfinite(cell_dist[rows, cell])
+
+    # Work on compacted copies of the rows still iterating; converged rows are written out and dropped
+    idx = np.flatnonzero(valid)
+    cf, cell = cf[idx], cell[idx]
+    if times.ndim == 2:
+        times = times[idx]
+    lo, hi = grid[cell], grid[cell + 1]
+    f_lo = scanned[idx, cell]
+    y = 0.5 * (lo + hi)
+    prev_step = hi - lo
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        f, slope, scale = _scaled_npv_and_slope(y, cf, times)
+        at_root = np.abs(f) <= tol * scale
+
+        # Shrink the bracket around the root
+        same_as_lo = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same_as_lo, y, lo)
+        f_lo = np.where(same_as_lo, f, f_lo)
+        hi = np.where(same_as_lo, hi, y)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = y - f / slope
+        use_newton = (
+            np.isfinite(newton) & (newton >= lo) & (newton <= hi)
+            & (np.abs(newton - y) <= 0.5 * np.abs(prev_step))
+        )
+        y_new = np.where(use_newton, newton, 0.5 * (lo + hi))
+        prev_step = y_new - y
+
+        converged = at_root | (np.abs(prev_step) <= tol)
+        y = np.where(at_root, y, y_new)
+        result[idx[converged]] = y[converged]
+
+        keep = ~converged
+        idx, y, lo, hi, f_lo, prev_step, cf = (
+            idx[keep], y[keep], lo[keep], hi[keep], f_lo[keep], prev_step[keep], cf[keep]
+        )
+        if times.ndim == 2:
+            times = times[keep]
+
+    # Rows that ran out of iterations keep their best estimate
+    result[idx] = y
+    return np.expm1(result)
+
+
+def irr(cash_flows: ArrayLike, guess: float = 0.1, tol: float = 1e-10, max_iter: int = 100):
+    """
+    Periodic IRR (as a fraction) of one cash-flow vector, or of every row of a 2-D array.
+    Returns a float (NaN if unsolvable) for 1-D input, else an array of shape (n_rows,).
+    """
+    cf = _as_2d(cash_flows)
+    if cf.shape[1] == 0:
+        return float("nan") if np.ndim(cash_flows) == 1 else np.full(cf.shape[0], np.nan)
+    result = _solve_irr(cf, np.arange(cf.shape[1], dtype=float), guess, tol, max_iter)
+    return float(result[0]) if np.ndim(cash_flows) == 1 else result
+
+
+def _year_fractions(dates: Sequence[Union[date, datetime, np.datetime64, str]]) -> np.ndarray:
+    d = np.asarray(dates, dtype="datetime64[D]")
+    return (d - d[..., :1]).astype(float) / DAYS_PER_YEAR
+
+
+def xirr(cash_flows: ArrayLike, dates, guess: float = 0.1, tol: float = 1e-10, max_iter: int = 100):
+    """
+    IRR for irregularly dated cash flows (Actual/365 from the first date).
+    `dates` is one date vector shared by all rows, or one per row matching `cash_flows`.
+    """
+    cf = _as_2d(cash_flows)
+    times = _year_fractions(dates)
+    if times.ndim == 2:
+        times = np.broadcast_to(times, cf.shape)
+    result = _solve_irr(cf, times, guess, tol, max_iter)
+    return float(result[0]) if np.ndim(cash_flows) == 1 else result
@@ -0,0 +1,172 @@
+"""
+Token-budgeted context assembly for the narrative extraction prompt.
+
+Similarity search over table-heavy OMs tends to return several overlapping
+rent-roll fragments. `build_context` takes the retrieved chunks (best first),
+drops near-duplicates, reorders the rest MMR-style - retrieval rank and
+coverage of the requested fields against overlap with what is already picked -
+and packs them into NARRATIVE_CONTEXT_TOKENS, truncating the last chunk that
+only partly fits. The returned stats say how many tokens that saved compared
+with pasting every retrieved chunk verbatim.
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+NARRATIVE_CONTEXT_TOKENS = int(os.getenv("NARRATIVE_CONTEXT_TOKENS", "1500"))
+NARRATIVE_CANDIDATES = int(os.getenv("NARRATIVE_CANDIDATES", "12"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.5"))
+CONTEXT_MIN_TRUNCATED_TOKENS = 64  # a tail shorter than this isn't worth including
+CHARS_PER_TOKEN = 4  # estimate used when no tiktoken encoding is available
+
+CHUNK_SEPARATOR = "\n\n"
+
+# Loose cues that a chunk talks about a field (the strict patterns live in field_extraction)
+FIELD_HINTS: Dict[str, re.Pattern] = {
+    "purchase_price": re.compile(r"\b(?:price|offered at|asking|valuation)\b|\$\s*\d[\d,.]*\s*(?:million|mm)\b", re.I),
+    "property_name": re.compile(r"\b(?:property name|the property|offering memorandum)\b", re.I),
+    "property_address": re.compile(r"\b(?:address|located at|street|avenue|blvd|road)\b|\b[A-Z]{2}\s+\d{5}\b"),
+    "property_type": re.compile(r"\b(?:property type|office|multifamily|apartment|retail|industrial|warehouse|mixed-use)\b", re.I),
+    "year_built": re.compile(r"\b(?:year built|built in|constructed|completed in)\b", re.I),
+    "renovation_year": re.compile(r"\b(?:renovat\w*|remodel\w*|refurbish\w*|repositioned)\b", re.I),
+    "number_of_stories": re.compile(r"\b(?:stor(?:y|ies)|floors)\b", re.I),
+    "total_units_or_suites": re.compile(r"\b(?:units|suites|unit mix|apartment homes|doors)\b", re.I),
+    "total_building_sqft": re.compile(r"\b(?:square feet|sq\.?\s*ft|rsf|nra|gla|rentable area|building size)\b", re.I),
+    "amenities": re.compile(r"\b(?:amenit\w*|fitness|pool|clubhouse|parking|lounge)\b", re.I),
+}
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model or "gpt-4o-mini")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"⚠️ tiktoken unavailable ({e}); estimating {CHARS_PER_TOKEN} characters per token")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    enc = _encoding(model)
+    if enc is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _shingles(text: str, size: int = 3) -> FrozenSet[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _overlap(a: FrozenSet, b: FrozenSet) -> float:
+    """Share of the smaller shingle set found in the other, so a fragment of a longer chunk counts as a duplicate."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def build_context(
+    docs: Sequence[Any],
+    fields: Optional[Sequence[str]] = None,
+    max_tokens: Optional[int] = None,
+    model: Optional[str] = None,
+    lambda_mult: Optional[float] = None,
+    dedup_threshold: Optional[float] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Assemble the prompt context from retrieved `docs` (ordered best first) for `fields`
+    (default: every field in FIELD_HINTS; pass [] to rank on relevance and redundancy alone).
+    Returns (context, stats); stats hold candidate / duplicate / selected counts, the fields the
+    context has cues for, and retrieved_tokens, context_tokens and tokens_saved.
+    """
+    budget = NARRATIVE_CONTEXT_TOKENS if max_tokens is None else max_tokens
+    lam = CONTEXT_MMR_LAMBDA if lambda_mult is None else lambda_mult
+    threshold = CONTEXT_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+    fields = list(FIELD_HINTS) if fields is None else list(fields)
+
+    texts = [d.page_content.strip() for d in docs if (d.page_content or "").strip()]
+    retrieved_tokens = sum(count_tokens(t, model) for t in texts) + max(len(texts) - 1, 0) * count_tokens(CHUNK_SEPARATOR, model)
+
+    # 1. Near-duplicate removal, keeping the better-ranked copy
+    candidates: List[Dict[str, Any]] = []
+    duplicates = 0
+    for rank, text in enumerate(texts):
+        shingles = _shingles(text)
+        if any(_overlap(shingles, c["shingles"]) >= threshold for c in candidates):
+            duplicates += 1
+            continue
+        covers = {f for f in fields if f in FIELD_HINTS and FIELD_HINTS[f].search(text)}
+        candidates.append({
+            "text": text, "shingles": shingles, "covers": covers,
+            "relevance": 1.0 - rank / max(len(texts), 1),
+        })
+
+    # 2. MMR: relevance and new field coverage against redundancy with the chunks already picked
+    ordered: List[Dict[str, Any]] = []
+    covered: set = set()
+    pool = list(candidates)
+    while pool:
+        def score(c):
+            gain = len(c["covers"] - covered) / max(len(fields), 1)
+            redundancy = max((_overlap(c["shingles"], p["shingles"]) for p in ordered), default=0.0)
+            return lam * c["relevance"] + (1 - lam) * (gain - redundancy)
+
+        best = max(pool, key=score)
+        pool.remove(best)
+        ordered.append(best)
+        covered |= best["covers"]
+
+    # 3. Pack into the token budget
+    parts: List[str] = []
+    used = 0
+    sep_tokens = count_tokens(CHUNK_SEPARATOR, model)
+    covered = set()
+    for c in ordered:
+        cost = count_tokens(c["text"], model) + (sep_tokens if parts else 0)
+        remaining = budget - used
+        if cost <= remaining:
+            parts.append(c["text"])
+            used += cost
+            covered |= c["covers"]
+            continue
+        room = remaining - (sep_tokens if parts else 0)
+        if room >= CONTEXT_MIN_TRUNCATED_TOKENS:
+            parts.append(truncate_to_tokens(c["text"], room, model))
+            used += count_tokens(parts[-1], model) + (sep_tokens if len(parts) > 1 else 0)
+            covered |= {f for f in c["covers"] if FIELD_HINTS[f].search(parts[-1])}
+        break
+
+    context = CHUNK_SEPARATOR.join(parts)
+    context_tokens = count_tokens(context, model) if context else 0
+    stats = {
+        "candidates": len(texts),
+        "duplicates_dropped": duplicates,
+        "selected": len(parts),
+        "fields_with_context": sorted(covered),
+        "token_budget": budget,
+        "retrieved_tokens": retrieved_tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": max(retrieved_tokens - context_tokens, 0),
+    }
+    return context, stats
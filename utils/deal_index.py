@@ -0,0 +1,293 @@
+"""
+Per-deal FAISS indexes for follow-up questions.
+
+Every underwrite gets a deal id. `save_deal_index` writes the deal's chunks
+(chunks.json, in index order) and, when one was built, the FAISS index
+(index.faiss) to DEAL_INDEX_DIR/<deal_id>/. Deals whose narrative fields were
+all resolved from page text never embedded anything; for those only the
+chunks are stored and the index is built (through the embedding cache) and
+saved on the first question.
+
+`aask_deal` answers a question with one similarity search and one LLM call.
+Indexes are opened memory-mapped and the DEAL_INDEX_HOT most recently used
+ones stay loaded.
+
+Saved deals are swept at most every DEAL_INDEX_SWEEP_SECONDS: deals not
+saved or opened for DEAL_INDEX_TTL_SECONDS are deleted, then the least
+recently used ones until the directory fits in DEAL_INDEX_MAX_BYTES.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import faiss
+from dotenv import load_dotenv
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_core.documents import Document
+
+from utils.context_builder import NARRATIVE_CANDIDATES, build_context
+from utils.embedding_cache import CachedEmbeddings
+from utils.executors import run_io
+from utils.llm_cache import acached_invoke
+from utils.llm_clients import get_chat_model, get_embeddings
+from utils.rag_narrative import EMBED_MODEL, LLM_MODEL, abuild_vectorstore
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+DEAL_INDEX_DIR = os.getenv("DEAL_INDEX_DIR", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "deals"))
+DEAL_INDEX_HOT = int(os.getenv("DEAL_INDEX_HOT", "8"))
+ASK_CONTEXT_TOKENS = int(os.getenv("ASK_CONTEXT_TOKENS", "2000"))
+DEAL_INDEX_TTL_SECONDS = float(os.getenv("DEAL_INDEX_TTL_SECONDS", str(30 * 24 * 3600)))
+DEAL_INDEX_MAX_BYTES = int(os.getenv("DEAL_INDEX_MAX_BYTES", str(2 * 1024 ** 3)))
+DEAL_INDEX_SWEEP_SECONDS = float(os.getenv("DEAL_INDEX_SWEEP_SECONDS", "600"))
+
+_DEAL_ID = re.compile(r"^[0-9a-f]{32}$")
+_INDEX_FILE = "index.faiss"
+_CHUNKS_FILE = "chunks.json"
+_META_FILE = "meta.json"
+
+ASK_SYSTEM_PROMPT = (
+    "You answer questions about a commercial real estate deal using ONLY the provided excerpts "
+    "from its offering memorandum, rent roll and T12. Be concise and quote figures exactly. "
+    "If the excerpts don't contain the answer, say so."
+)
+
+
+class DealNotFound(KeyError):
+    """Raised when no persisted chunks exist for a deal id."""
+
+
+def _write_json(path: str, payload: Any) -> None:
+    # Atomic replace so a concurrent reader never sees a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, default=str)
+    os.replace(tmp, path)
+
+
+def _write_index(index, path: str) -> None:
+    tmp = path + ".tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, path)
+
+
+def _indexed_docs(vs: FAISS) -> List[Document]:
+    """The store's documents in FAISS row order, so row i of index.faiss is chunks[i]."""
+    return [vs.docstore.search(vs.index_to_docstore_id[i]) for i in range(vs.index.ntotal)]
+
+
+class DealIndexStore:
+    """On-disk deal indexes with an in-memory LRU of the hot ones and TTL / size-capped cleanup."""
+
+    def __init__(
+        self,
+        root: str = DEAL_INDEX_DIR,
+        hot: int = DEAL_INDEX_HOT,
+        ttl: float = DEAL_INDEX_TTL_SECONDS,
+        max_bytes: int = DEAL_INDEX_MAX_BYTES,
+        sweep_interval: float = DEAL_INDEX_SWEEP_SECONDS,
+    ):
+        self.root = root
+        self.hot = hot
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, FAISS]" = OrderedDict()
+        # One loader per deal, so concurrent first questions don't each build and save the index
+        self._loading: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._last_sweep = 0.0
+
+    def _dir(self, deal_id: str) -> str:
+        # Deal ids are uuid4 hex, which also keeps them from escaping the root directory
+        if not _DEAL_ID.match(deal_id or ""):
+            raise DealNotFound(deal_id)
+        return os.path.join(self.root, deal_id)
+
+    def _remember(self, deal_id: str, vs: FAISS) -> None:
+        with self._lock:
+            self._loaded[deal_id] = vs
+            self._loaded.move_to_end(deal_id)
+            while len(self._loaded) > self.hot:
+                self._loaded.popitem(last=False)
+
+    def _hot(self, deal_id: str) -> Optional[FAISS]:
+        with self._lock:
+            vs = self._loaded.get(deal_id)
+            if vs is not None:
+                self._loaded.move_to_end(deal_id)
+            return vs
+
+    def save(self, deal_id: str, docs: List[Document], vs: Optional[FAISS] = None) -> None:
+        """Persist the deal's chunks, plus the index if one was built. Blocking; call through run_io."""
+        path = self._dir(deal_id)
+        os.makedirs(path, exist_ok=True)
+        if vs is not None:
+            docs = _indexed_docs(vs)
+            _write_index(vs.index, os.path.join(path, _INDEX_FILE))
+        chunks = [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+        _write_json(os.path.join(path, _CHUNKS_FILE), chunks)
+        _write_json(os.path.join(path, _META_FILE), {
+            "deal_id": deal_id,
+            "embed_model": EMBED_MODEL,
+            "chunks": len(chunks),
+            "indexed": vs is not None,
+            "saved_at": time.time(),
+        })
+        if vs is not None:
+            self._remember(deal_id, vs)
+        self.maybe_evict()
+
+    def _load(self, deal_id: str):
+        """(chunks, memory-mapped FAISS or None if no index was saved). Blocking; call through run_io."""
+        path = self._dir(deal_id)
+        try:
+            with open(os.path.join(path, _CHUNKS_FILE), encoding="utf-8") as fh:
+                docs = [Document(page_content=c["page_content"], metadata=c["metadata"]) for c in json.load(fh)]
+        except FileNotFoundError:
+            raise DealNotFound(deal_id)
+        # meta.json's mtime is the deal's last use for eviction
+        os.utime(os.path.join(path, _META_FILE))
+        index_path = os.path.join(path, _INDEX_FILE)
+        if not os.path.exists(index_path):
+            return docs, None
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        ids = [str(i) for i in range(len(docs))]
+        vs = FAISS(
+            CachedEmbeddings(get_embeddings(EMBED_MODEL), EMBED_MODEL),
+            index,
+            InMemoryDocstore(dict(zip(ids, docs))),
+            dict(enumerate(ids)),
+        )
+        return docs, vs
+
+    async def aget(self, deal_id: str) -> FAISS:
+        """The deal's vectorstore: from memory, memory-mapped from disk, or built from the saved chunks."""
+        vs = self._hot(deal_id)
+        if vs is not None:
+            return vs
+        self._dir(deal_id)
+        with self._lock:
+            loading = self._loading.get(deal_id)
+            if loading is None:
+                loading = self._loading[deal_id] = asyncio.Lock()
+        async with loading:
+            vs = self._hot(deal_id)  # loaded by a concurrent request while this one waited
+            if vs is not None:
+                return vs
+            docs, vs = await run_io(self._load, deal_id)
+            if vs is None:
+                # Narrative fields were resolved without embeddings: build the index now, once
+                logging.info(f"🧱 Building index for deal {deal_id} on first question ({len(docs)} chunks)")
+                vs = await abuild_vectorstore(docs)
+                if vs is None:
+                    raise DealNotFound(deal_id)
+                await run_io(self.save, deal_id, docs, vs)
+            self._remember(deal_id, vs)
+            return vs
+
+    def maybe_evict(self) -> int:
+        """Run `evict` if the last sweep was more than sweep_interval ago."""
+        with self._lock:
+            now = time.time()
+            if now - self._last_sweep < self.sweep_interval:
+                return 0
+            self._last_sweep = now
+        return self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete deals last saved or opened more than `ttl` ago, then the least recently used ones
+        until the stored deals fit in `max_bytes`. Deals loaded in memory are kept. Returns deals removed.
+        """
+        now = time.time()
+        deals = []
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not (entry.is_dir() and _DEAL_ID.match(entry.name)):
+                continue
+            try:
+                files = [f.stat() for f in os.scandir(entry.path) if f.is_file()]
+            except FileNotFoundError:
+                continue
+            last_used = max((st.st_mtime for st in files), default=0.0)
+            deals.append((last_used, entry.name, sum(st.st_size for st in files)))
+        deals.sort()
+
+        with self._lock:
+            hot = set(self._loaded)
+        total = sum(size for _, _, size in deals)
+        doomed, freed = [], 0
+        for last_used, deal_id, size in deals:
+            if deal_id in hot:
+                continue
+            if now - last_used > self.ttl or total - freed > self.max_bytes:
+                doomed.append(deal_id)
+                freed += size
+        for deal_id in doomed:
+            shutil.rmtree(os.path.join(self.root, deal_id), ignore_errors=True)
+        if doomed:
+            logging.info(f"🧹 Removed {len(doomed)} saved deal indexes ({freed:,} bytes)")
+        return len(doomed)
+
+
+_STORE: Optional[DealIndexStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_deal_index_store() -> DealIndexStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = DealIndexStore()
+        return _STORE
+
+
+def save_deal_index(deal_id: str, docs: List[Document], vs: Optional[FAISS] = None) -> None:
+    get_deal_index_store().save(deal_id, docs, vs)
+
+
+async def aask_deal(deal_id: str, question: str) -> Dict[str, Any]:
+    """Answer `question` from the deal's own documents: one similarity search, one LLM call."""
+    question = (question or "").strip()
+    if not question:
+        raise ValueError("question must not be empty")
+    vs = await get_deal_index_store().aget(deal_id)
+    hits = await vs.asimilarity_search(question, k=NARRATIVE_CANDIDATES)
+    context, stats = build_context(hits, fields=[], max_tokens=ASK_CONTEXT_TOKENS, model=LLM_MODEL)
+
+    chat = get_chat_model(LLM_MODEL, temperature=0)
+    messages = [
+        {"role": "system", "content": ASK_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Excerpts:\n{context}\n\nQuestion: {question}"},
+    ]
+    answer = await acached_invoke(chat, messages)
+    return {
+        "deal_id": deal_id,
+        "question": question,
+        "answer": answer.strip(),
+        # Uploads live in a temp dir that is gone by now, so only the file name is meaningful
+        "sources": [
+            {
+                "file": os.path.basename(str(h.metadata.get("source") or "")) or None,
+                "page": h.metadata.get("page"),
+                "chunk_id": h.metadata.get("chunk_id"),
+            }
+            for h in hits
+        ],
+        "context": stats,
+    }
@@ -0,0 +1,109 @@
+"""
+Opt-in, per-job sink for parser debug artifacts.
+
+Parsers call `record_artifact(name, rows)` with intermediate candidate
+tables. Outside an enabled `debug_artifacts_scope()` that is a no-op, so
+production pays one ContextVar lookup. When DEBUG_ARTIFACTS is on and the job
+is sampled (DEBUG_ARTIFACTS_SAMPLE_RATE), each artifact is handed to a single
+background writer thread and stored as gzipped JSON lines under
+DEBUG_ARTIFACTS_DIR/<job_id>/<seq>_<name>.jsonl.gz. Every job has its own
+directory and every artifact its own file, so concurrent jobs never
+overwrite each other.
+"""
+
+import gzip
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+DEBUG_ARTIFACTS = os.getenv("DEBUG_ARTIFACTS", "0").lower() in ("1", "true", "yes")
+DEBUG_ARTIFACTS_DIR = os.getenv(
+    "DEBUG_ARTIFACTS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "debug")
+)
+DEBUG_ARTIFACTS_SAMPLE_RATE = float(os.getenv("DEBUG_ARTIFACTS_SAMPLE_RATE", "1.0"))
+
+Rows = Union[pd.DataFrame, Iterable[Dict[str, Any]]]
+
+_WRITER: Optional[ThreadPoolExecutor] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def _writer() -> ThreadPoolExecutor:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-artifacts")
+        return _WRITER
+
+
+def _write(path: str, records: List[Dict[str, Any]]) -> None:
+    try:
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, default=str) + "\n")
+        os.replace(tmp, path)
+    except Exception as e:
+        logging.warning(f"⚠️ Could not write debug artifact {path}: {e}")
+
+
+class ArtifactSink:
+    """Writes one job's artifacts to its own directory, off the calling thread."""
+
+    def __init__(self, job_id: str, root: str = DEBUG_ARTIFACTS_DIR):
+        self.job_id = job_id
+        self.directory = os.path.join(root, job_id)
+        self._seq = itertools.count(1)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def record(self, name: str, rows: Rows):
+        safe = re.sub(r"[^\w.-]+", "_", name)
+        path = os.path.join(self.directory, f"{next(self._seq):03d}_{safe}.jsonl.gz")
+        # Snapshot now (the caller may keep mutating its objects); serialize and write in the background
+        records = rows.to_dict("records") if isinstance(rows, pd.DataFrame) else [dict(r) for r in rows]
+        return _writer().submit(_write, path, records)
+
+
+_ACTIVE_SINK: ContextVar[Optional[ArtifactSink]] = ContextVar("debug_artifact_sink", default=None)
+
+
+@contextmanager
+def debug_artifacts_scope(job_id: Optional[str] = None, enabled: Optional[bool] = None, sample_rate: Optional[float] = None):
+    """
+    Collect artifacts recorded inside this block under `job_id` (a fresh id if omitted), provided
+    debugging is enabled and this job falls within the sample. Yields the sink, or None when off.
+    """
+    enabled = DEBUG_ARTIFACTS if enabled is None else enabled
+    rate = DEBUG_ARTIFACTS_SAMPLE_RATE if sample_rate is None else sample_rate
+    sink = None
+    if enabled and random.random() < rate:
+        try:
+            sink = ArtifactSink(re.sub(r"[^\w.-]+", "_", job_id or uuid.uuid4().hex))
+        except OSError as e:
+            logging.warning(f"⚠️ Debug artifacts disabled for this job: {e}")
+    token = _ACTIVE_SINK.set(sink)
+    try:
+        yield sink
+    finally:
+        _ACTIVE_SINK.reset(token)
+
+
+def record_artifact(name: str, rows: Rows) -> None:
+    """Hand `rows` to the active job's sink; does nothing when no sink is active."""
+    sink = _ACTIVE_SINK.get()
+    if sink is not None:
+        sink.record(name, rows)
@@ -0,0 +1,156 @@
+"""
+Local SQLite cache for embedding vectors.
+
+Vectors are keyed by a hash of the embedding model name and the exact chunk
+text and stored as float32 blobs. Only cache misses are sent to the API.
+Once the stored vectors exceed EMBED_CACHE_MAX_BYTES the least recently used
+rows are evicted.
+"""
+
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from utils.executors import run_io
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "embeddings.sqlite3")
+)
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed map of hash(model, text) -> float32 vector with size-based LRU eviction."""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_bytes: int = EMBED_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors aligned with `texts` (None for misses) and refresh their access time."""
+        keys = [embedding_key(model, t) for t in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? WHERE key IN ({marks})", [time.time(), *batch]
+                    )
+        return [np.frombuffer(found[k], dtype=np.float32).tolist() if k in found else None for k in keys]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        now = time.time()
+        rows = []
+        for text, vec in zip(texts, vectors):
+            blob = np.asarray(vec, dtype=np.float32).tobytes()
+            rows.append((embedding_key(model, text), blob, len(blob), now))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used rows until stored vectors fit in `max_bytes`. Returns rows removed."""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            excess = total - self.max_bytes
+            doomed, freed = [], 0
+            for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_access"):
+                if freed >= excess:
+                    break
+                doomed.append((key,))
+                freed += nbytes
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        logging.info(f"🧹 Evicted {len(doomed)} cached embeddings ({freed:,} bytes)")
+        return len(doomed)
+
+
+_CACHE: Optional[EmbeddingCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance, or None when EMBED_CACHE_ENABLED is off or the file can't be opened."""
+    global _CACHE
+    if not EMBED_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                _CACHE = EmbeddingCache()
+            except Exception as e:
+                logging.warning(f"⚠️ Embedding cache unavailable at {EMBED_CACHE_PATH}: {e}")
+                return None
+        return _CACHE
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeat texts from the local cache and embeds only misses."""
+
+    def __init__(self, underlying: Embeddings, model: str, cache: Optional[EmbeddingCache] = None):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache if cache is not None else get_embedding_cache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.underlying.embed_documents(texts)
+        vectors = self.cache.get_many(self.model, texts)
+        misses = [i for i, v in enumerate(vectors) if v is None]
+        if misses:
+            fresh = self.underlying.embed_documents([texts[i] for i in misses])
+            self.cache.put_many(self.model, [texts[i] for i in misses], fresh)
+            for i, vec in zip(misses, fresh):
+                vectors[i] = vec
+        logging.info(f"🧮 Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return await self.underlying.aembed_documents(texts)
+        # SQLite calls block, so they run on the I/O pool rather than the event loop
+        vectors = await run_io(self.cache.get_many, self.model, texts)
+        misses = [i for i, v in enumerate(vectors) if v is None]
+        if misses:
+            fresh = await self.underlying.aembed_documents([texts[i] for i in misses])
+            await run_io(self.cache.put_many, self.model, [texts[i] for i in misses], fresh)
+            for i, vec in zip(misses, fresh):
+                vectors[i] = vec
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
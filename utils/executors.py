@@ -0,0 +1,123 @@
+"""
+Shared worker pools that keep heavy pipeline work off the FastAPI event loop.
+
+CPU-bound parsing (PDF loaders, pdfplumber tables, OCR, aggregation) goes to
+a process pool via `run_cpu`; blocking I/O (synchronous OpenAI / Supabase
+clients) goes to a thread pool via `run_io`. Each pool admits at most
+PIPELINE_MAX_PENDING calls; beyond that callers get `ExecutorSaturated`
+straight away (mapped to HTTP 503) and are not queued without bound. Process
+workers run OCR serially, since the pool already uses every core.
+"""
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+PIPELINE_PROCESS_WORKERS = int(os.getenv("PIPELINE_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+PIPELINE_THREAD_WORKERS = int(os.getenv("PIPELINE_THREAD_WORKERS", "16"))
+PIPELINE_MAX_PENDING = int(os.getenv("PIPELINE_MAX_PENDING", "32"))
+# "spawn" avoids forking a process that already runs uvicorn/HTTP client threads
+PIPELINE_MP_START = os.getenv("PIPELINE_MP_START", "spawn")
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool already has PIPELINE_MAX_PENDING calls queued or running."""
+
+    status_code = 503
+
+
+def _init_cpu_worker() -> None:
+    # The pool already runs one parse per core; a per-worker OCR pool on top would mean ~cores² processes
+    os.environ["OCR_WORKERS"] = "1"
+    loaders = sys.modules.get("utils.file_loaders")  # already imported when the pool forks
+    if loaders is not None:
+        loaders.OCR_WORKERS = 1
+
+
+class _BoundedPool:
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorSaturated(f"{self.name} pool is busy ({self._pending} calls pending); retry shortly")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_CPU_POOL = _BoundedPool(
+    "cpu",
+    lambda: ProcessPoolExecutor(
+        max_workers=PIPELINE_PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context(PIPELINE_MP_START),
+        initializer=_init_cpu_worker,
+    ),
+    PIPELINE_MAX_PENDING,
+)
+_IO_POOL = _BoundedPool(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=PIPELINE_THREAD_WORKERS, thread_name_prefix="pipeline-io"),
+    PIPELINE_MAX_PENDING,
+)
+
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a picklable, module-level `fn` in the process pool. Arguments and result must be picklable."""
+    return await _CPU_POOL.run(fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking `fn` in the thread pool, carrying the caller's contextvars along."""
+    ctx = contextvars.copy_context()
+    return await _IO_POOL.run(ctx.run, fn, *args, **kwargs)
+
+
+def pool_stats() -> dict:
+    return {
+        "cpu_pending": _CPU_POOL.pending,
+        "io_pending": _IO_POOL.pending,
+        "max_pending": PIPELINE_MAX_PENDING,
+    }
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    _CPU_POOL.shutdown(wait=wait)
+    _IO_POOL.shutdown(wait=wait)
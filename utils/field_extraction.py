@@ -0,0 +1,253 @@
+"""
+Deterministic narrative field extraction.
+
+Offering memoranda usually state the year built, building SF, unit count,
+address and so on verbatim. `extract_fields_deterministic` runs labelled and
+phrase regexes over the narrative (non-table) page text and scores every
+field: each pattern carries a base confidence, discounted by how much the
+matches disagree with each other. A labelled match ("Year Built: 1998") is
+enough on its own; an unlabelled phrase ("completed in 2019") only clears
+FIELD_MIN_CONFIDENCE when the same value is found again elsewhere.
+`resolve_fields` keeps the fields at or above the threshold, formatted as
+strings like the LLM extractor returns them, and lists the rest, so the
+RAG/LLM extractor only has to look for those (and is skipped entirely when
+nothing is left).
+"""
+
+import os
+import re
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+FIELD_MIN_CONFIDENCE = float(os.getenv("FIELD_MIN_CONFIDENCE", "0.8"))
+
+# Base confidences. A phrase match sits below FIELD_MIN_CONFIDENCE and reaches it only with the
+# corroboration bonus (the same value found at more than one place in the text)
+LABELLED_CONFIDENCE = 0.95
+PHRASE_CONFIDENCE = 0.75
+CORROBORATION_BONUS = 0.05
+
+NARRATIVE_FIELDS = [
+    "purchase_price",
+    "property_name",
+    "property_address",
+    "property_type",
+    "year_built",
+    "renovation_year",
+    "number_of_stories",
+    "total_units_or_suites",
+    "total_building_sqft",
+    "amenities",
+]
+
+_WORD_NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_PROPERTY_TYPES = {
+    "office": "Office", "medical office": "Medical Office", "multifamily": "Multifamily",
+    "apartment": "Multifamily", "retail": "Retail", "industrial": "Industrial", "warehouse": "Industrial",
+    "flex": "Flex", "mixed-use": "Mixed-Use", "self-storage": "Self-Storage", "hotel": "Hospitality",
+}
+_TYPE_WORDS = r"medical\s+office|office|multifamily|apartment|retail|industrial|warehouse|flex|mixed-use|self-storage|hotel"
+_SQFT_UNIT = r"(?:sf|rsf|square\s*feet|sq\.?\s*ft\.?)"
+_NUMBER = r"(\d{1,3}(?:,\d{3})+|\d{3,8})"
+_STREET = (
+    r"\d{1,6}\s+(?:[A-Z0-9][\w.'-]*\s+){1,6}?"
+    r"(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Parkway|Pkwy|Court|Ct|Place|Pl|"
+    r"Highway|Hwy|Circle|Cir|Terrace|Trail|Plaza|Square|Sq)\.?"
+    r"(?:,?\s+(?:Suite|Ste\.?|#)\s*\w+)?,\s*(?:[A-Z][A-Za-z.'-]*\s?){1,4},\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?"
+)
+
+
+def _year(text: str) -> Optional[int]:
+    year = int(text)
+    return year if 1800 <= year <= date.today().year + 3 else None
+
+
+def _count(text: str) -> Optional[int]:
+    text = text.lower().strip()
+    value = _WORD_NUMBERS.get(text)
+    if value is None:
+        value = int(text.replace(",", ""))
+    return value if value > 0 else None
+
+
+def _sqft(text: str) -> Optional[int]:
+    value = int(text.replace(",", ""))
+    return value if 500 <= value <= 50_000_000 else None
+
+
+def _price(text: str, scale: Optional[str]) -> Optional[float]:
+    value = float(text.replace(",", ""))
+    if scale:
+        value *= 1_000_000
+    return value if value >= 100_000 else None
+
+
+def _clean_text(text: str) -> Optional[str]:
+    text = re.sub(r"\s+", " ", text).strip(" .,;:-")
+    return text or None
+
+
+def _property_type(text: str) -> Optional[str]:
+    return _PROPERTY_TYPES.get(re.sub(r"\s+", " ", text.lower().strip()), _clean_text(text.title()))
+
+
+def _amenities(text: str) -> Optional[List[str]]:
+    parts = re.split(r",\s*(?:and\s+)?|\s+and\s+", re.sub(r"\s+", " ", text))
+    items = [re.sub(r"^(?:an?|the)\s+", "", p.strip(), flags=re.I) for p in parts]
+    items = [i for i in items if 2 < len(i) < 60]
+    return items or None
+
+
+# field -> [(pattern, base confidence, parser(match) -> value or None)]
+_Rule = Tuple[re.Pattern, float, Callable[[re.Match], Any]]
+_RULES: Dict[str, List[_Rule]] = {
+    "year_built": [
+        (re.compile(r"year\s*built\s*[:\-]?\s*((?:18|19|20)\d{2})\b", re.I), LABELLED_CONFIDENCE, lambda m: _year(m.group(1))),
+        (re.compile(r"\b(?:built|constructed|completed|developed)\s+(?:in\s+)?(?:circa\s+)?((?:18|19|20)\d{2})\b", re.I),
+         PHRASE_CONFIDENCE, lambda m: _year(m.group(1))),
+    ],
+    "renovation_year": [
+        (re.compile(r"(?:year\s*renovated|renovation\s*year|last\s*renovated)\s*[:\-]?\s*((?:19|20)\d{2})\b", re.I),
+         LABELLED_CONFIDENCE, lambda m: _year(m.group(1))),
+        (re.compile(r"\b(?:renovated|remodeled|repositioned|refurbished)\s+(?:in\s+)?((?:19|20)\d{2})\b", re.I),
+         PHRASE_CONFIDENCE, lambda m: _year(m.group(1))),
+    ],
+    "total_building_sqft": [
+        (re.compile(r"(?:building\s*(?:size|area|sf)|(?:net\s*)?rentable\s*(?:area|sf)|\bnra\b|\bgla\b|gross\s*leasable\s*area)"
+                    rf"\s*[:\-]?\s*{_NUMBER}(?:\s*{_SQFT_UNIT})?", re.I), LABELLED_CONFIDENCE, lambda m: _sqft(m.group(1))),
+        (re.compile(r"\b(?:contains|containing|totaling|totals|comprising|comprises|consisting\s+of)\s+"
+                    rf"(?:approximately\s+|approx\.\s+|roughly\s+)?{_NUMBER}\s*(?:rentable\s+|gross\s+)?{_SQFT_UNIT}", re.I),
+         PHRASE_CONFIDENCE, lambda m: _sqft(m.group(1))),
+    ],
+    "total_units_or_suites": [
+        (re.compile(r"(?:total\s*|number\s*of\s*)(?:units|suites)\s*[:\-]\s*(\d{1,3}(?:,\d{3})*)\b", re.I),
+         LABELLED_CONFIDENCE, lambda m: _count(m.group(1))),
+        (re.compile(r"\b(\d{1,3}(?:,\d{3})*)\s+(?:residential\s+|apartment\s+|office\s+|retail\s+)?"
+                    r"(?:units|suites|apartment\s+homes|doors|keys)\b", re.I), PHRASE_CONFIDENCE, lambda m: _count(m.group(1))),
+    ],
+    "number_of_stories": [
+        (re.compile(r"(?:number\s*of\s*)?(?:stories|floors)\s*[:\-]\s*(\d{1,3})\b", re.I),
+         LABELLED_CONFIDENCE, lambda m: _count(m.group(1))),
+        (re.compile(r"\b(\d{1,3}|" + "|".join(_WORD_NUMBERS) + r")[ -]+stor(?:y|ies)\b", re.I),
+         PHRASE_CONFIDENCE, lambda m: _count(m.group(1))),
+    ],
+    "property_address": [
+        (re.compile(r"(?i:(?:property\s*)?address)\s*[:\-]\s*(" + _STREET + ")"),
+         LABELLED_CONFIDENCE, lambda m: _clean_text(m.group(1))),
+        (re.compile("(" + _STREET + ")"), PHRASE_CONFIDENCE, lambda m: _clean_text(m.group(1))),
+    ],
+    "property_name": [
+        (re.compile(r"property\s*name\s*[:\-]\s*([^\n]{3,80})", re.I),
+         LABELLED_CONFIDENCE, lambda m: _clean_text(m.group(1))),
+        (re.compile(r"(?:^|(?<=[.!?]\s)|\n)((?:The\s+)?(?:[A-Z][\w&'.-]*\s+){0,5}[A-Z][\w&'.-]*)\s+is\s+an?\s+"
+                    r"(?:[\w,-]+\s+){0,4}?(?:" + _TYPE_WORDS + r")\b"), PHRASE_CONFIDENCE, lambda m: _clean_text(m.group(1))),
+    ],
+    "property_type": [
+        (re.compile(r"property\s*type\s*[:\-]\s*([A-Za-z /-]{3,40}?)\s*(?:\n|$|\.)", re.I), LABELLED_CONFIDENCE,
+         lambda m: _property_type(m.group(1))),
+        (re.compile(r"\bis\s+an?\s+(?:[\w,-]+\s+){0,4}?(" + _TYPE_WORDS + r")\b", re.I), PHRASE_CONFIDENCE,
+         lambda m: _property_type(m.group(1))),
+    ],
+    "purchase_price": [
+        (re.compile(r"(?:purchase|asking|offering|list(?:ing)?)\s*price\s*(?:of|is|:|-)?\s*\$\s*(\d[\d,]*(?:\.\d+)?)"
+                    r"\s*(million|mm\b|m\b)?", re.I), 0.9, lambda m: _price(m.group(1), m.group(2))),
+        # Sale comps quote "sale price" for other buildings, so alone it stays below the threshold
+        (re.compile(r"sale\s*price\s*(?:of|is|:|-)?\s*\$\s*(\d[\d,]*(?:\.\d+)?)\s*(million|mm\b|m\b)?", re.I),
+         PHRASE_CONFIDENCE, lambda m: _price(m.group(1), m.group(2))),
+    ],
+    "amenities": [
+        (re.compile(r"amenities\s*(?:include|including|:)\s*([^.]{5,300})", re.I), 0.85, lambda m: _amenities(m.group(1))),
+    ],
+}
+
+
+def _narrative_texts(docs) -> List[Tuple[Tuple[Any, Any], str]]:
+    """(source, page) and text of the narrative documents (table chunks are left to the table parsers)."""
+    return [
+        ((d.metadata.get("source"), d.metadata.get("page")), d.page_content)
+        for d in docs
+        if d.page_content and not d.metadata.get("is_table")
+    ]
+
+
+def extract_fields_deterministic(docs) -> Dict[str, Dict[str, Any]]:
+    """
+    Regex candidates for NARRATIVE_FIELDS from `docs`, as {field: {"value", "confidence", "matches"}}.
+    Confidence is the best base confidence among matches of the winning value times the share of
+    match weight that value holds, plus CORROBORATION_BONUS when it was found more than once.
+    The same sentence repeated in overlapping chunks of one page counts once.
+    """
+    texts = _narrative_texts(docs)
+    results = {}
+    for field, rules in _RULES.items():
+        weights: Dict[Any, float] = defaultdict(float)
+        best_base: Dict[Any, float] = defaultdict(float)
+        hits: Dict[Any, int] = defaultdict(int)
+        seen = set()
+        for origin, text in texts:
+            for pattern, base, parse in rules:
+                for m in pattern.finditer(text):
+                    occurrence = (origin, re.sub(r"\s+", " ", m.group(0)).lower())
+                    if occurrence in seen:
+                        continue
+                    seen.add(occurrence)
+                    try:
+                        value = parse(m)
+                    except (ValueError, TypeError):
+                        value = None
+                    if value is None:
+                        continue
+                    key = tuple(value) if isinstance(value, list) else value
+                    weights[key] += base
+                    best_base[key] = max(best_base[key], base)
+                    hits[key] += 1
+        if not weights:
+            continue
+        total = sum(weights.values())
+        key = max(weights, key=weights.get)
+        confidence = best_base[key] * weights[key] / total + (CORROBORATION_BONUS if hits[key] > 1 else 0.0)
+        results[field] = {
+            "value": list(key) if isinstance(key, tuple) else key,
+            "confidence": round(min(confidence, 0.99), 3),
+            "matches": sum(hits.values()),
+        }
+    return results
+
+
+def format_field_value(field: str, value: Any) -> Any:
+    """
+    Render a field value as a string, the way the LLM extractor reports fields, so narrative
+    values have one type whichever extractor found them: lists are comma-joined, sizes and
+    prices get thousands separators. Strings and None pass through.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if field == "purchase_price":
+            return f"${value:,.0f}"
+        if field in ("total_building_sqft", "total_units_or_suites"):
+            return f"{value:,.0f}"
+        return str(int(value)) if float(value).is_integer() else str(value)
+    return str(value)
+
+
+def resolve_fields(
+    candidates: Dict[str, Dict[str, Any]],
+    min_confidence: Optional[float] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Split candidates into (confident field values as strings, NARRATIVE_FIELDS still needing the LLM)."""
+    threshold = FIELD_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    resolved = {
+        f: format_field_value(f, c["value"]) for f, c in candidates.items() if c["confidence"] >= threshold
+    }
+    return resolved, [f for f in NARRATIVE_FIELDS if f not in resolved]
@@ -4,35 +4,33 @@ Enhanced multi-file loader for LangChain with OCR fallback.
 ✅ Handles:
     - PDFs (text & image-based)
     - CSV / Excel / TXT / JSON
-✅ Uses multiple loaders for redundancy
-✅ Automatic OCR fallback (pdf2image + pytesseract)
-✅ Dynamic chunking based on document size
+✅ Tiered loader cascade with per-page quality gate
+✅ OCR fallback only for pages no text loader could read (pdf2image + pytesseract)
+✅ Single table-aware chunking stage with stable chunk ids
 ✅ Deduplication & metadata preservation
+✅ Content-addressed parse cache for repeat uploads
 """
 
 import os
+import re
+import hashlib
 import traceback
 import logging
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from dotenv import load_dotenv
 from langsmith import traceable
 from langchain.schema import Document
-from langchain_community.document_loaders import (
-    PDFPlumberLoader,
-    PyPDFLoader,
-    UnstructuredPDFLoader,
-    PyPDFium2Loader,
-    PyMuPDFLoader,
-    PDFMinerLoader,
-    PDFMinerPDFasHTMLLoader,
-)
+from langchain_community.document_loaders import PyPDFium2Loader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.pdf_session import open_pdf_session
+from utils.table_registry import register_table
+from utils.parse_cache import file_digest, cache_key, get_cached_documents, put_cached_documents
 
 # --- Optional OCR ---
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, pdfinfo_from_path
     import pytesseract
     OCR_AVAILABLE = True
 except Exception:
@@ -44,34 +42,32 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 # Logging setup
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# Bump whenever loader, OCR or chunking behaviour changes so stale parse cache entries are ignored
+LOADER_CONFIG_VERSION = "6"
+
 # =========================================================
 # Utility Functions
 # =========================================================
 
 def _df_to_document(df: pd.DataFrame, meta: Dict[str, Any]) -> Document:
-    """Convert a pandas DataFrame into a text document."""
+    """
+    Convert a pandas DataFrame into a text document.
+    The frame itself goes into the table registry; chunks only carry its `table_id`.
+    """
     text = df.to_csv(index=False)
+    meta = dict(meta, table_id=register_table(df, content=text))
     return Document(page_content=text, metadata=meta)
 
 
-def get_text_splitter(text: str) -> RecursiveCharacterTextSplitter:
-    """Dynamically adjust chunk size based on text length (approx token count)."""
-    length = len(text)
-    est_tokens = length // 4  # ~4 chars per token
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
 
-    if est_tokens > 800_000:
-        chunk_size, chunk_overlap = 1500, 200
-    elif est_tokens > 400_000:
-        chunk_size, chunk_overlap = 2000, 250
-    elif est_tokens > 200_000:
-        chunk_size, chunk_overlap = 2500, 300
-    else:
-        chunk_size, chunk_overlap = 3000, 300
 
-    logging.info(f"⚙️ Using chunk_size={chunk_size}, overlap={chunk_overlap} for ~{est_tokens:,} tokens")
+def get_text_splitter(chunk_size: int = None, chunk_overlap: int = None) -> RecursiveCharacterTextSplitter:
+    """Splitter for prose pages under the single chunking policy (CHUNK_SIZE / CHUNK_OVERLAP)."""
     return RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
+        chunk_size=chunk_size or CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
         separators=["\n\n", "\n", " ", ""]
     )
 
@@ -80,26 +76,117 @@ def get_text_splitter(text: str) -> RecursiveCharacterTextSplitter:
 # OCR Fallback
 # =========================================================
 
-def ocr_fallback_pdf(path: str) -> List[Document]:
-    """Extract text from image-only PDF using pdf2image + pytesseract."""
-    if not OCR_AVAILABLE:
-        logging.warning("OCR fallback not available (install pdf2image & pytesseract).")
-        return []
+OCR_DPI = int(os.getenv("OCR_DPI", "150"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_MAX_MEMORY_MB = int(os.getenv("OCR_MAX_MEMORY_MB", "512"))
+
+
+def _ocr_page(path: str, page: int, dpi: int) -> str:
+    """Rasterize and OCR a single 0-based page. Runs inside an OCR worker process."""
+    images = convert_from_path(path, dpi=dpi, first_page=page + 1, last_page=page + 1)
+    return pytesseract.image_to_string(images[0], lang="eng") if images else ""
 
-    try:
-        logging.info(f"🧠 Starting OCR fallback for {os.path.basename(path)} ...")
-        images = convert_from_path(path, dpi=150)
-        ocr_docs = []
 
-        for i, img in enumerate(images):
-            text = pytesseract.image_to_string(img, lang="eng")
-            if text.strip():
-                meta = {"source": path, "page": i, "loader": "pytesseract_ocr", "ocr_used": True}
-                ocr_docs.append(Document(page_content=text.strip(), metadata=meta))
+def _pages_without_text(path: str) -> List[int]:
+    """
+    Return 0-based indexes of pages that carry no extractable text layer. If pdfplumber can't open
+    the file (typical when every text loader failed), every page is returned, as counted by poppler.
+    """
+    import pdfplumber
 
+    try:
+        with pdfplumber.open(path) as pdf:
+            return [i for i, page in enumerate(pdf.pages) if not page.chars]
+    except Exception as e:
+        logging.warning(f"⚠️ pdfplumber can't open {os.path.basename(path)} ({e}); OCR'ing every page")
+    return list(range(int(pdfinfo_from_path(path)["Pages"])))
+
+
+def _ocr_window_size(dpi: int, workers: int, max_memory_mb: int) -> int:
+    """How many pages may be rasterized at once without exceeding the memory ceiling."""
+    # Letter-size RGB raster plus ~3x working space inside tesseract
+    per_page_mb = (8.5 * dpi) * (11 * dpi) * 3 * 4 / (1024 ** 2)
+    return max(1, min(2 * workers, int(max_memory_mb // per_page_mb)))
+
+
+def iter_ocr_pages(
+    path: str,
+    pages: Optional[List[int]] = None,
+    workers: int = None,
+    max_memory_mb: int = None,
+    dpi: int = None,
+):
+    """
+    Yield OCR Documents for `pages` (0-based, default: every page without a text layer) in page order.
+    Pages are rasterized one at a time inside a process pool, with at most a bounded window
+    of pages in flight so memory stays under `max_memory_mb`.
+    """
+    if not OCR_AVAILABLE:
+        logging.warning("OCR fallback not available (install pdf2image & pytesseract).")
+        return
+
+    workers = workers or OCR_WORKERS
+    max_memory_mb = max_memory_mb or OCR_MAX_MEMORY_MB
+    dpi = dpi or OCR_DPI
+    if pages is None:
+        pages = _pages_without_text(path)
+    pages = sorted(pages)
+    if not pages:
+        return
+
+    window = _ocr_window_size(dpi, workers, max_memory_mb)
+    logging.info(f"🧠 OCR of {len(pages)} pages of {os.path.basename(path)} with {workers} workers (window={window}) ...")
+
+    def _as_doc(page: int, text: str) -> Optional[Document]:
+        text = (text or "").strip()
+        if not text:
+            return None
+        meta = {"source": path, "page": page, "loader": "pytesseract_ocr", "ocr_used": True}
+        return Document(page_content=text, metadata=meta)
+
+    if workers <= 1:
+        for page in pages:
+            try:
+                text = _ocr_page(path, page, dpi)
+            except Exception as e:
+                logging.warning(f"⚠️ OCR failed on page {page + 1} of {os.path.basename(path)}: {e}")
+                continue
+            doc = _as_doc(page, text)
+            if doc:
+                yield doc
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        remaining = iter(pages)
+        in_flight = deque()
+        for page in remaining:
+            in_flight.append((page, pool.submit(_ocr_page, path, page, dpi)))
+            if len(in_flight) >= window:
+                break
+        while in_flight:
+            page, fut = in_flight.popleft()
+            try:
+                text = fut.result()
+            except Exception as e:
+                logging.warning(f"⚠️ OCR failed on page {page + 1} of {os.path.basename(path)}: {e}")
+                text = ""
+            nxt = next(remaining, None)
+            if nxt is not None:
+                in_flight.append((nxt, pool.submit(_ocr_page, path, nxt, dpi)))
+            doc = _as_doc(page, text)
+            if doc:
+                yield doc
+
+
+def ocr_fallback_pdf(path: str, pages: Optional[List[int]] = None) -> List[Document]:
+    """Extract text from image-only PDF pages (0-based `pages`, default all without text) via parallel OCR."""
+    try:
+        ocr_docs = list(iter_ocr_pages(path, pages=pages))
         logging.info(f"✅ OCR extracted {len(ocr_docs)} pages from {os.path.basename(path)}")
         return ocr_docs
-
     except Exception as e:
         logging.error(f"OCR fallback failed for {path}: {e}")
         traceback.print_exc()
@@ -110,47 +197,134 @@ def ocr_fallback_pdf(path: str) -> List[Document]:
 # PDF Loader
 # =========================================================
 
+def _load_pages_pypdfium2(path: str, pages: Optional[List[int]]) -> List[Document]:
+    # First tier: every page, with the document metadata LangChain's loader attaches
+    return PyPDFium2Loader(path).load()
+
+
+def _page_metadata(path: str, page: int, total: int) -> Dict[str, Any]:
+    return {"source": path, "file_path": path, "page": page, "total_pages": total}
+
+
+def _load_pages_pdfplumber(path: str, pages: Optional[List[int]]) -> List[Document]:
+    # Through the request's shared session, so the text parsers reuse these pages' layout analysis
+    with open_pdf_session(path) as session:
+        total = session.page_count
+        return [
+            Document(page_content=session.page_text(i), metadata=_page_metadata(path, i, total))
+            for i in (range(total) if pages is None else pages)
+        ]
+
+
+def _load_pages_pymupdf(path: str, pages: Optional[List[int]]) -> List[Document]:
+    import pymupdf
+
+    with pymupdf.open(path) as pdf:
+        total = pdf.page_count
+        return [
+            Document(page_content=pdf[i].get_text(), metadata=_page_metadata(path, i, total))
+            for i in (range(total) if pages is None else pages)
+        ]
+
+
+# Loader tiers, cheapest first: (name, load(path, pages or None for all) -> page Documents).
+# The first tier reads every page; later tiers open only the pages that failed the quality gate.
+PDF_LOADER_TIERS = [
+    ("PyPDFium2Loader", _load_pages_pypdfium2),
+    ("PDFPlumberLoader", _load_pages_pdfplumber),
+    ("PyMuPDFLoader", _load_pages_pymupdf),
+]
+PDF_PAGE_MIN_SCORE = float(os.getenv("PDF_PAGE_MIN_SCORE", "0.5"))
+PDF_PAGE_MIN_CHARS = int(os.getenv("PDF_PAGE_MIN_CHARS", "40"))
+# Short-but-clean pages (covers, dividers) stop at the text tiers; only near-empty or garbled pages get OCR
+PDF_PAGE_OCR_MAX_SCORE = float(os.getenv("PDF_PAGE_OCR_MAX_SCORE", "0.15"))
+
+
+def score_page_text(text: str) -> float:
+    """
+    Score extracted page text in [0, 1] from text density, garbage ratio and table hints.
+    Pages under PDF_PAGE_MIN_SCORE are treated as failed extractions.
+    """
+    text = (text or "").strip()
+    if not text:
+        return 0.0
+
+    # Text density: saturates once the page has a paragraph's worth of characters
+    alnum = sum(ch.isalnum() for ch in text)
+    density = min(1.0, alnum / max(PDF_PAGE_MIN_CHARS, 1))
+
+    # Garbage: replacement chars, control chars and unmapped glyphs like "(cid:12)"
+    garbage = text.count("\ufffd") + sum(1 for ch in text if ord(ch) < 32 and ch not in "\n\t\r")
+    garbage += 6 * len(re.findall(r"\(cid:\d+\)", text))
+    garbage_ratio = min(1.0, garbage / len(text))
+
+    # Table hints: numeric rows are sparse in letters but still a good extraction
+    lines = [l for l in text.splitlines() if l.strip()]
+    numeric_lines = sum(1 for l in lines if len(re.findall(r"\d[\d,\.]*", l)) >= 2)
+    table_bonus = 0.2 if lines and numeric_lines / len(lines) > 0.3 else 0.0
+
+    return max(0.0, min(1.0, density * (1.0 - 2 * garbage_ratio) + table_bonus))
+
+
 @traceable(name="load_pdf_multi")
 def load_pdf_multi(path: str) -> List[Document]:
-    """Try multiple PDF loaders and fallback to OCR if no text found."""
-    docs: List[Document] = []
-
-    loaders = [
-        ("PDFPlumberLoader", PDFPlumberLoader(path)),
-        ("PyPDFLoader", PyPDFLoader(path)),
-        ("UnstructuredPDFLoader (OCR)", UnstructuredPDFLoader(path, strategy="ocr_only")),
-        ("PyPDFium2Loader", PyPDFium2Loader(path)),
-        ("PyMuPDFLoader", PyMuPDFLoader(path)),
-        ("PDFMinerLoader", PDFMinerLoader(path)),
-        ("PDFMinerPDFasHTMLLoader", PDFMinerPDFasHTMLLoader(path)),
-    ]
-
-    # Try multiple text-based extractors
-    for name, loader in loaders:
+    """
+    Tiered, quality-gated PDF loading: run the fastest loader over the document, score each page,
+    and re-extract only the failing pages with slower loaders and finally OCR.
+    Each returned page records the tier that served it in `loader` / `tier` metadata.
+    """
+    name_short = os.path.basename(path)
+    best: Dict[int, Document] = {}
+    scores: Dict[int, float] = {}
+    failing: Optional[set] = None  # None until the first tier tells us the page count
+
+    for tier, (name, load_pages) in enumerate(PDF_LOADER_TIERS):
+        if failing is not None and not failing:
+            break
         try:
-            new_docs = loader.load()
-            docs.extend(new_docs)
-            logging.info(f"✅ {name} extracted {len(new_docs)} docs from {os.path.basename(path)}")
+            new_docs = load_pages(path, None if failing is None else sorted(failing))
         except Exception as e:
-            logging.warning(f"⚠️ {name} failed for {os.path.basename(path)}: {e}")
-
-    # If all loaders produced little/no text → OCR fallback
-    total_text_len = sum(len((d.page_content or "").strip()) for d in docs)
-    if total_text_len < 50:
-        logging.warning(f"⚠️ No meaningful text extracted from {os.path.basename(path)} — trying OCR fallback...")
-        ocr_docs = ocr_fallback_pdf(path)
-        docs.extend(ocr_docs)
+            logging.warning(f"⚠️ {name} failed for {name_short}: {e}")
+            continue
 
-    # Deduplicate content
+        for i, d in enumerate(new_docs):
+            page = d.metadata.get("page", i)
+            if failing is not None and page not in failing:
+                continue
+            score = score_page_text(d.page_content)
+            if score > scores.get(page, -1.0):
+                d.metadata.update({"page": page, "loader": name, "tier": tier, "quality_score": round(score, 3)})
+                best[page] = d
+                scores[page] = score
+
+        if not scores:
+            continue
+        failing = {p for p, sc in scores.items() if sc < PDF_PAGE_MIN_SCORE}
+        logging.info(f"✅ {name} (tier {tier}) served {name_short}: {len(failing)} of {len(scores)} pages still below quality gate")
+
+    # Pages no text loader could read → OCR just those pages
+    ocr_pages = None if failing is None else sorted(p for p in failing if scores[p] <= PDF_PAGE_OCR_MAX_SCORE)
+    if ocr_pages is None or ocr_pages:
+        logging.warning(f"⚠️ {len(ocr_pages) if ocr_pages else 'All'} pages of {name_short} need OCR ...")
+        for d in ocr_fallback_pdf(path, pages=ocr_pages):
+            page = d.metadata["page"]
+            score = score_page_text(d.page_content)
+            if score > scores.get(page, -1.0):
+                d.metadata.update({"tier": len(PDF_LOADER_TIERS), "quality_score": round(score, 3)})
+                best[page] = d
+                scores[page] = score
+
+    # Deduplicate content (repeated cover pages, blank templates)
     seen = set()
     unique_docs = []
-    for d in docs:
+    for page in sorted(best):
+        d = best[page]
         key = (d.page_content or "").strip()
         if key and key not in seen:
             unique_docs.append(d)
             seen.add(key)
 
-    logging.info(f"📄 Total unique PDF docs after merging: {len(unique_docs)}")
+    logging.info(f"📄 Total unique PDF pages after cascade: {len(unique_docs)}")
     return unique_docs
 
 
@@ -162,7 +336,6 @@ def load_csv_as_documents(path: str) -> List[Document]:
     try:
         df = pd.read_csv(path)
         doc = _df_to_document(df, {"source": path, "type": "csv", "rows": len(df)})
-        doc.metadata["dataframe"] = df
         return [doc]
     except Exception as e:
         logging.error(f"⚠️ Failed to read CSV {path}: {e}")
@@ -177,7 +350,6 @@ def load_excel_as_documents(path: str) -> List[Document]:
         for sheet_name, df in xls.items():
             meta = {"source": path, "sheet": sheet_name, "type": "excel", "rows": len(df)}
             doc = _df_to_document(df, meta)
-            doc.metadata["dataframe"] = df
             docs.append(doc)
         return docs
     except Exception as e:
@@ -201,16 +373,80 @@ def load_text_or_json(path: str) -> List[Document]:
 # Chunking
 # =========================================================
 
-def chunk_documents(docs: List[Document]) -> List[Document]:
-    """Split long documents into smaller parts for vectorization."""
+def _looks_tabular(text: str) -> bool:
+    """
+    Rough table detection: a large share of lines carry two or more numbers that make up a good part
+    of the line (prose mentioning a year and a square footage does not count).
+    """
+    lines = [l for l in text.splitlines() if l.strip()]
+    if len(lines) < 3:
+        return False
+
+    def numeric_row(line: str) -> bool:
+        numbers = len(re.findall(r"\d[\d,\.]*", line))
+        return numbers >= 2 and numbers / max(len(line.split()), 1) >= 0.25
+
+    numeric_lines = sum(1 for l in lines if numeric_row(l))
+    return numeric_lines / len(lines) > 0.3
+
+
+def _split_table_text(text: str, chunk_size: int, repeat_header: bool) -> List[str]:
+    """Pack whole rows into chunks (never cutting a row), repeating the header row for registry tables."""
+    lines = text.splitlines()
+    header = lines[0] if repeat_header and lines else None
+    rows = lines[1:] if header is not None else lines
+    parts: List[str] = []
+    current: List[str] = [header] if header is not None else []
+    size = len(header) + 1 if header is not None else 0
+    base = len(current)
+    for row in rows:
+        if len(row) + 1 > chunk_size:
+            # A single oversized row: flush, then fall back to the prose splitter for it
+            if len(current) > base:
+                parts.append("\n".join(current))
+            parts.extend(get_text_splitter(chunk_size).split_text(row))
+            current, size = current[:base], sum(len(l) + 1 for l in current[:base])
+            continue
+        if size + len(row) + 1 > chunk_size and len(current) > base:
+            parts.append("\n".join(current))
+            current, size = current[:base], sum(len(l) + 1 for l in current[:base])
+        current.append(row)
+        size += len(row) + 1
+    if len(current) > base:
+        parts.append("\n".join(current))
+    return parts
+
+
+def _chunk_id(meta: Dict[str, Any], index: int, text: str) -> str:
+    """Stable id from the file content hash, page/sheet, position and chunk text (not the temp path)."""
+    raw = "\x00".join(str(x) for x in (meta.get("file_sha256"), meta.get("page"), meta.get("sheet"), index, text))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def chunk_documents(docs: List[Document], chunk_size: int = None) -> List[Document]:
+    """
+    The single chunking stage: split documents into parts for vectorization.
+    Tables (registry-backed CSV/Excel, or tabular PDF pages) are split only on row boundaries;
+    prose goes through the recursive splitter. Every chunk gets a stable `chunk_id`.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
     chunked_docs: List[Document] = []
     for doc in docs:
-        if not doc.page_content:
+        text = doc.page_content or ""
+        if not text.strip():
             continue
-        splitter = get_text_splitter(doc.page_content)
-        splits = splitter.split_documents([doc])
-        chunked_docs.extend(splits)
-    logging.info(f"✅ Chunked into {len(chunked_docs)} total parts.")
+        meta = doc.metadata or {}
+        is_table = bool(meta.get("table_id")) or _looks_tabular(text)
+        if len(text) <= chunk_size:
+            parts = [text]
+        elif is_table:
+            parts = _split_table_text(text, chunk_size, repeat_header=bool(meta.get("table_id")))
+        else:
+            parts = get_text_splitter(chunk_size).split_text(text)
+        for i, part in enumerate(parts):
+            chunk_meta = dict(meta, chunk_index=i, is_table=is_table, chunk_id=_chunk_id(meta, i, part))
+            chunked_docs.append(Document(page_content=part, metadata=chunk_meta))
+    logging.info(f"✅ Chunked into {len(chunked_docs)} total parts (chunk_size={chunk_size}).")
     return chunked_docs
 
 
@@ -218,9 +454,29 @@ def chunk_documents(docs: List[Document]) -> List[Document]:
 # Main Unified Loader
 # =========================================================
 
+def _load_single_file(p: str, ext: str) -> List[Document]:
+    """Run the extension-specific loader for one file."""
+    if ext == ".pdf":
+        return load_pdf_multi(p)
+    elif ext == ".csv":
+        return load_csv_as_documents(p)
+    elif ext in [".xls", ".xlsx"]:
+        return load_excel_as_documents(p)
+    elif ext in [".txt", ".json"]:
+        return load_text_or_json(p)
+    else:
+        # Fallback try CSV
+        try:
+            df = pd.read_csv(p)
+            doc = _df_to_document(df, {"source": p, "type": "csv_fallback", "rows": len(df)})
+            return [doc]
+        except Exception:
+            return load_text_or_json(p)
+
+
 def load_files(paths: List[str]) -> List[Document]:
     """Main entrypoint to load PDFs, CSVs, Excels, or text files."""
-    all_docs: List[Document] = []
+    all_chunks: List[Document] = []
 
     for p in paths:
         if not os.path.exists(p):
@@ -230,28 +486,24 @@ def load_files(paths: List[str]) -> List[Document]:
         ext = os.path.splitext(p)[1].lower()
 
         try:
-            if ext == ".pdf":
-                all_docs.extend(load_pdf_multi(p))
-            elif ext == ".csv":
-                all_docs.extend(load_csv_as_documents(p))
-            elif ext in [".xls", ".xlsx"]:
-                all_docs.extend(load_excel_as_documents(p))
-            elif ext in [".txt", ".json"]:
-                all_docs.extend(load_text_or_json(p))
-            else:
-                # Fallback try CSV
-                try:
-                    df = pd.read_csv(p)
-                    doc = _df_to_document(df, {"source": p, "type": "csv_fallback", "rows": len(df)})
-                    doc.metadata["dataframe"] = df
-                    all_docs.append(doc)
-                except Exception:
-                    all_docs.extend(load_text_or_json(p))
+            digest = file_digest(p)
+            key = cache_key(digest, ext, LOADER_CONFIG_VERSION)
+            cached = get_cached_documents(key, p)
+            if cached is not None:
+                logging.info(f"⚡ Parse cache hit for {os.path.basename(p)} ({len(cached)} chunks)")
+                all_chunks.extend(cached)
+                continue
+
+            base_docs = _load_single_file(p, ext)
+            for d in base_docs:
+                d.metadata["file_sha256"] = digest
+            logging.info(f"📚 Loaded {len(base_docs)} base documents from {os.path.basename(p)} before chunking.")
+            chunks = chunk_documents(base_docs)
+            put_cached_documents(key, chunks)
+            all_chunks.extend(chunks)
         except Exception as e:
             logging.error(f"❌ Failed loading {p}: {e}")
             traceback.print_exc()
 
-    logging.info(f"📚 Loaded {len(all_docs)} base documents before chunking.")
-    chunked = chunk_documents(all_docs)
-    logging.info(f"✅ Final document count: {len(chunked)}")
-    return chunked
+    logging.info(f"✅ Final document count: {len(all_chunks)}")
+    return all_chunks
@@ -26,6 +26,28 @@ def _to_number(x) -> Optional[float]:
         except Exception:
             return None
 
+_NUMBER_PLACEHOLDERS = ["", "-", "—", "–", "N/A", "NA", "None", "nan", "NaN", "<NA>"]
+
+
+def _to_number_series(values) -> pd.Series:
+    """
+    Vectorized `_to_number` over a whole Series (or array-like) -> float Series with NaN for unparseable cells.
+    Handles `$`, thousands separators, `%`, parenthesised negatives and dash / N/A placeholders.
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype(float)
+
+    # Mixed object columns: numbers stringify cleanly ("7", "3.5", "nan"), so one text pass covers every cell
+    txt = s.astype(str)
+    for ch in ("$", ",", "%"):
+        txt = txt.str.replace(ch, "", regex=False)
+    txt = txt.str.strip()
+    txt = txt.mask(txt.isin(_NUMBER_PLACEHOLDERS))
+    txt = txt.str.replace("(", "-", regex=False).str.replace(")", "", regex=False)
+    return pd.to_numeric(txt, errors="coerce").astype(float)
+
+
 def _first_match(cols: List[str], patterns: List[str]) -> Optional[str]:
     lower = {c.lower(): c for c in cols}
     for p in patterns:
@@ -69,10 +91,13 @@ def _guess_is_t12(df: pd.DataFrame) -> bool:
     return score >= 2
 
 def compute_irr(cash_flows: List[float], guess: float = 0.1) -> Optional[float]:
-    """Compute IRR using numpy."""
+    """Compute IRR (in percent) with the vectorized solver in utils.cashflows; None if unsolvable."""
+    from utils.cashflows import irr
+
     if not cash_flows:
         return None
     try:
-        return np.irr(cash_flows) * 100  # in percentage
-    except:
+        rate = irr(cash_flows, guess=guess)
+    except (TypeError, ValueError):
         return None
+    return None if np.isnan(rate) else rate * 100  # in percentage
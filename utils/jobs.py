@@ -0,0 +1,243 @@
+"""
+Background underwriting jobs.
+
+`JobManager` runs submitted pipelines on a bounded local thread pool, records
+per-stage status and timing through a `StageTracker`, and persists every job
+record (including the finished result) as JSON under JOBS_DIR so results can
+be fetched later, even after a restart, without rerunning anything.
+
+Records older than JOB_RETENTION_SECONDS are deleted. Jobs left queued or
+running by a process that no longer exists (a crash or restart) are marked
+failed when the next JobManager starts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from utils.llm_clients import run_async
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "20"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_SWEEP_SECONDS = float(os.getenv("JOB_SWEEP_SECONDS", "3600"))
+
+
+class JobQueueFull(Exception):
+    """Raised when more than JOB_MAX_QUEUE jobs are already waiting or running."""
+
+
+class StageTracker:
+    """Records start/finish time and status of each pipeline stage; `on_change` fires after every update."""
+
+    def __init__(self, on_change: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.stages: List[Dict[str, Any]] = []
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self.snapshot())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(s) for s in self.stages]
+
+    @contextmanager
+    def stage(self, name: str):
+        entry = {"name": name, "status": "running", "started_at": datetime.utcnow().isoformat(), "seconds": None}
+        with self._lock:
+            self.stages.append(entry)
+        self._changed()
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            entry["status"] = "failed"
+            raise
+        else:
+            entry["status"] = "done"
+        finally:
+            entry["seconds"] = round(time.perf_counter() - t0, 3)
+            self._changed()
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars and arrays (e.g. from metrics) become plain numbers / lists; anything else a string
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+# Identifies this process even if a restarted server gets the same pid (e.g. pid 1 in a container)
+_INSTANCE = {"host": socket.gethostname(), "pid": os.getpid(), "instance": uuid.uuid4().hex}
+
+
+def _owner_alive(owner: Optional[Dict[str, Any]]) -> bool:
+    """Whether the process that owns a job record still runs (records without an owner count as orphaned)."""
+    if not owner or owner.get("host") != _INSTANCE["host"]:
+        return False
+    if owner.get("pid") == _INSTANCE["pid"]:
+        return owner.get("instance") == _INSTANCE["instance"]
+    try:
+        os.kill(int(owner["pid"]), 0)
+    except PermissionError:
+        return True  # exists, but belongs to another user
+    except (OSError, KeyError, ValueError, TypeError):
+        return False
+    return True
+
+
+class JobManager:
+    """Bounded worker pool for underwriting jobs with JSON-persisted job records."""
+
+    def __init__(
+        self,
+        jobs_dir: str = JOBS_DIR,
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_MAX_QUEUE,
+        retention: float = JOB_RETENTION_SECONDS,
+    ):
+        self.jobs_dir = jobs_dir
+        self.max_queue = max_queue
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="underwrite-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.sweep()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _persist(self, job: Dict[str, Any]) -> None:
+        # Atomic replace so pollers never read a half-written record
+        fd, tmp = tempfile.mkstemp(dir=self.jobs_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(job, fh, default=_json_default)
+            os.replace(tmp, self._path(job["job_id"]))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def sweep(self) -> int:
+        """
+        Delete job records (and stray temp files) older than `retention`, and mark jobs left
+        queued or running by a process that is gone as failed. Returns the records deleted.
+        """
+        now = time.time()
+        self._last_sweep = now
+        removed = 0
+        for entry in os.scandir(self.jobs_dir):
+            try:
+                age = now - entry.stat().st_mtime
+                if age > self.retention and entry.name.endswith((".json", ".tmp")):
+                    os.unlink(entry.path)
+                    removed += 1
+                    continue
+                if not entry.name.endswith(".json"):
+                    continue
+                with open(entry.path, "r", encoding="utf-8") as fh:
+                    job = json.load(fh)
+            except (OSError, json.JSONDecodeError):
+                continue
+            with self._lock:
+                if job.get("job_id") in self._jobs:
+                    continue
+            if job.get("status") in ("queued", "running") and not _owner_alive(job.get("owner")):
+                job.update(
+                    status="failed", error="Interrupted: the server stopped before the job finished",
+                    finished_at=datetime.utcnow().isoformat(), updated_at=datetime.utcnow().isoformat(),
+                )
+                self._persist(job)
+        if removed:
+            logging.info(f"🧹 Removed {removed} expired job records")
+        return removed
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = datetime.utcnow().isoformat()
+            self._persist(job)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j["status"] in ("queued", "running"))
+
+    def submit(self, runner: Callable[..., Any], *args, cleanup: Optional[Callable[[], None]] = None, **kwargs) -> str:
+        """
+        Queue `runner(*args, tracker=..., **kwargs)` and return the job id immediately.
+        `runner` may be a coroutine function; it is then driven on its own event loop on the worker thread.
+        `cleanup` runs after the job finishes either way (e.g. removing uploaded temp files).
+        """
+        if self.active_count() >= self.max_queue:
+            raise JobQueueFull(f"{self.max_queue} jobs already queued or running")
+        if time.time() - self._last_sweep > JOB_SWEEP_SECONDS:
+            self.sweep()
+
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id, "status": "queued", "stages": [], "result": None, "error": None, "error_status": None,
+                "created_at": now, "updated_at": now, "started_at": None, "finished_at": None,
+                "owner": _INSTANCE,
+            }
+            self._persist(self._jobs[job_id])
+        self._pool.submit(self._run, job_id, runner, args, kwargs, cleanup)
+        return job_id
+
+    def _run(self, job_id, runner, args, kwargs, cleanup) -> None:
+        tracker = StageTracker(on_change=lambda stages: self._update(job_id, stages=stages))
+        try:
+            self._update(job_id, status="running", started_at=datetime.utcnow().isoformat())
+            result = runner(*args, tracker=tracker, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = run_async(result)
+            self._update(job_id, status="done", result=result, finished_at=datetime.utcnow().isoformat())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(
+                job_id, status="failed", error=str(e), error_status=getattr(e, "status_code", 500),
+                finished_at=datetime.utcnow().isoformat(),
+            )
+        finally:
+            if cleanup:
+                cleanup()
+            # Finished jobs are served from disk; keep only in-flight ones in memory
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current record for `job_id` (in memory while active, otherwise from disk), or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        try:
+            with open(self._path(os.path.basename(job_id)), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
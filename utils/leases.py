@@ -0,0 +1,297 @@
+"""
+Lease-level rent roll analytics.
+
+`build_lease_table` normalizes the classified rent roll DataFrames into one
+columnar lease table (suite, tenant, SF, annual rent, market rent, lease
+dates, escalation). `project_lease_cash_flows` turns it into monthly rent over
+a hold period as a (leases, months) array: contract rent with annual
+escalations until expiry, then a blended rollover (renewal-weighted downtime,
+re-lease at the grown market rent, repeated every new lease term).
+`lease_metrics` adds WALT, the expiration schedule and tenant concentration.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers import _clean_dataframe, _to_number_series
+from utils.metrics import IRR_HOLD_YEARS
+
+LEASE_ASSUMPTIONS = {
+    "market_rent_growth": 0.03,      # annual growth of market rent
+    "renewal_probability": 0.65,     # weights downtime: expected downtime = (1 - p) * downtime_months
+    "downtime_months": 6,
+    "new_lease_term_months": 60,
+    "new_lease_escalation": 0.03,    # annual bump on leases signed during the hold
+    "in_place_escalation": 0.0,      # used when the rent roll has no escalation column
+}
+
+LEASE_COLUMNS = [
+    "suite", "tenant", "sf", "annual_rent", "market_rent", "lease_start", "lease_end", "escalation", "vacant",
+]
+
+
+def _pick(cols: List[str], patterns: List[str], exclude: Optional[str] = None) -> Optional[str]:
+    """First column matching any pattern (in pattern order) whose name does not match `exclude`."""
+    for p in patterns:
+        for c in cols:
+            lc = c.lower()
+            if re.search(p, lc) and not (exclude and re.search(exclude, lc)):
+                return c
+    return None
+
+
+def _is_monthly(col: Optional[str]) -> bool:
+    return bool(col and re.search(r"(/\s*mo|per\s*month|monthly|mthly)", col.lower()))
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parse lease dates; impossible month-end days such as 06/31 are clamped to the last day of the month."""
+    dates = pd.to_datetime(values, errors="coerce", format="mixed")
+    missing = dates.isna() & values.notna()
+    if missing.any():
+        parts = values[missing].astype(str).str.extract(r"^\s*(\d{1,2})[/-](\d{1,2})[/-](\d{4})\s*$").astype(float)
+        month_start = pd.to_datetime(
+            pd.DataFrame({"year": parts[2], "month": parts[0], "day": 1}), errors="coerce"
+        )
+        day = np.minimum(parts[1], month_start.dt.days_in_month)
+        dates[missing] = month_start + pd.to_timedelta(day - 1, unit="D")
+    return dates
+
+
+_SUMMARY_LABEL = r"\b(?:sub-?\s*)?totals?\b|\bsummary\b"
+# A tenant cell that is only a summary label ("Total", "Grand Total:", "Total Occupied"), not "Total Wine & More"
+_SUMMARY_TENANT = (
+    r"^\W*(?:grand\s+|sub-?\s*)?(?:totals?|summary)\b"
+    r"(?:\s*(?:occupied|vacant|leased|available|building|property|rentable|sf|rent|all))*\W*$"
+)
+_BLANK = r"^\s*(?:nan|none|nat)?\s*$"
+
+
+def _summary_rows(suite: pd.Series, tenant: pd.Series) -> pd.Series:
+    """Total / Subtotal / Summary rows: labelled so in the suite column, or in the tenant column of a row without a suite."""
+    return (
+        suite.str.contains(_SUMMARY_LABEL, case=False, regex=True)
+        | tenant.str.contains(_SUMMARY_TENANT, case=False, regex=True)
+        | (suite.str.contains(_BLANK, case=False, regex=True) & tenant.str.contains(_SUMMARY_LABEL, case=False, regex=True))
+    )
+
+
+def build_lease_table(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per lease across all rent roll tables, with LEASE_COLUMNS. Rents are annual; monthly
+    and per-SF columns are converted. Total / subtotal rows and rows without SF, rent or tenant
+    information are dropped.
+    """
+    frames = []
+    for df in dfs:
+        df = _clean_dataframe(df)
+        cols = list(df.columns)
+        n = len(df)
+        col_suite = _pick(cols, [r"suite", r"unit", r"space"])
+        col_tenant = _pick(cols, [r"tenant", r"lessee", r"occupant", r"name"])
+        col_sf = _pick(cols, [r"(^|[^a-z])r?sf([^a-z]|$)", r"sq.?\s*f", r"square", r"area", r"nra"])
+        col_rent = _pick(cols, [r"annual.*rent", r"rent.*annual", r"base.*rent", r"current.*rent", r"contract.*rent",
+                                r"(^|[^a-z])rent([^a-z]|$)"], exclude=r"market|asking|psf|per\s*sf|/\s*sf")
+        col_rent_psf = _pick(cols, [r"psf", r"per\s*sf", r"/\s*sf"], exclude=r"market|asking")
+        col_market = _pick(cols, [r"market.*rent", r"asking.*rent"], exclude=r"psf|per\s*sf|/\s*sf")
+        col_market_psf = _pick(cols, [r"(market|asking).*(psf|per\s*sf|/\s*sf)"])
+        col_start = _pick(cols, [r"(lease|term).*(start|commence|begin)", r"start", r"commence", r"^from$"])
+        col_end = _pick(cols, [r"(lease|term).*(end|expir)", r"expir", r"(^|[^a-z])end([^a-z]|$)", r"^to$"])
+        col_esc = _pick(cols, [r"escalat", r"bump", r"increase", r"step"])
+
+        def numbers(col: Optional[str]) -> pd.Series:
+            return _to_number_series(df[col]).reset_index(drop=True) if col else pd.Series(np.nan, index=range(n))
+
+        sf = numbers(col_sf)
+        rent = numbers(col_rent) * (12 if _is_monthly(col_rent) else 1)
+        rent_psf = numbers(col_rent_psf) * (12 if _is_monthly(col_rent_psf) else 1)
+        rent = rent.fillna(rent_psf * sf)
+        market = numbers(col_market) * (12 if _is_monthly(col_market) else 1)
+        market_psf = numbers(col_market_psf) * (12 if _is_monthly(col_market_psf) else 1)
+        market = market.fillna(market_psf * sf)
+        esc = numbers(col_esc)
+        esc = esc.where(esc.abs() < 1, esc / 100.0)  # "3" / "3%" -> 0.03
+
+        tenant = df[col_tenant].astype(str).str.strip().reset_index(drop=True) if col_tenant else pd.Series("", index=range(n))
+        suite = df[col_suite].astype(str).str.strip().reset_index(drop=True) if col_suite else pd.Series(range(n)).astype(str)
+        vacant = tenant.str.contains(r"^\s*(?:vacant|available|n/?a)?\s*$", case=False, regex=True) | ~(rent > 0)
+
+        frame = pd.DataFrame({
+            "suite": suite,
+            "tenant": tenant.where(~vacant, "Vacant"),
+            "sf": sf,
+            "annual_rent": rent.where(~vacant, 0.0),
+            "market_rent": market,
+            "lease_start": _parse_dates(df[col_start].reset_index(drop=True)) if col_start else pd.Series(pd.NaT, index=range(n)),
+            "lease_end": _parse_dates(df[col_end].reset_index(drop=True)) if col_end else pd.Series(pd.NaT, index=range(n)),
+            "escalation": esc,
+            "vacant": vacant,
+        })
+        # Totals carry area and rent (and a blank tenant, which would read as vacant): drop them by label.
+        # Blank rows carry neither area nor rent
+        keep = ~_summary_rows(suite, tenant) & ((frame["sf"] > 0) | (frame["annual_rent"] > 0))
+        frames.append(frame[keep])
+
+    if not frames:
+        return pd.DataFrame(columns=LEASE_COLUMNS)
+    leases = pd.concat(frames, ignore_index=True)
+    # No market data: assume leases roll at their in-place rent (vacant space at the average in-place PSF)
+    avg_psf = leases["annual_rent"].sum() / leases.loc[~leases["vacant"], "sf"].sum() if (~leases["vacant"]).any() else np.nan
+    leases["market_rent"] = leases["market_rent"].fillna(leases["annual_rent"].where(~leases["vacant"])).fillna(leases["sf"] * avg_psf)
+    return leases
+
+
+def _month_ordinal(dates: pd.Series) -> np.ndarray:
+    """Months since year 0 as floats (NaN for NaT)."""
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=float, na_value=np.nan)
+
+
+def _analysis_start(as_of) -> pd.Timestamp:
+    ts = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today()
+    return ts.normalize().replace(day=1)
+
+
+def project_lease_cash_flows(
+    leases: pd.DataFrame,
+    as_of=None,
+    months: int = IRR_HOLD_YEARS * 12,
+    assumptions: Optional[Dict[str, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Monthly rent per lease over `months` from the first of the `as_of` month, as (leases, months) arrays:
+    "rent" (collected), "downtime_loss" (market rent lost while space is dark) and "rollover" (1 in the
+    first month of each new lease). Leases without an end date run on contract through the hold;
+    vacant space starts in downtime and leases up at market.
+    """
+    a = {**LEASE_ASSUMPTIONS, **(assumptions or {})}
+    start = _analysis_start(as_of)
+    start_ord = start.year * 12 + start.month - 1
+    m = np.arange(months)[np.newaxis, :]
+
+    vacant = leases["vacant"].to_numpy(dtype=bool)
+    end_ord = _month_ordinal(leases["lease_end"])
+    # First month after the lease ends, relative to the analysis start
+    expiry = np.where(vacant, 0, np.where(np.isnan(end_ord), months, end_ord - start_ord + 1))
+    expiry = np.clip(expiry, 0, months)[:, np.newaxis]
+
+    # In-place contract rent with a bump on every lease anniversary inside the hold
+    start_lease = _month_ordinal(leases["lease_start"])
+    age_now = np.where(np.isnan(start_lease), 0, start_ord - start_lease)[:, np.newaxis]
+    bumps = np.maximum(np.floor((age_now + m) / 12) - np.floor(age_now / 12), 0)
+    esc = leases["escalation"].fillna(a["in_place_escalation"]).to_numpy(dtype=float)[:, np.newaxis]
+    contract = (leases["annual_rent"].to_numpy(dtype=float)[:, np.newaxis] / 12) * (1 + esc) ** bumps
+
+    # Rollover cycles after expiry: blended downtime, then a new lease at market for the new term
+    downtime = int(round((1 - a["renewal_probability"]) * a["downtime_months"]))
+    term = max(int(a["new_lease_term_months"]), 1)
+    cycle = downtime + term
+    since_expiry = m - expiry
+    rolled = since_expiry >= 0
+    k, offset = np.divmod(np.maximum(since_expiry, 0), cycle)
+    dark = rolled & (offset < downtime)
+    lease_up = expiry + k * cycle + downtime
+    market_monthly = leases["market_rent"].fillna(0.0).to_numpy(dtype=float)[:, np.newaxis] / 12
+    market = market_monthly * (1 + a["market_rent_growth"]) ** (lease_up / 12)
+    market = market * (1 + a["new_lease_escalation"]) ** np.maximum((offset - downtime) // 12, 0)
+
+    rent = np.where(rolled, np.where(dark, 0.0, market), contract)
+    downtime_loss = np.where(dark, market_monthly * (1 + a["market_rent_growth"]) ** (m / 12), 0.0)
+    return {
+        "months": pd.date_range(start, periods=months, freq="MS").strftime("%Y-%m").tolist(),
+        "rent": rent,
+        "downtime_loss": downtime_loss,
+        "rollover": rolled & (offset == downtime),
+    }
+
+
+def lease_metrics(leases: pd.DataFrame, as_of=None, top_n: int = 10) -> Dict[str, Any]:
+    """WALT (by rent and by SF), occupancy, expiration schedule by year and tenant concentration."""
+    start = _analysis_start(as_of)
+    occupied = leases[~leases["vacant"]]
+    total_sf = float(leases["sf"].sum())
+    total_rent = float(occupied["annual_rent"].sum())
+
+    remaining = ((_month_ordinal(occupied["lease_end"]) - (start.year * 12 + start.month - 1)) / 12).clip(min=0)
+    known = ~np.isnan(remaining)
+    rent_w = occupied["annual_rent"].to_numpy(dtype=float)[known]
+    sf_w = occupied["sf"].fillna(0.0).to_numpy(dtype=float)[known]
+    walt_rent = float(np.average(remaining[known], weights=rent_w)) if rent_w.sum() > 0 else None
+    walt_sf = float(np.average(remaining[known], weights=sf_w)) if sf_w.sum() > 0 else None
+
+    ends = occupied["lease_end"]
+    bucket = ends.dt.year.astype("Int64").astype(str).where(ends >= start, "Expired/MTM").where(ends.notna(), "Unknown")
+    schedule = (
+        occupied.assign(bucket=bucket)
+        .groupby("bucket", sort=True)
+        .agg(leases=("suite", "size"), sf=("sf", "sum"), annual_rent=("annual_rent", "sum"))
+        .reset_index()
+    )
+    schedule["pct_sf"] = schedule["sf"] / total_sf if total_sf else None
+    schedule["pct_rent"] = schedule["annual_rent"] / total_rent if total_rent else None
+    schedule["cumulative_pct_rent"] = schedule["pct_rent"].cumsum() if total_rent else None
+
+    by_tenant = (
+        occupied.assign(key=occupied["tenant"].str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip())
+        .groupby("key")
+        .agg(tenant=("tenant", "first"), annual_rent=("annual_rent", "sum"), sf=("sf", "sum"), leases=("suite", "size"))
+        .sort_values("annual_rent", ascending=False)
+    )
+    share = by_tenant["annual_rent"] / total_rent if total_rent else by_tenant["annual_rent"] * np.nan
+    by_tenant["rent_share"] = share
+
+    return {
+        "lease_count": int(len(leases)),
+        "occupied_count": int(len(occupied)),
+        "total_sf": total_sf,
+        "occupancy_sf": float(occupied["sf"].sum()) / total_sf if total_sf else None,
+        "in_place_rent": total_rent,
+        "market_rent": float(leases["market_rent"].sum()),
+        "walt_years_by_rent": walt_rent,
+        "walt_years_by_sf": walt_sf,
+        "leases_without_expiry": int((~known).sum()),
+        "expiration_schedule": schedule.to_dict(orient="records"),
+        "concentration": {
+            "tenants": int(len(by_tenant)),
+            "largest_tenant_share": float(share.iloc[0]) if len(share) else None,
+            f"top_{top_n}_share": float(share.head(top_n).sum()) if len(share) else None,
+            "hhi": float((share ** 2).sum()) if len(share) else None,
+            "top_tenants": by_tenant.head(top_n).reset_index(drop=True).to_dict(orient="records"),
+        },
+    }
+
+
+def analyze_leases(
+    dfs: List[pd.DataFrame],
+    as_of=None,
+    hold_years: int = IRR_HOLD_YEARS,
+    assumptions: Optional[Dict[str, float]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Lease metrics plus monthly / annual projected rent for the rent roll tables; None without leases."""
+    leases = build_lease_table(dfs)
+    if leases.empty:
+        return None
+    flows = project_lease_cash_flows(leases, as_of=as_of, months=hold_years * 12, assumptions=assumptions)
+    monthly_rent = flows["rent"].sum(axis=0)
+    monthly_loss = flows["downtime_loss"].sum(axis=0)
+    rollover_sf = (flows["rollover"] * leases["sf"].fillna(0.0).to_numpy(dtype=float)[:, np.newaxis]).sum(axis=0)
+    return {
+        **lease_metrics(leases, as_of=as_of),
+        "assumptions": {**LEASE_ASSUMPTIONS, **(assumptions or {})},
+        "projection": {
+            "months": flows["months"],
+            "rent": monthly_rent.tolist(),
+            "downtime_loss": monthly_loss.tolist(),
+            "annual": [
+                {
+                    "year": y + 1,
+                    "rent": float(monthly_rent[y * 12:(y + 1) * 12].sum()),
+                    "downtime_loss": float(monthly_loss[y * 12:(y + 1) * 12].sum()),
+                    "rollover_sf": float(rollover_sf[y * 12:(y + 1) * 12].sum()),
+                }
+                for y in range(hold_years)
+            ],
+        },
+    }
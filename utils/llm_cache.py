@@ -0,0 +1,213 @@
+"""
+Local SQLite cache for chat completions.
+
+Responses are keyed by a hash of the model name, the temperature and a
+canonical JSON rendering of the prompt messages, so re-running a deal whose
+narrative and metrics did not change costs no tokens. Entries expire after
+LLM_CACHE_TTL_SECONDS; beyond LLM_CACHE_MAX_BYTES the least recently used
+rows are evicted.
+
+A request can opt out with `llm_cache_bypass()`: inside it nothing is read
+from the cache, but fresh responses are still stored (a forced refresh).
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "llm_responses.sqlite3")
+)
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+
+_BYPASS: contextvars.ContextVar = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def llm_cache_bypass(bypass: bool = True):
+    """Skip cache reads (responses are still written) for LLM calls made inside this block."""
+    token = _BYPASS.set(bypass)
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+def _canonical_messages(messages) -> str:
+    """Stable JSON for a prompt given as a string, role/content dicts or LangChain messages."""
+    if isinstance(messages, str):
+        items = [{"role": "user", "content": messages}]
+    else:
+        items = []
+        for m in messages:
+            if isinstance(m, dict):
+                items.append({"role": m.get("role"), "content": m.get("content")})
+            else:
+                items.append({"role": getattr(m, "type", type(m).__name__), "content": getattr(m, "content", str(m))})
+    return json.dumps(items, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def llm_cache_key(model: str, temperature: Optional[float], messages) -> str:
+    canonical = _canonical_messages(messages)
+    return hashlib.sha256(f"{model}\x00{temperature}\x00{canonical}".encode("utf-8")).hexdigest()
+
+
+def _model_identity(chat) -> Tuple[str, Optional[float]]:
+    model = getattr(chat, "model_name", None) or getattr(chat, "model", None) or type(chat).__name__
+    return str(model), getattr(chat, "temperature", None)
+
+
+class LLMCache:
+    """SQLite-backed map of hash(model, temperature, prompt) -> response text with TTL and LRU eviction."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES, ttl: float = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, nbytes INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses(last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for `key`, or None if missing or older than the TTL."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then least recently used ones until the total fits in `max_bytes`."""
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM llm_responses").fetchone()[0]
+            doomed, freed = [], 0
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                for key, nbytes in self._conn.execute("SELECT key, nbytes FROM llm_responses ORDER BY last_access"):
+                    if freed >= excess:
+                        break
+                    doomed.append((key,))
+                    freed += nbytes
+                self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", doomed)
+        if expired or doomed:
+            logging.info(f"🧹 Evicted {expired} expired and {len(doomed)} cached LLM responses ({freed:,} bytes)")
+        return expired + len(doomed)
+
+
+_CACHE: Optional[LLMCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide cache instance, or None when LLM_CACHE_ENABLED is off or the file can't be opened."""
+    global _CACHE
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                _CACHE = LLMCache()
+            except Exception as e:
+                logging.warning(f"⚠️ LLM response cache unavailable at {LLM_CACHE_PATH}: {e}")
+                return None
+        return _CACHE
+
+
+def _lookup(chat, messages) -> Tuple[Optional[LLMCache], str, Optional[str]]:
+    cache = get_llm_cache()
+    if cache is None:
+        return None, "", None
+    model, temperature = _model_identity(chat)
+    key = llm_cache_key(model, temperature, messages)
+    return cache, key, (None if _BYPASS.get() else cache.get(key))
+
+
+def _store(cache: Optional[LLMCache], key: str, chat, text: str, validate: Optional[Callable[[str], Any]]) -> None:
+    if cache is None:
+        return
+    if validate is not None:
+        try:
+            validate(text)
+        except Exception:
+            return  # don't pin an unusable response (e.g. malformed JSON) for the whole TTL
+    cache.put(key, _model_identity(chat)[0], text)
+
+
+def cached_invoke(chat, messages, validate: Optional[Callable[[str], Any]] = None) -> str:
+    """
+    `chat.invoke(messages).content`, served from the cache when the same prompt was answered
+    before. Responses for which `validate` raises are returned but not cached.
+    """
+    cache, key, hit = _lookup(chat, messages)
+    if hit is not None:
+        logging.info("💾 LLM cache hit")
+        return hit
+    text = chat.invoke(messages).content
+    _store(cache, key, chat, text, validate)
+    return text
+
+
+async def acached_invoke(
+    chat,
+    messages,
+    on_token: Optional[Callable[[str], None]] = None,
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Async `cached_invoke`. With `on_token` a miss is streamed token by token; a hit is delivered
+    to `on_token` as a single chunk so streaming clients still see the text.
+    """
+    cache, key, hit = _lookup(chat, messages)
+    if hit is not None:
+        logging.info("💾 LLM cache hit")
+        if on_token is not None:
+            on_token(hit)
+        return hit
+    if on_token is None:
+        text = (await chat.ainvoke(messages)).content
+    else:
+        parts: List[Any] = []
+        async for chunk in chat.astream(messages):
+            if chunk.content:
+                parts.append(chunk.content)
+                on_token(chunk.content)
+        text = "".join(parts)
+    _store(cache, key, chat, text, validate)
+    return text
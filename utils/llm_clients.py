@@ -0,0 +1,326 @@
+"""
+Process-wide OpenAI client registry and rate limiter.
+
+`get_chat_model` / `get_embeddings` hand out shared LangChain clients on top
+of keep-alive httpx pools (one sync pool per process, one async pool per
+event loop, since async connections can't cross loops), instead of a fresh
+client and TCP/TLS handshake per call. A loop's pool holds the loop alive, so
+it must be closed before the loop ends: drive short-lived loops with
+`run_async` (or await `aclose_loop_clients` last).
+
+Every HTTP request those pools send first takes a slot from a token-bucket
+scheduler enforcing OPENAI_RPM requests and OPENAI_TPM tokens per minute
+(prompt tokens estimated from the request body plus a completion allowance).
+Waiters are served strictly by priority, then arrival: interactive work
+(the default) goes before anything running under `llm_priority("batch")`,
+such as background jobs. The buckets are pulled down to what the API reports
+in its x-ratelimit-remaining-* headers, and a 429 pauses everyone for its
+Retry-After.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_COMPLETION_ALLOWANCE = int(os.getenv("OPENAI_COMPLETION_ALLOWANCE", "1000"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_KEEPALIVE_CONNECTIONS", "10"))
+OPENAI_HTTP_TIMEOUT = float(os.getenv("OPENAI_HTTP_TIMEOUT", "120"))
+CHARS_PER_TOKEN = 4
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+_PRIORITY: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the OpenAI calls made inside this block (and tasks/threads it spawns) at `priority`."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}'; expected one of {list(PRIORITIES)}")
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class _Bucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+class RateLimiter:
+    """RPM + TPM token buckets shared by every thread and event loop, granting strictly by priority."""
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM):
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+        self._waiting: list = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+    def _try_acquire(self, ticket: Tuple[int, int], tokens: int) -> float:
+        """Take the slot and return 0 if `ticket` is first in line and the buckets allow it, else seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if self._waiting[0] != ticket:
+                return 0.01
+            if now < self._paused_until:
+                return self._paused_until - now
+            wait = 0.0
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_for(amount))
+            if wait > 0:
+                return wait
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.level -= min(amount, bucket.capacity)
+            heapq.heappop(self._waiting)
+            return 0.0
+
+    def _enqueue(self) -> Tuple[int, int]:
+        ticket = (PRIORITIES[_PRIORITY.get()], next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket: Tuple[int, int]) -> None:
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until a request costing `tokens` may be sent; returns the seconds spent waiting."""
+        ticket, start = self._enqueue(), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait <= 0:
+                    return time.monotonic() - start
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async `acquire`: waits with asyncio.sleep so the event loop keeps running."""
+        ticket, start = self._enqueue(), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait <= 0:
+                    return time.monotonic() - start
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def observe(self, response: httpx.Response) -> None:
+        """Align the buckets with the server's view of the quota; on 429 pause all callers."""
+        headers = response.headers
+        with self._lock:
+            now = time.monotonic()
+            for bucket, header in ((self._requests, "x-ratelimit-remaining-requests"), (self._tokens, "x-ratelimit-remaining-tokens")):
+                try:
+                    remaining = float(headers[header])
+                except (KeyError, ValueError):
+                    continue
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, remaining)
+            if response.status_code == 429:
+                try:
+                    retry_after = float(headers.get("retry-after", "1"))
+                except ValueError:
+                    retry_after = 1.0
+                self._paused_until = max(self._paused_until, now + retry_after)
+                logging.warning(f"⏳ OpenAI rate limit hit; pausing requests for {retry_after:.1f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            return {
+                "requests_available": round(self._requests.level, 1) if self._requests else None,
+                "tokens_available": round(self._tokens.level) if self._tokens else None,
+                "waiting": len(self._waiting),
+                "paused_for": round(max(self._paused_until - now, 0.0), 3),
+            }
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Rough token cost of an OpenAI request: body text / 4, plus max_tokens or an allowance for chat output."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return OPENAI_COMPLETION_ALLOWANCE
+    if "messages" in body:
+        prompt = sum(len(str(m.get("content") or "")) for m in body["messages"]) // CHARS_PER_TOKEN
+        completion = body.get("max_completion_tokens") or body.get("max_tokens") or OPENAI_COMPLETION_ALLOWANCE
+        return prompt + int(completion)
+    texts = body.get("input", "")
+    if isinstance(texts, str):
+        return len(texts) // CHARS_PER_TOKEN + 1
+    # Embedding inputs may be pre-tokenized (lists of token ids)
+    return sum(len(t) if isinstance(t, list) else len(str(t)) // CHARS_PER_TOKEN + 1 for t in texts)
+
+
+_LIMITER: Optional[RateLimiter] = None
+_SYNC_HTTP: Optional[httpx.Client] = None
+_SYNC_MODELS: Dict[Tuple, Any] = {}
+# Per event loop: its async pool and the models bound to it; removed by aclose_loop_clients
+_LOOP_STATE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _LIMITER
+    with _REGISTRY_LOCK:
+        if _LIMITER is None:
+            _LIMITER = RateLimiter()
+        return _LIMITER
+
+
+_SSL_CONTEXT = None
+
+
+def _pool_options() -> Dict[str, Any]:
+    # Loading the CA bundle costs tens of ms, so every pool (one per event loop) shares one SSL context
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        _SSL_CONTEXT = httpx.create_ssl_context()
+    return {
+        "limits": httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS),
+        "timeout": OPENAI_HTTP_TIMEOUT,
+        "verify": _SSL_CONTEXT,
+    }
+
+
+def _sync_http() -> httpx.Client:
+    global _SYNC_HTTP
+    limiter = get_rate_limiter()
+    with _REGISTRY_LOCK:
+        if _SYNC_HTTP is None:
+            _SYNC_HTTP = httpx.Client(
+                **_pool_options(),
+                event_hooks={
+                    "request": [lambda request: limiter.acquire(estimate_request_tokens(request))],
+                    "response": [limiter.observe],
+                },
+            )
+        return _SYNC_HTTP
+
+
+def _loop_state() -> Optional[Dict[str, Any]]:
+    """Async pool and model cache of the running event loop (None outside one)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    limiter = get_rate_limiter()
+
+    async def _before(request: httpx.Request) -> None:
+        await limiter.aacquire(estimate_request_tokens(request))
+
+    async def _after(response: httpx.Response) -> None:
+        limiter.observe(response)
+
+    with _REGISTRY_LOCK:
+        state = _LOOP_STATE.get(loop)
+        if state is None:
+            http = httpx.AsyncClient(**_pool_options(), event_hooks={"request": [_before], "response": [_after]})
+            state = _LOOP_STATE[loop] = {"http": http, "models": {}}
+        return state
+
+
+def _shared(factory, key: Tuple, **kwargs):
+    # A client created inside an event loop also gets that loop's async pool, so it is cached per loop
+    state = _loop_state()
+    models = _SYNC_MODELS if state is None else state["models"]
+    cache_key = (factory, key)
+    with _REGISTRY_LOCK:
+        model = models.get(cache_key)
+    if model is None:
+        extra = {} if state is None else {"http_async_client": state["http"]}
+        model = factory(http_client=_sync_http(), **extra, **kwargs)
+        with _REGISTRY_LOCK:
+            model = models.setdefault(cache_key, model)
+    return model
+
+
+def get_chat_model(model: str, temperature: float = 0.0) -> ChatOpenAI:
+    """Shared ChatOpenAI for (model, temperature) on the process-wide, rate-limited HTTP pools."""
+    return _shared(ChatOpenAI, (model, temperature), model=model, temperature=temperature)
+
+
+def get_embeddings(model: str) -> OpenAIEmbeddings:
+    """Shared OpenAIEmbeddings for `model` on the process-wide, rate-limited HTTP pools."""
+    return _shared(OpenAIEmbeddings, (model,), model=model)
+
+
+async def aclose_loop_clients() -> None:
+    """Close the running loop's async pool and forget the models bound to it."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    with _REGISTRY_LOCK:
+        state = _LOOP_STATE.pop(loop, None)
+    if state is not None:
+        await state["http"].aclose()
+
+
+def run_async(coro):
+    """`asyncio.run(coro)`, closing the async pool the coroutine opened before the loop ends."""
+
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await aclose_loop_clients()
+
+    return asyncio.run(_main())
+
+
+def close_clients() -> None:
+    """Close the sync pool and forget the shared sync models (async pools: see aclose_loop_clients)."""
+    global _SYNC_HTTP
+    with _REGISTRY_LOCK:
+        if _SYNC_HTTP is not None:
+            _SYNC_HTTP.close()
+            _SYNC_HTTP = None
+        _SYNC_MODELS.clear()
@@ -1,7 +1,24 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Sequence
  
+import numpy as np
+ 
+from utils.cashflows import irr
 from utils.helpers import _to_number, compute_irr
  
+# Assumptions behind the default financing when no debt service / equity is given:
+# debt service of 5% of price on a 75% LTV loan, 2% annual growth over a 5-year hold
+DEFAULT_LTV = 0.75
+DEFAULT_DEBT_CONSTANT = 0.05 / DEFAULT_LTV
+DEFAULT_RENT_GROWTH = 0.02
+DEFAULT_AMORTIZATION_YEARS = 30
+IRR_HOLD_YEARS = 5
+ 
+SENSITIVITY_AXES = ("purchase_price", "interest_rate", "ltv", "rent_growth")
+# Each cell is one IRR row plus five metric values in the JSON response
+SENSITIVITY_MAX_CELLS = 250_000
+# Metrics whose inputs (sqft, unit count) come from the narrative unless overridden
+NARRATIVE_METRICS = {"price_per_sqft": "total_building_sqft", "price_per_unit": "total_units"}
+ 
  
 def safe_div(numerator: Optional[float], denominator: Optional[float]) -> Optional[float]:
     """Safely divide two numbers, returning None if denominator is zero/invalid."""
@@ -15,16 +32,13 @@ def safe_div(numerator: Optional[float], denominator: Optional[float]) -> Option
         return None
  
  
-def compute_metrics(
+def _resolve_inputs(
     t12: Dict[str, Any],
     rent_roll: Dict[str, Any],
     narrative: Dict[str, Any],
-    overrides: Optional[Dict[str, Any]] = None
+    overrides: Dict[str, Any]
 ) -> Dict[str, Any]:
-    """Compute key underwriting metrics from T12, Rent Roll, Narrative, and optional overrides."""
-    overrides = overrides or {}
- 
-    # Core financials
+    """Pick each underwriting input from overrides first, then the T12 / rent roll / narrative."""
     noi = _to_number(overrides.get("net_operating_income")) or _to_number(t12.get("net_operating_income"))
     gpr = _to_number(overrides.get("gross_potential_rent")) or _to_number(t12.get("gross_potential_rent"))
     egi = _to_number(overrides.get("effective_gross_income")) or _to_number(t12.get("effective_gross_income"))
@@ -54,25 +68,53 @@ def compute_metrics(
     if not purchase_price and noi:
         purchase_price = 5000000  # assume 7.5% cap if price not given
  
+    return {
+        "noi": noi,
+        "gpr": gpr,
+        "egi": egi,
+        "opex": opex,
+        "current_rent_total": current_rent_total,
+        "market_rent_total": market_rent_total,
+        "rent_gap_pct": rent_gap_pct,
+        "sqft": sqft,
+        "units": units,
+        "purchase_price": purchase_price,
+    }
+ 
+ 
+def compute_metrics(
+    t12: Dict[str, Any],
+    rent_roll: Dict[str, Any],
+    narrative: Dict[str, Any],
+    overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Compute key underwriting metrics from T12, Rent Roll, Narrative, and optional overrides."""
+    overrides = overrides or {}
+    inputs = _resolve_inputs(t12, rent_roll, narrative, overrides)
+    noi = inputs["noi"]
+    egi = inputs["egi"]
+    opex = inputs["opex"]
+    purchase_price = inputs["purchase_price"]
+ 
     annual_debt_service = _to_number(overrides.get("annual_debt_service")) or (
-        purchase_price * 0.05 if purchase_price else None
+        purchase_price * DEFAULT_LTV * DEFAULT_DEBT_CONSTANT if purchase_price else None
     )
     equity_invested = _to_number(overrides.get("equity_invested")) or (
-        purchase_price * 0.25 if purchase_price else None
+        purchase_price * (1 - DEFAULT_LTV) if purchase_price else None
     )
  
     # Metrics
     cap_rate = safe_div(noi, purchase_price)
     dscr = safe_div(noi, annual_debt_service)
     coc = safe_div((noi - annual_debt_service) if (noi and annual_debt_service) else None, equity_invested)
-    price_per_sf = safe_div(purchase_price, sqft)
-    price_per_unit = safe_div(purchase_price, units)
+    price_per_sf = safe_div(purchase_price, inputs["sqft"])
+    price_per_unit = safe_div(purchase_price, inputs["units"])
     break_even_occ = safe_div((opex or 0.0) + (annual_debt_service or 0.0), egi)
  
     # Compute 5-year IRR using NOI - debt service as proxy cash flow
     if noi is not None and annual_debt_service is not None:
         base_cash_flow = noi - annual_debt_service
-        cash_flows = [base_cash_flow * ((1 + 0.02) ** i) for i in range(1, 6)]
+        cash_flows = [base_cash_flow * ((1 + DEFAULT_RENT_GROWTH) ** i) for i in range(1, IRR_HOLD_YEARS + 1)]
         cash_flows.insert(0, -equity_invested if equity_invested else -purchase_price)
         try:
             irr_5yr = compute_irr(cash_flows)
@@ -86,11 +128,117 @@ def compute_metrics(
         "dscr": dscr,
         "coc_return": coc,
         "irr_5yr": irr_5yr,
-        "rent_gap_pct": rent_gap_pct,
+        "rent_gap_pct": inputs["rent_gap_pct"],
         "price_per_sqft": price_per_sf,
         "price_per_unit": price_per_unit,
         "break_even_occupancy": break_even_occ,
-        "current_rent_total": current_rent_total,
-        "market_rent_total": market_rent_total,
+        "current_rent_total": inputs["current_rent_total"],
+        "market_rent_total": inputs["market_rent_total"],
         "purchase_price": purchase_price
-    }
\ No newline at end of file
+    }
+ 
+ 
+def mortgage_constant(rate, amortization_years: float = DEFAULT_AMORTIZATION_YEARS):
+    """Annual debt service per dollar of loan for monthly payments; works elementwise on arrays."""
+    rate = np.asarray(rate, dtype=float)
+    n = amortization_years * 12
+    monthly = rate / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = monthly / (1 - (1 + monthly) ** -n)
+    return np.where(monthly == 0, 1.0 / amortization_years, payment * 12)
+ 
+ 
+def _num(value: Optional[float]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _override(overrides: Dict[str, Any], key: str, default: float) -> float:
+    """Numeric override or `default`; an explicit 0 (all-cash, flat rents) is kept."""
+    value = _to_number(overrides.get(key))
+    return value if value is not None else default
+ 
+ 
+def compute_metrics_grid(
+    t12: Dict[str, Any],
+    rent_roll: Dict[str, Any],
+    narrative: Dict[str, Any],
+    axes: Dict[str, Sequence[float]],
+    overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Cap rate, DSCR, CoC, 5-year IRR and break-even occupancy over every combination of `axes`.
+ 
+    `axes` maps any of SENSITIVITY_AXES to the values to try (rates, LTV and growth as fractions);
+    grid dimensions follow the order of `axes`. Inputs are resolved as in `compute_metrics`, and
+    at a point matching its assumptions the grid reproduces its numbers. Once an `interest_rate`
+    is given (axis or override), debt service is loan * mortgage_constant(rate, amortization_years);
+    otherwise the default debt constant applies. Cells that cannot be computed are None.
+    """
+    overrides = overrides or {}
+    unknown = [name for name in axes if name not in SENSITIVITY_AXES]
+    if unknown:
+        raise ValueError(f"Unknown sensitivity axes {unknown}; expected any of {list(SENSITIVITY_AXES)}")
+    names = list(axes)
+    values = [np.asarray(axes[name], dtype=float).ravel() for name in names]
+    if any(v.size == 0 for v in values):
+        raise ValueError("Every sensitivity axis needs at least one value")
+    shape = tuple(v.size for v in values)
+    if int(np.prod(shape)) > SENSITIVITY_MAX_CELLS:
+        raise ValueError(f"Grid of {int(np.prod(shape))} cells exceeds the limit of {SENSITIVITY_MAX_CELLS}")
+ 
+    def axis(name: str, default: Optional[float]) -> np.ndarray:
+        """Axis values shaped to broadcast along their own dimension, or the scalar default."""
+        if name not in axes:
+            return np.asarray(_num(default))
+        i = names.index(name)
+        return values[i].reshape([-1 if j == i else 1 for j in range(len(names))])
+ 
+    inputs = _resolve_inputs(t12, rent_roll, narrative, overrides)
+    noi = _num(inputs["noi"])
+    egi = _num(inputs["egi"])
+    opex = inputs["opex"] or 0.0
+ 
+    price = axis("purchase_price", inputs["purchase_price"])
+    ltv = axis("ltv", _override(overrides, "ltv", DEFAULT_LTV))
+    growth = axis("rent_growth", _override(overrides, "rent_growth", DEFAULT_RENT_GROWTH))
+    loan = price * ltv
+ 
+    fixed_debt_service = _to_number(overrides.get("annual_debt_service"))
+    fixed_equity = _to_number(overrides.get("equity_invested"))
+    if "interest_rate" in axes or _to_number(overrides.get("interest_rate")) is not None:
+        rate = axis("interest_rate", _to_number(overrides.get("interest_rate")))
+        amortization = _override(overrides, "amortization_years", DEFAULT_AMORTIZATION_YEARS)
+        debt_service = loan * mortgage_constant(rate, amortization)
+    elif fixed_debt_service and "ltv" not in axes:
+        debt_service = np.asarray(fixed_debt_service)
+    else:
+        debt_service = loan * DEFAULT_DEBT_CONSTANT
+    if fixed_equity and "ltv" not in axes and "purchase_price" not in axes:
+        equity = np.asarray(fixed_equity)
+    else:
+        equity = price - loan
+ 
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grids = {
+            "cap_rate": noi / price,
+            "dscr": noi / debt_service,
+            "coc_return": (noi - debt_service) / equity,
+            "break_even_occupancy": (opex + debt_service) / egi,
+        }
+ 
+        # One IRR row per cell: -equity, then the levered cash flow grown over the hold
+        years = np.arange(1, IRR_HOLD_YEARS + 1)
+        levered = np.broadcast_to(noi - debt_service, shape)[..., np.newaxis]
+        growth_path = (1 + np.broadcast_to(growth, shape)[..., np.newaxis]) ** years
+        outlay = np.broadcast_to(np.where(equity > 0, equity, price), shape)[..., np.newaxis]
+        cash_flows = np.concatenate([-outlay, levered * growth_path], axis=-1)
+        grids["irr_5yr"] = irr(cash_flows.reshape(-1, IRR_HOLD_YEARS + 1)).reshape(shape) * 100
+ 
+    return {
+        "axes": {name: v.tolist() for name, v in zip(names, values)},
+        "shape": list(shape),
+        "metrics": {
+            key: np.where(np.isfinite(grid), np.broadcast_to(grid, shape), None).tolist()
+            for key, grid in grids.items()
+        },
+    }
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from langsmith import traceable
 from utils.file_loaders import *
 from utils.table_parsers import *
@@ -8,24 +9,73 @@ from utils.aggregation import *
 from utils.metrics import *
 from utils.ai_analysis import *
 from utils.ai_summary import *
+from utils.ai_writeups import generate_ai_writeups
+from utils.llm_clients import run_async
+from utils.leases import analyze_leases
+from utils.field_extraction import extract_fields_deterministic, resolve_fields
 from typing import *
 from utils.rag_narrative import *
+from utils.pdf_session import pdf_session_scope
+from utils.table_registry import table_registry_scope
+from utils.debug_artifacts import debug_artifacts_scope
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-def run_pipeline(inputs: List[str], overrides: Optional[Dict[str, Any]] = None):
-    print("\n--- LOADING FILES ---")
-    docs = load_files(inputs)
+def parse_deal_documents(
+    paths: List[str],
+    lease_assumptions: Optional[Dict[str, float]] = None,
+    job_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    CPU-bound half of the pipeline: load + chunk files, extract tables and aggregate them
+    (including the lease-level rent roll projection), and pull regex-resolvable narrative
+    fields from the page text. Module-level and picklable in and out, so the API can run it
+    in a worker process. Parser debug artifacts (when enabled) are filed under `job_id`.
+    """
+    # Loader tables live in a per-call registry and each PDF gets one
+    # pdfplumber open + layout pass shared by table and text parsers.
+    # The artifact scope is opened here because this runs in a worker process.
+    with table_registry_scope(), pdf_session_scope(), debug_artifacts_scope(job_id):
+        print("\n--- LOADING FILES ---")
+        docs = load_files(paths)
+
+        print("\n--- EXTRACTING STRUCTURED TABLES ---")
+        table_dfs = extract_tables_to_dataframes_from_docs(docs)
+        rent_roll_summary = aggregate_rent_roll(table_dfs.get("rent_roll", []), paths)
+        t12_summary = aggregate_t12(table_dfs.get("t12", []), paths)
+        lease_analysis = analyze_leases(table_dfs.get("rent_roll", []), assumptions=lease_assumptions)
+        field_candidates = extract_fields_deterministic(docs)
+    # Table ids only resolve inside the registry scope that just closed (in the worker, when run
+    # through run_cpu), so don't hand them back; the parsed tables are returned in table_dfs
+    docs = [
+        Document(page_content=d.page_content, metadata={k: v for k, v in d.metadata.items() if k != "table_id"})
+        for d in docs
+    ]
+    return {
+        "docs": docs,
+        "table_dfs": table_dfs,
+        "rent_roll_summary": rent_roll_summary,
+        "t12_summary": t12_summary,
+        "lease_analysis": lease_analysis,
+        "field_candidates": field_candidates,
+    }
 
-    print("\n--- EXTRACTING STRUCTURED TABLES ---")
-    table_dfs = extract_tables_to_dataframes_from_docs(docs)
-    rent_roll_summary = aggregate_rent_roll(table_dfs.get("rent_roll", []), inputs)
-    t12_summary = aggregate_t12(table_dfs.get("t12", []), inputs)
+
+def run_pipeline(inputs: List[str], overrides: Optional[Dict[str, Any]] = None):
+    parsed = parse_deal_documents(inputs, (overrides or {}).get("lease_assumptions"))
+    docs = parsed["docs"]
+    rent_roll_summary = parsed["rent_roll_summary"]
+    t12_summary = parsed["t12_summary"]
 
     print("\n--- RAG NARRATIVE EXTRACTION ---")
-    splits = split_documents(docs)
-    vs = build_vectorstore_incremental(splits)
-    narrative_fields = extract_narrative_fields(vs)
+    narrative_fields, missing = resolve_fields(parsed["field_candidates"])
+    if missing:
+        # Only embed the deal and ask the LLM for fields the page text didn't settle
+        vs = build_vectorstore_incremental(docs)
+        narrative_fields = {**extract_narrative_fields(vs, fields=missing), **narrative_fields}
+    else:
+        print("All narrative fields resolved from page text; skipping embeddings and LLM")
     
 
     print("\n--- METRICS ---")
@@ -34,8 +84,12 @@ def run_pipeline(inputs: List[str], overrides: Optional[Dict[str, Any]] = None):
         print(f"{k}: {v}")
 
     print("\n--- AI UNDERWRITING ANALYSIS ---")
-    ai_analysis = generate_underwriting_analysis(narrative_fields, metrics)
-    executive_summary = generate_executive_summary(narrative_fields, metrics)
+    # The CLI report prints the analysis and executive summary only, so don't pay for ai_summary
+    writeups = run_async(generate_ai_writeups(narrative_fields, metrics, names=("ai_analysis", "executive_summary")))
+    ai_analysis = writeups["ai_analysis"]
+    executive_summary = writeups["executive_summary"]
+    if writeups["partial"]:
+        print(f"[WARN] AI write-ups timed out: {', '.join(writeups['timed_out'])}")
     
     print(json.dumps(ai_analysis, indent=2))
 
@@ -48,6 +102,8 @@ def run_pipeline(inputs: List[str], overrides: Optional[Dict[str, Any]] = None):
     print(f"Expenses (from T12): {t12_summary.get('operating_expenses')}")
     print(f"GPR (from T12): {t12_summary.get('gross_potential_rent')}")
     print(f"Rent Gap %: {metrics.get('rent_gap_pct')}")
+    if parsed["lease_analysis"]:
+        print(f"WALT (years, by rent): {parsed['lease_analysis'].get('walt_years_by_rent')}")
     print(f"5-Year IRR: {metrics.get('irr_5yr')}%")
     print(f"Investment Recommendation: {ai_analysis.get('investment_recommendation')}")
     print(f"Key Investment Highlights: {ai_analysis.get('key_investment_highlights')}")
@@ -0,0 +1,150 @@
+"""
+Content-addressed on-disk cache for parsed deal documents.
+
+Entries are keyed by the SHA-256 of the file bytes, the file extension and the
+loader config version, so an identical re-upload (even under a new temp path)
+skips every PDF loader, OCR and chunking. Each entry is a zlib-compressed
+pickle of the extracted Documents plus the registry tables they reference;
+the cache is trimmed least-recently-used first once it grows past
+PARSE_CACHE_MAX_BYTES.
+"""
+
+import os
+import hashlib
+import logging
+import pickle
+import tempfile
+import zlib
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from langchain.schema import Document
+from utils.table_registry import current_table_registry
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+PARSE_CACHE_DIR = os.getenv(
+    "PARSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "parse")
+)
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+_ENTRY_SUFFIX = ".bin"
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(digest: str, ext: str, config_version: str) -> str:
+    """Combine content hash, extension and loader config version into an entry key."""
+    raw = f"{digest}:{ext.lower()}:{config_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(PARSE_CACHE_DIR, key[:2], key + _ENTRY_SUFFIX)
+
+
+def get_cached_documents(key: str, source: str) -> Optional[List[Document]]:
+    """
+    Return the cached Documents for `key`, or None on a miss.
+    The `source` metadata is rewritten to the current path, since uploads land in a fresh temp dir each request,
+    and referenced tables are re-registered under their original ids.
+    """
+    if not PARSE_CACHE_ENABLED:
+        return None
+    path = _entry_path(key)
+    try:
+        with open(path, "rb") as fh:
+            payload = pickle.loads(zlib.decompress(fh.read()))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"⚠️ Dropping unreadable parse cache entry {key[:12]}: {e}")
+        _remove_quietly(path)
+        return None
+
+    # Touch the entry so LRU eviction keeps it around
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+    registry = current_table_registry()
+    for table_id, df in payload.get("tables", {}).items():
+        registry.register(df, table_id=table_id)
+
+    docs = []
+    for content, meta in payload["docs"]:
+        meta = dict(meta)
+        meta["source"] = source
+        docs.append(Document(page_content=content, metadata=meta))
+    return docs
+
+
+def put_cached_documents(key: str, docs: List[Document]) -> None:
+    """Store Documents under `key` and evict old entries if the cache is over its size cap."""
+    if not PARSE_CACHE_ENABLED:
+        return
+    path = _entry_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        registry = current_table_registry()
+        table_ids = {d.metadata.get("table_id") for d in docs} - {None}
+        tables = {tid: registry.get(tid) for tid in table_ids if tid in registry}
+        payload = {"docs": [(d.page_content, dict(d.metadata or {})) for d in docs], "tables": tables}
+        blob = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        # Write to a temp file and rename so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(blob)
+        os.replace(tmp, path)
+    except Exception as e:
+        logging.warning(f"⚠️ Failed to write parse cache entry {key[:12]}: {e}")
+        return
+    evict_parse_cache()
+
+
+def evict_parse_cache(max_bytes: int = None) -> int:
+    """Delete least-recently-used entries until the cache fits in `max_bytes`. Returns entries removed."""
+    max_bytes = PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for root, _, files in os.walk(PARSE_CACHE_DIR):
+        for name in files:
+            if not name.endswith(_ENTRY_SUFFIX):
+                continue
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+            total += st.st_size
+
+    removed = 0
+    if total <= max_bytes:
+        return removed
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        if _remove_quietly(full):
+            total -= size
+            removed += 1
+    if removed:
+        logging.info(f"🧹 Evicted {removed} parse cache entries (now {total:,} bytes)")
+    return removed
+
+
+def _remove_quietly(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
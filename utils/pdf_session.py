@@ -0,0 +1,96 @@
+"""
+Per-request PDF sessions.
+
+A PdfSession opens a PDF with pdfplumber once and memoizes each page's text
+and tables on first use, so the table and text parsers share a single
+layout analysis per page. Inside `pdf_session_scope()` every parser that asks
+for the same path gets the same session; outside a scope each caller gets a
+private session that is closed when its `with` block ends.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import pdfplumber
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+_ACTIVE_SESSIONS: ContextVar[Optional[Dict[str, "PdfSession"]]] = ContextVar("pdf_sessions", default=None)
+
+
+class PdfSession:
+    """Lazily opened pdfplumber document with per-page memoized text and tables."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pdf = None
+        self._text: Dict[int, str] = {}
+        self._tables: Dict[int, List[List[List[Optional[str]]]]] = {}
+
+    @property
+    def pdf(self):
+        if self._pdf is None:
+            self._pdf = pdfplumber.open(self.path)
+        return self._pdf
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pdf.pages)
+
+    def page_text(self, i: int) -> str:
+        if i not in self._text:
+            self._text[i] = self.pdf.pages[i].extract_text() or ""
+        return self._text[i]
+
+    def page_tables(self, i: int) -> List[List[List[Optional[str]]]]:
+        if i not in self._tables:
+            try:
+                self._tables[i] = self.pdf.pages[i].extract_tables() or []
+            except Exception:
+                self._tables[i] = []
+        return self._tables[i]
+
+    def page_texts(self) -> List[str]:
+        return [self.page_text(i) for i in range(self.page_count)]
+
+    def full_text(self) -> str:
+        return "\n".join(self.page_texts())
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+@contextmanager
+def pdf_session_scope():
+    """Share one PdfSession per path for everything run inside this block (one request)."""
+    sessions: Dict[str, PdfSession] = {}
+    token = _ACTIVE_SESSIONS.set(sessions)
+    try:
+        yield sessions
+    finally:
+        _ACTIVE_SESSIONS.reset(token)
+        for session in sessions.values():
+            session.close()
+
+
+@contextmanager
+def open_pdf_session(path: str):
+    """Yield the scoped session for `path`, or a private one closed on exit when no scope is active."""
+    sessions = _ACTIVE_SESSIONS.get()
+    if sessions is not None:
+        key = os.path.abspath(path)
+        if key not in sessions:
+            sessions[key] = PdfSession(path)
+        yield sessions[key]
+        return
+
+    session = PdfSession(path)
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,243 @@
+"""
+Write-behind persistence for underwriting results.
+
+`WriteBehindQueue.enqueue` appends a row to a durable local SQLite spool and
+returns immediately; a background thread drains the spool into the database
+in batches. A failed insert is retried with exponential backoff (plus
+jitter); retried rows go one at a time so a single bad row cannot hold back
+the rest. A row that still fails after PERSIST_MAX_ATTEMPTS while other
+inserts succeed is kept in the spool as "dead" for inspection rather than
+deleted; during an outage rows just keep retrying. Nothing is lost.
+
+The database client is injected as a factory returning anything with the
+supabase-py shape `client.table(name).insert(rows).execute()`;
+`SQLiteTableClient` is a local stand-in with that shape.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+PERSIST_SPOOL_PATH = os.getenv(
+    "PERSIST_SPOOL_PATH", os.path.join(os.path.expanduser("~"), ".cache", "underwriting", "spool.sqlite3")
+)
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "50"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "1.0"))
+PERSIST_BACKOFF_BASE = float(os.getenv("PERSIST_BACKOFF_BASE", "1.0"))
+PERSIST_BACKOFF_MAX = float(os.getenv("PERSIST_BACKOFF_MAX", "300"))
+PERSIST_MAX_ATTEMPTS = int(os.getenv("PERSIST_MAX_ATTEMPTS", "20"))
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class WriteBehindQueue:
+    """SQLite-spooled insert queue drained by one background thread."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        path: str = PERSIST_SPOOL_PATH,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        flush_interval: float = PERSIST_FLUSH_INTERVAL,
+        max_attempts: int = PERSIST_MAX_ATTEMPTS,
+    ):
+        self.client_factory = client_factory
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one sender at a time, so a row is never inserted twice
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_error: Optional[str] = None
+        self._last_flush_at: Optional[float] = None
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, payload TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,"
+            " last_error TEXT, dead INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spool_due ON spool(dead, next_attempt_at)")
+
+    # -- producer side ---------------------------------------------------------------------------
+
+    def enqueue(self, target: str, row: Dict[str, Any]) -> int:
+        """Durably spool `row` for insertion into table `target`; returns its spool id."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO spool (target, payload, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (target, json.dumps(row, default=str), now, now),
+            )
+        self._wake.set()
+        return cur.lastrowid
+
+    def depth(self) -> Dict[str, Any]:
+        """Spool counts (pending first attempts, retrying, dead), the oldest row's age and the last error."""
+        with self._lock:
+            pending, retrying, dead, oldest = self._conn.execute(
+                "SELECT"
+                " COALESCE(SUM(dead = 0 AND attempts = 0), 0),"
+                " COALESCE(SUM(dead = 0 AND attempts > 0), 0),"
+                " COALESCE(SUM(dead = 1), 0),"
+                " MIN(CASE WHEN dead = 0 THEN enqueued_at END)"
+                " FROM spool"
+            ).fetchone()
+        return {
+            "depth": pending + retrying,
+            "pending": pending,
+            "retrying": retrying,
+            "dead": dead,
+            "oldest_age_seconds": round(time.time() - oldest, 3) if oldest is not None else None,
+            "last_error": self._last_error,
+            "last_flush_at": self._last_flush_at,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    # -- consumer side ---------------------------------------------------------------------------
+
+    def _due(self, now: float):
+        """Next group to send: up to batch_size fresh rows of one target, or a single retried row."""
+        with self._lock:
+            first = self._conn.execute(
+                "SELECT id, target, attempts FROM spool WHERE dead = 0 AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if first is None:
+                return []
+            if first[2] > 0:
+                return self._conn.execute(
+                    "SELECT id, target, payload, attempts FROM spool WHERE id = ?", (first[0],)
+                ).fetchall()
+            return self._conn.execute(
+                "SELECT id, target, payload, attempts FROM spool"
+                " WHERE dead = 0 AND attempts = 0 AND target = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (first[1], now, self.batch_size),
+            ).fetchall()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(PERSIST_BACKOFF_BASE * 2 ** (attempts - 1), PERSIST_BACKOFF_MAX)
+        return delay * random.uniform(0.5, 1.0)
+
+    def flush(self) -> int:
+        """Send everything that is due now; returns the number of rows written. Safe to call from any thread."""
+        with self._flush_lock:
+            written = self._drain()
+        if written:
+            logging.info(f"💾 Persisted {written} spooled row(s)")
+        return written
+
+    def _drain(self) -> int:
+        written = 0
+        while True:
+            rows = self._due(time.time())
+            if not rows:
+                break
+            target = rows[0][1]
+            ids = [r[0] for r in rows]
+            try:
+                self.client_factory().table(target).insert([json.loads(r[2]) for r in rows]).execute()
+            except Exception as e:
+                self._last_error = f"{type(e).__name__}: {e}"
+                now = time.time()
+                # Only give up on a row while other inserts are succeeding: during an outage
+                # everything keeps retrying at the capped backoff instead of going dead
+                db_healthy = self._last_flush_at is not None and now - self._last_flush_at < PERSIST_BACKOFF_MAX
+                with self._lock:
+                    for row_id, _, _, attempts in rows:
+                        attempts += 1
+                        self._conn.execute(
+                            "UPDATE spool SET attempts = ?, next_attempt_at = ?, last_error = ?, dead = ? WHERE id = ?",
+                            (attempts, now + self._backoff(attempts), self._last_error,
+                             int(db_healthy and attempts >= self.max_attempts), row_id),
+                        )
+                logging.warning(f"⚠️ Insert of {len(rows)} row(s) into {target} failed ({self._last_error}); will retry")
+                continue
+            with self._lock:
+                self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+            written += len(rows)
+            self._last_flush_at = time.time()
+        return written
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.flush()
+            except Exception as e:  # spool I/O trouble must not kill the writer
+                self._last_error = f"{type(e).__name__}: {e}"
+                logging.warning(f"⚠️ Persistence queue flush failed: {e}")
+            if self._stopping.is_set():
+                break
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+    def start(self) -> "WriteBehindQueue":
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer after a last flush attempt; anything still spooled is sent on next start."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+
+class SQLiteTableClient:
+    """
+    Local stand-in for the Supabase client (`table(name).insert(rows).execute()`), storing each
+    row as JSON in a single SQLite table. Useful for running the API or exercising the queue
+    without a database.
+    """
+
+    def __init__(self, path: str):
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows (id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, payload TEXT NOT NULL)"
+        )
+
+    def table(self, name: str) -> "_SQLiteInsert":
+        return _SQLiteInsert(self, name)
+
+    def rows(self, name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [json.loads(p) for (p,) in self._conn.execute("SELECT payload FROM rows WHERE target = ? ORDER BY id", (name,))]
+
+
+class _SQLiteInsert:
+    def __init__(self, client: SQLiteTableClient, name: str):
+        self._client, self._name, self._rows = client, name, []
+
+    def insert(self, rows):
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        with self._client._lock:
+            self._client._conn.executemany(
+                "INSERT INTO rows (target, payload) VALUES (?, ?)",
+                [(self._name, json.dumps(r, default=str)) for r in self._rows],
+            )
+        return self
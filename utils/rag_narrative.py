@@ -1,72 +1,148 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langsmith import traceable
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.file_loaders import chunk_documents
 import os
 from dotenv import load_dotenv
 from langchain_community.vectorstores.faiss import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_openai import ChatOpenAI
+from utils.embedding_cache import CachedEmbeddings
+from utils.executors import run_io
+from utils.context_builder import NARRATIVE_CANDIDATES, build_context
+from utils.field_extraction import NARRATIVE_FIELDS, format_field_value
+from utils.llm_cache import cached_invoke
+from utils.llm_clients import get_chat_model, get_embeddings, run_async
 import re
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
 import json
+import logging
+import asyncio
+import random
 
 # Load environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
-TABLE_CHUNK_SIZE = int(os.getenv("TABLE_CHUNK_SIZE", "1500"))
-TABLE_CHUNK_OVERLAP = int(os.getenv("TABLE_CHUNK_OVERLAP", "150"))
-
-
-def _format_docs(docs):
-    return "\n\n".join(d.page_content for d in docs)
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_RETRY_BASE_DELAY = float(os.getenv("EMBED_RETRY_BASE_DELAY", "1.0"))
 
 
 @traceable(name="split_documents")
-def split_documents(docs, chunk_size=TABLE_CHUNK_SIZE, chunk_overlap=TABLE_CHUNK_OVERLAP):
+def split_documents(docs, chunk_size=None):
     """
-    Splits documents into chunks. Tables are detected roughly and kept intact.
+    Chunks documents through the shared table-aware chunking stage.
+    Documents already chunked by load_files (they carry a `chunk_id`) pass through unchanged.
     """
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    final_splits = []
-    for doc in docs:
-        text = doc.page_content or ""
-        # Rough table detection: multiple numbers + newlines or tabs
-        if re.search(r"\d+\s+\d+", text) and ("\n" in text or "\t" in text):
-            final_splits.append(doc)
-        else:
-            final_splits.extend(splitter.split_documents([doc]))
+    final_splits = [d for d in docs if (d.metadata or {}).get("chunk_id")]
+    pending = [d for d in docs if not (d.metadata or {}).get("chunk_id")]
+    if pending:
+        final_splits.extend(chunk_documents(pending, chunk_size=chunk_size))
     print(f"Total chunks after table-aware splitting: {len(final_splits)}")
     return final_splits
 
 
-def build_vectorstore_incremental(docs, batch_size=50):
+def _is_rate_limit_error(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429 or type(e).__name__ == "RateLimitError" or "rate limit" in str(e).lower()
+
+
+async def _aembed_batch(emb, texts: List[str], batch_no: int, semaphore: asyncio.Semaphore) -> List[List[float]]:
+    """Embed one batch under the concurrency limit, retrying rate-limit errors with exponential backoff."""
+    async with semaphore:
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                return await emb.aembed_documents(texts)
+            except Exception as e:
+                if attempt >= EMBED_MAX_RETRIES or not _is_rate_limit_error(e):
+                    raise
+                delay = EMBED_RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+                print(f"Rate limited on embedding batch {batch_no}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+async def aembed_texts(emb: CachedEmbeddings, texts: List[str], batch_size=50, max_concurrency=None) -> List[List[float]]:
     """
-    Incrementally embeds document chunks in batches and builds FAISS.
+    Embed `texts` in concurrent batches and return vectors in input order.
+    Cache hits are served locally; only misses are sent, and each batch is written to the cache as
+    soon as it arrives, so a batch that fails for good doesn't discard the vectors already paid for.
     """
-    emb = OpenAIEmbeddings(model=EMBED_MODEL)
-    vs = None
-    for i in range(0, len(docs), batch_size):
-        batch_docs = docs[i:i + batch_size]
-        if vs is None:
-            vs = FAISS.from_documents(batch_docs, emb)
-        else:
-            vs.add_documents(batch_docs)
-        print(f"Embedded batch {i // batch_size + 1} / {len(docs) // batch_size + 1}")
-    return vs
+    max_concurrency = max_concurrency or EMBED_MAX_CONCURRENCY
+    vectors = await run_io(emb.cache.get_many, emb.model, texts) if emb.cache else [None] * len(texts)
+    misses = [i for i, v in enumerate(vectors) if v is None]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+
+    async def _embed_and_cache(batch: List[int], batch_no: int) -> None:
+        batch_texts = [texts[i] for i in batch]
+        fresh = await _aembed_batch(emb.underlying, batch_texts, batch_no, semaphore)
+        if emb.cache:
+            await run_io(emb.cache.put_many, emb.model, batch_texts, fresh)
+        for i, vec in zip(batch, fresh):
+            vectors[i] = vec
+
+    # Let every batch finish (and be cached) before surfacing the first failure
+    outcomes = await asyncio.gather(
+        *[_embed_and_cache(batch, n + 1) for n, batch in enumerate(batches)], return_exceptions=True
+    )
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors:
+        raise errors[0]
+    print(f"Embedded {len(misses)} chunks in {len(batches)} batches ({len(texts) - len(misses)} cache hits)")
+    return vectors
+
+
+async def abuild_vectorstore(docs, batch_size=50, max_concurrency=None):
+    """
+    Embeds document chunks in concurrent, retrying batches and builds the FAISS index once at the end.
+    Chunks already embedded with EMBED_MODEL are served from the local embedding cache.
+    """
+    if not docs:
+        return None
+    emb = CachedEmbeddings(get_embeddings(EMBED_MODEL), EMBED_MODEL)
+    texts = [d.page_content for d in docs]
+    vectors = await aembed_texts(emb, texts, batch_size=batch_size, max_concurrency=max_concurrency)
+    # Key the index on stable chunk ids when they are unique (the same file uploaded twice repeats them)
+    ids = [d.metadata.get("chunk_id") for d in docs]
+    ids = ids if all(ids) and len(set(ids)) == len(ids) else None
+    # Building the index is CPU work; keep it off the event loop
+    return await run_io(
+        FAISS.from_embeddings, list(zip(texts, vectors)), emb, metadatas=[d.metadata for d in docs], ids=ids
+    )
+
+
+def build_vectorstore_incremental(docs, batch_size=50, max_concurrency=None):
+    """Synchronous entrypoint for abuild_vectorstore (for callers outside an event loop)."""
+    return run_async(abuild_vectorstore(docs, batch_size=batch_size, max_concurrency=max_concurrency))
+
+
+def _parse_json_answer(text: str) -> Dict[str, Any]:
+    """The JSON object in an LLM answer, with any Markdown code fence removed; raises ValueError otherwise."""
+    # Clean up Markdown JSON formatting
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip(), flags=re.I | re.M)
+    parsed = json.loads(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("expected a JSON object")
+    return parsed
 
 
 @traceable(name="extract_narrative_fields")
-def extract_narrative_fields(vs, pdf_path: str = None) -> Dict[str, Any]:
+def extract_narrative_fields(vs, pdf_path: str = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Uses RAG + LLM to extract property details.
+    `fields` limits the prompt (and the result) to a subset of NARRATIVE_FIELDS, e.g. the ones the
+    deterministic extractor could not resolve. Without a vectorstore every field is 'Not found'.
     If fields are missing, defaults to 'Not found' instead of None.
     """
-    retriever = vs.as_retriever(search_type="similarity", search_kwargs={"k": 6})
-    llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
+    fields = list(fields) if fields else list(NARRATIVE_FIELDS)
+    if vs is None:
+        return {key: "Not found" for key in fields}
 
+    # Over-fetch, then let build_context dedupe and trim the hits to the token budget
+    retriever = vs.as_retriever(search_type="similarity", search_kwargs={"k": NARRATIVE_CANDIDATES})
+    llm = get_chat_model(LLM_MODEL, temperature=0)
+
+    field_list = "\n".join(f"- {key}" for key in fields)
     prompt = ChatPromptTemplate.from_messages([
         (
             "system",
@@ -75,55 +151,46 @@ def extract_narrative_fields(vs, pdf_path: str = None) -> Dict[str, Any]:
         ),
         (
             "human",
-            """Extract these fields:
-- purchase_price
-- property_name
-- property_address
-- property_type
-- year_built
-- renovation_year
-- number_of_stories
-- total_units_or_suites
-- total_building_sqft
-- amenities
+            "Extract these fields:\n" + field_list.replace("{", "{{").replace("}", "}}") + """
 
 Context:
 {context}"""
         ),
     ])
 
+    def _budgeted_context(docs):
+        context, stats = build_context(docs, fields, model=LLM_MODEL)
+        logging.info(
+            f"✂️ Narrative context: {stats['selected']}/{stats['candidates']} chunks, "
+            f"{stats['context_tokens']} tokens ({stats['tokens_saved']} saved, {stats['duplicates_dropped']} duplicates dropped)"
+        )
+        return context
+
     parallel = RunnableParallel({
-        "context": retriever | RunnableLambda(_format_docs),
+        "context": retriever | RunnableLambda(_budgeted_context),
         "question": RunnablePassthrough(),
     })
-    chain = parallel | prompt | llm | StrOutputParser()
+    # The rendered prompt (retrieved context included) is the cache key, so only retrieval runs on a hit;
+    # answers that aren't a JSON object are not cached, so the next run asks again
+    chain = parallel | prompt | RunnableLambda(
+        lambda prompt_value: cached_invoke(llm, prompt_value.to_messages(), validate=_parse_json_answer)
+    )
 
-    query = "Extract property details (name, address, type, year built, sqft, units, amenities)"
+    query = "Extract property details: " + ", ".join(key.replace("_", " ") for key in fields)
     out = chain.invoke(query)
 
-    # Clean up Markdown JSON formatting
-    out = re.sub(r"^```(?:json)?\s*|\s*```$", "", out.strip(), flags=re.I | re.M)
-
     try:
-        narrative = json.loads(out)
+        narrative = _parse_json_answer(out)
     except Exception:
         narrative = {"raw": out}
 
     # Default fallback values (so you don't get None or "I don't know")
-    for key in [
-        "property_name",
-        "property_address",
-        "purchase_price",
-        "property_type",
-        "year_built",
-        "renovation_year",
-        "number_of_stories",
-        "total_units_or_suites",
-        "total_building_sqft",
-        "amenities",
-    ]:
+    for key in fields:
         if not narrative.get(key) or "I don't know" in str(narrative.get(key)):
             narrative[key] = "Not found"
+        else:
+            # JSON mode sometimes returns numbers or lists; keep every narrative value a string
+            narrative[key] = format_field_value(key, narrative[key])
 
     return narrative
 def extract_sqft_value(value):
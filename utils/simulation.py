@@ -0,0 +1,209 @@
+"""
+Monte Carlo underwriting.
+
+`simulate_deal` draws rent growth, vacancy, expense growth, interest-rate
+shocks and the exit cap rate for every path from configurable distributions
+(seeded, so a run is reproducible), then projects NOI, debt service, DSCR and
+levered equity cash flows for all paths at once as (paths, years) arrays and
+solves every path's IRR in one vectorized call.
+
+A distribution spec is a dict such as {"dist": "normal", "mean": 0.02,
+"std": 0.01}; supported kinds are normal (mean, std), lognormal (mean, sigma),
+uniform (low, high), triangular (low, mode, high) and fixed (value). Optional
+"min" / "max" clip the draws.
+"""
+
+import os
+import warnings
+from typing import Any, Dict, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.cashflows import irr
+from utils.helpers import _to_number
+from utils.metrics import (
+    DEFAULT_AMORTIZATION_YEARS, DEFAULT_LTV, IRR_HOLD_YEARS, _override, _resolve_inputs, mortgage_constant,
+)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+SIMULATION_PATHS = int(os.getenv("SIMULATION_PATHS", "10000"))
+SIMULATION_MAX_PATHS = int(os.getenv("SIMULATION_MAX_PATHS", "200000"))
+# Per-year draws, debt service and cash flows are (paths, hold_years) arrays
+SIMULATION_MAX_HOLD_YEARS = int(os.getenv("SIMULATION_MAX_HOLD_YEARS", "30"))
+
+DEFAULT_INTEREST_RATE = 0.065
+DEFAULT_SELLING_COSTS = 0.02
+DEFAULT_COVENANTS = {"min_dscr": 1.25, "min_debt_yield": None}
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Drawn in this order, so adding a variable never changes the draws of the ones before it
+SIMULATED_VARIABLES = ("rent_growth", "vacancy", "expense_growth", "rate_shock", "exit_cap")
+PER_YEAR_VARIABLES = ("rent_growth", "vacancy", "expense_growth", "rate_shock")
+
+
+def default_distributions(going_in_cap: Optional[float], vacancy: Optional[float]) -> Dict[str, Dict[str, Any]]:
+    """Distributions used for any variable the caller does not specify."""
+    exit_cap = (going_in_cap or 0.07) + 0.005  # assume modest cap-rate expansion by exit
+    return {
+        "rent_growth": {"dist": "normal", "mean": 0.02, "std": 0.015},
+        "vacancy": {"dist": "normal", "mean": vacancy if vacancy is not None else 0.07, "std": 0.02, "min": 0.0, "max": 0.6},
+        "expense_growth": {"dist": "normal", "mean": 0.03, "std": 0.01},
+        "rate_shock": {"dist": "normal", "mean": 0.0, "std": 0.005},
+        "exit_cap": {"dist": "normal", "mean": exit_cap, "std": 0.0075, "min": 0.03, "max": 0.2},
+    }
+
+
+def _draw(rng: np.random.Generator, name: str, spec: Dict[str, Any], size) -> np.ndarray:
+    kind = spec.get("dist", "normal")
+    try:
+        if kind == "normal":
+            values = rng.normal(float(spec["mean"]), float(spec["std"]), size)
+        elif kind == "lognormal":
+            values = rng.lognormal(float(spec["mean"]), float(spec["sigma"]), size)
+        elif kind == "uniform":
+            values = rng.uniform(float(spec["low"]), float(spec["high"]), size)
+        elif kind == "triangular":
+            values = rng.triangular(float(spec["low"]), float(spec["mode"]), float(spec["high"]), size)
+        elif kind == "fixed":
+            values = np.full(size, float(spec["value"]))
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for {name}")
+    except KeyError as e:
+        raise ValueError(f"Distribution for {name} is missing parameter {e}")
+    if spec.get("min") is not None or spec.get("max") is not None:
+        values = np.clip(values, spec.get("min"), spec.get("max"))
+    return values
+
+
+def _bands(values: np.ndarray, axis: int = 0) -> Dict[str, Any]:
+    """Percentiles keyed p5..p95; NaN entries (e.g. a DSCR with no debt service) are left out."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN slices come back as NaN
+        pct = np.nanpercentile(values, PERCENTILES, axis=axis)
+    return {f"p{p}": row.tolist() if np.ndim(row) else float(row) for p, row in zip(PERCENTILES, pct)}
+
+
+def simulate_deal(
+    t12: Dict[str, Any],
+    rent_roll: Dict[str, Any],
+    narrative: Dict[str, Any],
+    overrides: Optional[Dict[str, Any]] = None,
+    distributions: Optional[Dict[str, Dict[str, Any]]] = None,
+    paths: int = SIMULATION_PATHS,
+    seed: Optional[int] = None,
+    hold_years: int = IRR_HOLD_YEARS,
+    covenants: Optional[Dict[str, Optional[float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Simulate `paths` hold periods and return IRR / DSCR percentile bands and covenant breach
+    probabilities. Inputs are resolved like `compute_metrics`; financing comes from the
+    interest_rate / ltv / amortization_years / equity_invested overrides (rates as fractions).
+    The floating rate follows a random walk of yearly `rate_shock` draws from interest_rate.
+    """
+    overrides = overrides or {}
+    unknown = [name for name in (distributions or {}) if name not in SIMULATED_VARIABLES]
+    if unknown:
+        raise ValueError(f"Unknown simulation variables {unknown}; expected any of {list(SIMULATED_VARIABLES)}")
+    if not 1 <= paths <= SIMULATION_MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {SIMULATION_MAX_PATHS}")
+    if not 1 <= hold_years <= SIMULATION_MAX_HOLD_YEARS:
+        raise ValueError(f"hold_years must be between 1 and {SIMULATION_MAX_HOLD_YEARS}")
+
+    inputs = _resolve_inputs(t12, rent_roll, narrative, overrides)
+    noi, gpr, egi, opex = inputs["noi"], inputs["gpr"], inputs["egi"], inputs["opex"]
+    price = inputs["purchase_price"]
+    if not noi or not price:
+        raise ValueError("Simulation needs a net operating income and a purchase price")
+
+    # Year-0 operating base: potential rent and expenses that reproduce the T12 NOI
+    potential_rent = gpr or egi or (noi + (opex or 0.0))
+    base_vacancy = 1 - egi / gpr if (gpr and egi and egi <= gpr) else None
+    base_egi = egi or potential_rent * (1 - (base_vacancy or 0.0))
+    base_opex = opex if opex is not None else max(base_egi - noi, 0.0)
+
+    specs = default_distributions(noi / price, base_vacancy)
+    specs.update(distributions or {})
+    rng = np.random.default_rng(seed)
+    draws = {
+        name: _draw(rng, name, specs[name], (paths, hold_years) if name in PER_YEAR_VARIABLES else paths)
+        for name in SIMULATED_VARIABLES
+    }
+
+    # Operations: (paths, years)
+    rent = potential_rent * np.cumprod(1 + draws["rent_growth"], axis=1)
+    expenses = base_opex * np.cumprod(1 + draws["expense_growth"], axis=1)
+    path_noi = rent * (1 - draws["vacancy"]) - expenses
+
+    # Financing: floating rate re-amortized yearly on the outstanding balance
+    ltv = _override(overrides, "ltv", DEFAULT_LTV)
+    amortization = _override(overrides, "amortization_years", DEFAULT_AMORTIZATION_YEARS)
+    loan = price * ltv
+    equity = _to_number(overrides.get("equity_invested")) or (price - loan)
+    rate0 = _override(overrides, "interest_rate", DEFAULT_INTEREST_RATE)
+    rates = np.maximum(rate0 + np.cumsum(draws["rate_shock"], axis=1), 0.0)
+
+    debt_service = np.empty((paths, hold_years))
+    balance = np.full(paths, loan)
+    for year in range(hold_years):
+        remaining = max(amortization - year, 1)
+        debt_service[:, year] = balance * mortgage_constant(rates[:, year], remaining)
+        balance = balance * (1 + rates[:, year]) - debt_service[:, year]
+    balance = np.maximum(balance, 0.0)
+
+    # Exit on forward NOI at the drawn exit cap, net of selling costs and loan payoff
+    forward_noi = path_noi[:, -1] * (1 + draws["rent_growth"][:, -1])
+    sale = forward_noi / draws["exit_cap"] * (1 - DEFAULT_SELLING_COSTS)
+
+    cash_flows = np.empty((paths, hold_years + 1))
+    cash_flows[:, 0] = -equity
+    cash_flows[:, 1:] = path_noi - debt_service
+    cash_flows[:, -1] += sale - balance
+    path_irr = irr(cash_flows) * 100
+    # A path with no IRR whose cash flows sum to a loss loses money at every discount rate:
+    # count it as a total loss (-100%) rather than dropping it from the downside bands
+    unsolved = ~np.isfinite(path_irr)
+    total_loss = unsolved & (cash_flows.sum(axis=1) < 0)
+    path_irr[total_loss] = -100.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dscr = path_noi / debt_service
+        debt_yield = path_noi / loan if loan else np.full_like(path_noi, np.nan)
+
+    covenants = {**DEFAULT_COVENANTS, **(covenants or {})}
+    breaches = {}
+    any_breach = np.zeros(paths, dtype=bool)
+    for name, series in (("min_dscr", dscr), ("min_debt_yield", debt_yield)):
+        threshold = _to_number(covenants.get(name))
+        if threshold is None:
+            continue
+        breached = np.any(series < threshold, axis=1)
+        any_breach |= breached
+        breaches[name] = {
+            "threshold": threshold,
+            "breach_probability": float(breached.mean()),
+            "first_breach_year_probability": np.mean(
+                (series < threshold) & (np.cumsum(series < threshold, axis=1) == 1), axis=0
+            ).tolist(),
+        }
+
+    solved = np.isfinite(path_irr)
+    return {
+        "paths": paths,
+        "seed": seed,
+        "hold_years": hold_years,
+        "distributions": specs,
+        "irr": {
+            **_bands(path_irr),
+            "mean": float(np.nanmean(path_irr)) if solved.any() else None,
+            # Undiscounted loss, so wiped-out paths without a solvable IRR still count
+            "probability_of_loss": float(np.mean(cash_flows.sum(axis=1) < 0)),
+            # Paths without an IRR: those in a net loss are in the bands at -100%, the rest are left out
+            "unsolved_paths": int(unsolved.sum()),
+            "unsolved_counted_as_total_loss": int(total_loss.sum()),
+        },
+        "dscr": {"by_year": _bands(dscr), "minimum": _bands(dscr.min(axis=1))},
+        "noi": {"by_year": _bands(path_noi)},
+        "covenants": {**breaches, "any_breach_probability": float(any_breach.mean())},
+    }
@@ -3,7 +3,8 @@ from langchain.schema import Document
 from typing import List, Dict, Any, Optional
 from utils.helpers import _clean_dataframe, _guess_is_rent_roll, _guess_is_t12
 import pandas as pd
-import pdfplumber
+from utils.pdf_session import open_pdf_session
+from utils.table_registry import get_table
 import os
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
@@ -12,14 +13,20 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 def extract_tables_to_dataframes_from_docs(docs: List[Document]) -> Dict[str, List[pd.DataFrame]]:
     """
     Attempt to extract tables from documents that represent PDFs (we will only run pdfplumber on actual pdf paths)
-    For Documents made from DataFrames already, use that DataFrame (in metadata) directly.
+    PDF pages are read through the shared PdfSession, so layout analysis is reused by the text parsers.
+    For Documents made from DataFrames already, read that DataFrame from the table registry (once per table, not per chunk).
     """
     out = {"rent_roll": [], "t12": [], "other": []}
-    # First, check docs that have dataframe metadata (CSV/Excel)
+    # First, check docs that reference a registered table (CSV/Excel)
+    seen_tables = set()
     for d in docs:
         md = d.metadata or {}
-        if "dataframe" in md and isinstance(md["dataframe"], pd.DataFrame):
-            df = md["dataframe"]
+        table_id = md.get("table_id")
+        if table_id and table_id not in seen_tables:
+            seen_tables.add(table_id)
+            df = get_table(table_id)
+            if not isinstance(df, pd.DataFrame):
+                continue
             df = df.dropna(axis=1, how="all")
             df = df.loc[:, ~(df.columns.astype(str).str.lower().str.contains("^unnamed.*"))]
             df = _clean_dataframe(df)
@@ -39,12 +46,9 @@ def extract_tables_to_dataframes_from_docs(docs: List[Document]) -> Dict[str, Li
         if src and str(src).lower().endswith(".pdf") and src not in seen_pdf_paths:
             seen_pdf_paths.add(src)
             try:
-                with pdfplumber.open(src) as pdf:
-                    for i, page in enumerate(pdf.pages):
-                        try:
-                            tables = page.extract_tables() or []
-                        except Exception:
-                            tables = []
+                with open_pdf_session(src) as session:
+                    for i in range(session.page_count):
+                        tables = session.page_tables(i)
                         for tbl in tables:
                             if not tbl or len(tbl) < 2:
                                 continue
@@ -0,0 +1,88 @@
+"""
+Per-request registry of tabular data (CSV / Excel sheets).
+
+Loaders register each DataFrame once and put only its `table_id` into the
+Document metadata, so text splitters copy a short string into every chunk
+instead of the whole frame. Table ids are content hashes, which keeps them
+stable across runs and lets the parse cache restore tables under the same id.
+"""
+
+import os
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+# Bound for the process-wide fallback registry used outside a request scope
+DEFAULT_REGISTRY_MAX_TABLES = int(os.getenv("TABLE_REGISTRY_MAX_TABLES", "256"))
+
+
+class TableRegistry:
+    """Map of table_id -> DataFrame, optionally capped to the most recently used `max_tables`."""
+
+    def __init__(self, max_tables: Optional[int] = None):
+        self.max_tables = max_tables
+        self._tables: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+
+    def register(self, df: pd.DataFrame, table_id: Optional[str] = None, content: Optional[str] = None) -> str:
+        """Store `df` and return its id (a hash of `content`, or of the frame's CSV text)."""
+        if table_id is None:
+            content = content if content is not None else df.to_csv(index=False)
+            table_id = "tbl_" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+        self._tables[table_id] = df
+        self._tables.move_to_end(table_id)
+        if self.max_tables is not None:
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return table_id
+
+    def get(self, table_id: str) -> Optional[pd.DataFrame]:
+        df = self._tables.get(table_id)
+        if df is not None:
+            self._tables.move_to_end(table_id)
+        return df
+
+    def items(self):
+        return self._tables.items()
+
+    def __contains__(self, table_id: str) -> bool:
+        return table_id in self._tables
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+_DEFAULT_REGISTRY = TableRegistry(max_tables=DEFAULT_REGISTRY_MAX_TABLES)
+_ACTIVE_REGISTRY: ContextVar[Optional[TableRegistry]] = ContextVar("table_registry", default=None)
+
+
+def current_table_registry() -> TableRegistry:
+    """The registry of the active `table_registry_scope()`, else the bounded process-wide one."""
+    # Compare with None: a scope's registry starts out empty, and an empty registry is falsy
+    registry = _ACTIVE_REGISTRY.get()
+    return registry if registry is not None else _DEFAULT_REGISTRY
+
+
+@contextmanager
+def table_registry_scope():
+    """Give everything inside this block (one request) its own registry, released on exit."""
+    registry = TableRegistry()
+    token = _ACTIVE_REGISTRY.set(registry)
+    try:
+        yield registry
+    finally:
+        _ACTIVE_REGISTRY.reset(token)
+
+
+def register_table(df: pd.DataFrame, table_id: Optional[str] = None, content: Optional[str] = None) -> str:
+    return current_table_registry().register(df, table_id=table_id, content=content)
+
+
+def get_table(table_id: str) -> Optional[pd.DataFrame]:
+    return current_table_registry().get(table_id)
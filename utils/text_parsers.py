@@ -4,8 +4,8 @@ from utils.helpers import _to_number
 from langsmith import traceable
 import pandas as pd
 import re
-import pdfplumber
-import csv
+from utils.pdf_session import open_pdf_session
+from utils.debug_artifacts import record_artifact
 from dotenv import load_dotenv 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
@@ -29,9 +29,9 @@ def parse_rent_roll_from_text(path: str) -> pd.DataFrame:
     """
     candidates = []
     try:
-        with pdfplumber.open(path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text() or ""
+        with open_pdf_session(path) as session:
+            for i in range(session.page_count):
+                text = session.page_text(i)
                 lines = [l.strip() for l in text.splitlines() if l.strip()]
                 for idx, line in enumerate(lines):
                     if re.search(r"(^suite\s*\d+)|(^\d{2,4}\b)", line.lower()) or re.search(r"\b(suite|ste|#)\b", line.lower()):
@@ -83,16 +83,16 @@ def parse_rent_roll_from_text(path: str) -> pd.DataFrame:
         return nums[-1]
     if not df.empty:
         df["best_amount"] = df.apply(pick_amount, axis=1)
-    df.to_csv("debug_rent_roll_candidates.csv", index=False)
+    record_artifact(f"rent_roll_candidates_{os.path.basename(path)}", df)
     return df
 
 @traceable(name="parse_t12_from_text")
 def parse_t12_from_text(path: str) -> Dict[str, Optional[float]]:
     text_all = ""
     try:
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                text_all += "\n" + (page.extract_text() or "")
+        with open_pdf_session(path) as session:
+            for text in session.page_texts():
+                text_all += "\n" + text
     except Exception as e:
         print(f"parse_t12_from_text failed for {path}: {e}")
         text_all = ""
@@ -104,11 +104,7 @@ def parse_t12_from_text(path: str) -> Dict[str, Optional[float]]:
         if re.search(r"(gross.*potential.*rent|potential.*rent|gpr|effective gross|effective gross income|net operating income|operating expenses|total expenses|vacancy|credit loss|other income|misc income|parking|laundry)", ln, flags=re.I):
             nums = _extract_amounts_from_line(ln)
             candidates.append({"line": ln, "amounts": nums})
-    with open("debug_t12_candidates.csv", "w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=["line", "amounts"])
-        writer.writeheader()
-        for c in candidates:
-            writer.writerow({"line": c["line"], "amounts": ";".join(str(a) for a in c["amounts"])})
+    record_artifact(f"t12_candidates_{os.path.basename(path)}", candidates)
     def pick_for_pattern(pats):
         for c in candidates:
             for p in pats:
@@ -139,9 +135,6 @@ def parse_rent_roll_summary_text(path: str) -> dict:
     Extracts 'Rent Roll Summary' values like Total Units, Current Rent Total, Market Rent Total, and Rent Gap %.
     Useful for summary tables without tenant-level data.
     """
-    import pdfplumber
-    import re
-
     result = {
         "total_units": None,
         "current_rent_total": None,
@@ -150,8 +143,8 @@ def parse_rent_roll_summary_text(path: str) -> dict:
     }
 
     try:
-        with pdfplumber.open(path) as pdf:
-            full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+        with open_pdf_session(path) as session:
+            full_text = session.full_text()
 
         patterns = {
             "total_units": r"Total\s+Units[:\s]*([\d,\.]+)",
@@ -180,9 +173,6 @@ def parse_t12_summary_text(path: str) -> dict:
     Gross Potential Rent, Vacancy, Effective Gross Income, Operating Expenses, and NOI.
     This is used when the PDF contains summary tables instead of detailed T12 rows.
     """
-    import pdfplumber
-    import re
-
     result = {
         "gross_potential_rent": None,
         "vacancy": None,
@@ -192,8 +182,8 @@ def parse_t12_summary_text(path: str) -> dict:
     }
 
     try:
-        with pdfplumber.open(path) as pdf:
-            full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+        with open_pdf_session(path) as session:
+            full_text = session.full_text()
 
         patterns = {
             "gross_potential_rent": r"(Gross\s+Potential\s+Rent)[:\s]*\$?([\d,\.]+)",